@@ -0,0 +1,183 @@
+"""
+Benchmark: Arabic spelling normalization in the keyword detectors
+Builds patient messages from the knowledge base keywords, then rewrites them
+the way patients type (أ/إ/آ as ا and back, ى/ي, ة/ه, tatweel, diacritics)
+and measures, on the rewritten messages:
+  - recall: symptoms, red flags and neighborhoods found, out of those the clean
+    message has, for the old raw-string loops and for the normalized matchers
+  - keywords scanned and time per message, against the old loops and against
+    the old workaround (a knowledge base with the variant spellings added)
+
+Usage:
+    python benchmark_arabic_normalization.py [messages]    # default: 2000
+"""
+
+import sys
+import os
+import random
+import time
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.data.medical_knowledge_base import SYMPTOM_DATABASE
+from src.services.advanced_triage_engine import RED_FLAG_PATTERNS, detect_red_flags, symptom_matcher
+from src.services.arabic_normalizer import normalize_arabic
+from src.services.location_detector import location_detector, RIYADH_NEIGHBORHOODS
+
+FILLER = [
+    "السلام عليكم", "عندي", "من أمس", "والله تعبان", "ما أقدر أنام", "أحس", "مع", "وأيضاً",
+    "من يومين", "الحين", "لو سمحت", "ساعدني", "ابني", "أمي", "بعد الأكل", "في الليل",
+]
+ALEFS = "أإآ"
+DIACRITICS = "ًَُِّْ"
+TATWEEL = "ـ"
+
+
+# --- The detectors as they were: one raw substring test per keyword ---
+
+def legacy_symptoms(message, symptom_database):
+    detected = set()
+    for symptom_key, symptom_data in symptom_database.items():
+        if symptom_data["ar"] in message:
+            detected.add(symptom_key)
+            continue
+        for severity_data in symptom_data["severity_indicators"].values():
+            if any(keyword in message for keyword in severity_data["keywords"]):
+                detected.add(symptom_key)
+    return detected
+
+
+def legacy_red_flags(message):
+    return {flag for flag, patterns in RED_FLAG_PATTERNS.items() if any(p in message for p in patterns)}
+
+
+def legacy_neighborhood(message):
+    """First neighborhood in table order, like detect_location_from_text"""
+    lowered = message.lower()
+    for name, coords in RIYADH_NEIGHBORHOODS.items():
+        if name in message or coords['name'].lower() in lowered:
+            return {name}
+    return set()
+
+
+def legacy(message, symptom_database=SYMPTOM_DATABASE):
+    return legacy_symptoms(message, symptom_database), legacy_red_flags(message), legacy_neighborhood(message)
+
+
+def normalized(message):
+    neighborhood = location_detector.detect_location_from_text(message).get('neighborhood')
+    return ({detected["symptom"] for detected in symptom_matcher.detect(message)},
+            {flag["flag"] for flag in detect_red_flags(message)},
+            {neighborhood} if neighborhood else set())
+
+
+# --- Data ---
+
+def respell(text, rng):
+    """The text as a patient might type it: alef, ya and ta marbuta variants, tatweel, diacritics"""
+    out = []
+    for index, char in enumerate(text):
+        following = text[index + 1] if index + 1 < len(text) else " "
+        if char in ALEFS and rng.random() < 0.7:
+            char = "ا"
+        elif char == "ا" and (index == 0 or text[index - 1] == " ") and rng.random() < 0.3:
+            char = rng.choice(ALEFS[:2])
+        elif char == "ى" and rng.random() < 0.7:
+            char = "ي"
+        elif char == "ي" and following == " " and rng.random() < 0.3:
+            char = "ى"
+        elif char == "ة" and rng.random() < 0.5:
+            char = "ه"
+        out.append(char)
+        if "ء" <= char <= "ي" and following != " ":
+            if rng.random() < 0.05:
+                out.append(TATWEEL)
+            elif rng.random() < 0.08:
+                out.append(rng.choice(DIACRITICS))
+    return "".join(out)
+
+
+def with_variant_spellings(symptom_database):
+    """The old workaround: every keyword also listed in its bare spelling"""
+    def variants(keywords):
+        return list(dict.fromkeys(k for keyword in keywords for k in (keyword, normalize_arabic(keyword))))
+    return {
+        key: {**data, "severity_indicators": {
+            level: {**severity, "keywords": variants(severity["keywords"])}
+            for level, severity in data["severity_indicators"].items()
+        }}
+        for key, data in symptom_database.items()
+    }
+
+
+def corpus(size, rng):
+    keywords = [data["ar"] for data in SYMPTOM_DATABASE.values()]
+    keywords += [k for data in SYMPTOM_DATABASE.values() for s in data["severity_indicators"].values()
+                 for k in s["keywords"]]
+    keywords += [p for patterns in RED_FLAG_PATTERNS.values() for p in patterns]
+    keywords += list(RIYADH_NEIGHBORHOODS)
+
+    messages = []
+    for _ in range(size):
+        words = rng.sample(FILLER, rng.randint(3, 8)) + rng.sample(keywords, rng.randint(1, 3))
+        rng.shuffle(words)
+        messages.append(" ".join(words))
+    return messages
+
+
+def keyword_count(symptom_database):
+    return sum(1 + sum(len(s["keywords"]) for s in data["severity_indicators"].values())
+               for data in symptom_database.values())
+
+
+def per_message_us(function, messages):
+    began = time.perf_counter()
+    for message in messages:
+        function(message)
+    return (time.perf_counter() - began) / len(messages) * 1e6
+
+
+def recall(detector, clean, typed):
+    """Found / expected per detector (expected: what the old loops find in the clean message)"""
+    found = [0, 0, 0]
+    expected = [0, 0, 0]
+    extra = 0
+    for clean_message, typed_message in zip(clean, typed):
+        for index, (want, got) in enumerate(zip(legacy(clean_message), detector(typed_message))):
+            found[index] += len(want & got)
+            expected[index] += len(want)
+            extra += len(got - want)
+    return [f / e if e else 1.0 for f, e in zip(found, expected)], extra
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rng = random.Random(42)
+    clean = corpus(size, rng)
+    typed = [respell(message, rng) for message in clean]
+    workaround = with_variant_spellings(SYMPTOM_DATABASE)
+
+    print(f"\n🔤 {size} messages, respelled as typed by patients")
+    print(f"   {'detector':<34}{'symptoms':>10}{'red flags':>11}{'areas':>8}{'extra':>7}")
+    for name, detector in [
+        ("old loops (raw strings)", legacy),
+        ("old loops + variant keywords", lambda message: legacy(message, workaround)),
+        ("normalized matchers", normalized),
+    ]:
+        (symptoms, flags, areas), extra = recall(detector, clean, typed)
+        print(f"   {name:<34}{symptoms:>10.1%}{flags:>11.1%}{areas:>8.1%}{extra:>7}")
+
+    print("\n📊 symptom keywords scanned and time per message")
+    print(f"   {'detector':<34}{'keywords':>10}{'µs/msg':>9}")
+    normalize_arabic.cache_clear()
+    for name, count, function in [
+        ("old loops (raw strings)", keyword_count(SYMPTOM_DATABASE),
+         lambda message: legacy_symptoms(message, SYMPTOM_DATABASE)),
+        ("old loops + variant keywords", keyword_count(workaround),
+         lambda message: legacy_symptoms(message, workaround)),
+        ("normalized matcher", len(symptom_matcher.matcher), symptom_matcher.detect),
+    ]:
+        print(f"   {name:<34}{count:>10}{per_message_us(function, typed):>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
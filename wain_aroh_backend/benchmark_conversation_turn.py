@@ -0,0 +1,103 @@
+"""
+Benchmark: per-turn latency of ConversationalAI.process_message per CONVERSATION_TURN_MODE
+Replaces the OpenAI client with a stand-in that sleeps like a chat completion
+(time to first token + time per output token), so the modes can be compared
+without network access or API cost
+
+Usage:
+    python benchmark_conversation_turn.py [turns] [ttft_ms] [ms_per_token]    # default: 10 500 15
+"""
+
+import sys
+import os
+import json
+import time
+from types import SimpleNamespace
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('OPENAI_API_KEY', 'benchmark')  # the stand-in client never calls the API
+
+from src.main import app
+import src.services.conversational_ai as conversational_ai_module
+from src.services.conversational_ai import ConversationalAI
+
+MODES = ['sequential', 'concurrent', 'structured']
+
+# Typical output lengths (tokens) of each kind of completion
+REPLY_TOKENS = 150
+ANALYSIS_TOKENS = 60
+
+REPLY = "شكراً لك. منذ متى بدأ الألم؟ وهل هو شديد؟"
+ANALYSIS = {"stage": "symptoms", "ctas_level": None, "symptoms": ["صداع"], "wants_booking": False}
+
+PATIENT_MESSAGES = [
+    "عندي صداع من أمس",
+    "الألم متوسط تقريباً ٦ من ١٠",
+    "لا يوجد حمى",
+    "بدأ تدريجياً",
+]
+
+
+class StubCompletions:
+    """Answers like the real endpoint for the three kinds of calls ConversationalAI makes"""
+
+    def __init__(self, ttft_ms, ms_per_token):
+        self.ttft_ms = ttft_ms
+        self.ms_per_token = ms_per_token
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        if kwargs.get('response_format'):
+            tokens, content = REPLY_TOKENS + ANALYSIS_TOKENS, json.dumps({"reply": REPLY, "analysis": ANALYSIS})
+        elif kwargs.get('max_tokens') == 200:
+            tokens, content = ANALYSIS_TOKENS, json.dumps(ANALYSIS)
+        else:
+            tokens, content = REPLY_TOKENS, REPLY
+
+        time.sleep((self.ttft_ms + tokens * self.ms_per_token) / 1000)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def run_mode(mode, turns, ttft_ms, ms_per_token):
+    """متوسط زمن الدور وعدد الاستدعاءات لنمط واحد"""
+    completions = StubCompletions(ttft_ms, ms_per_token)
+    conversational_ai_module.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+    ai = ConversationalAI()
+    ai.turn_mode = mode
+    ai.start_conversation('benchmark')
+
+    latencies = []
+    for turn in range(turns):
+        began = time.perf_counter()
+        ai.process_message('benchmark', PATIENT_MESSAGES[turn % len(PATIENT_MESSAGES)])
+        latencies.append((time.perf_counter() - began) * 1000)
+
+    return {
+        "avg_ms": sum(latencies) / len(latencies),
+        "max_ms": max(latencies),
+        "calls_per_turn": completions.calls / turns,
+    }
+
+
+def main():
+    args = [int(arg) for arg in sys.argv[1:]]
+    turns = args[0] if len(args) > 0 else 10
+    ttft_ms = args[1] if len(args) > 1 else 500
+    ms_per_token = args[2] if len(args) > 2 else 15
+
+    print(f"\n📊 {turns} turns per mode; stub completion = {ttft_ms} ms + {ms_per_token} ms/token "
+          f"(reply {REPLY_TOKENS}, analysis {ANALYSIS_TOKENS} tokens)")
+    print(f"   {'mode':<12}{'avg ms':>10}{'max ms':>10}{'calls/turn':>12}{'vs sequential':>15}")
+
+    baseline = None
+    for mode in MODES:
+        with app.app_context():  # the system prompt is built from the facility table
+            result = run_mode(mode, turns, ttft_ms, ms_per_token)
+        baseline = baseline or result["avg_ms"]
+        print(f"   {mode:<12}{result['avg_ms']:>10.0f}{result['max_ms']:>10.0f}"
+              f"{result['calls_per_turn']:>12.1f}{baseline / result['avg_ms']:>14.2f}x")
+
+
+if __name__ == '__main__':
+    main()
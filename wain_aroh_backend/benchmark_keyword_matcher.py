@@ -0,0 +1,174 @@
+"""
+Benchmark: compiled keyword matcher vs per-keyword substring scans
+Runs the triage keyword detectors over a synthetic corpus of patient messages,
+first with the current medical knowledge base and then with SYMPTOM_DATABASE
+grown to 10x (cloned entries with new keyword variants); checks that the
+compiled matcher returns exactly what the old loops returned, and prints
+the time per message of both
+
+Usage:
+    python benchmark_keyword_matcher.py [messages] [growth]    # default: 2000 10
+"""
+
+import sys
+import os
+import random
+import time
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.data.medical_knowledge_base import SYMPTOM_DATABASE
+from src.services.advanced_triage_engine import (
+    SymptomMatcher, RED_FLAG_PATTERNS, SEVERITY_KEYWORDS, URGENCY_KEYWORDS, CONDITION_KEYWORDS,
+    detect_red_flags, scan_message, symptom_matcher
+)
+from src.services.recommendation_generator import analyze_urgency, URGENT_KEYWORDS, CRITICAL_KEYWORDS
+from src.services.location_detector import location_detector, RIYADH_NEIGHBORHOODS
+
+FILLER = [
+    "السلام عليكم", "عندي", "من أمس", "والله تعبان", "ما أقدر أنام", "أحس", "مع", "وأيضاً",
+    "من يومين", "الحين", "لو سمحت", "ساعدني", "ابني", "أمي", "بعد الأكل", "في الليل",
+]
+VARIANT_SUFFIXES = ["جداً", "كثير", "مستمر", "متكرر", "خفيف شوي", "من فترة", "بالليل", "مع تعب", "أحياناً"]
+
+
+# --- The detectors as they were: one substring test per keyword ---
+
+def legacy_detect_symptoms(message, symptom_database):
+    detected = []
+    for symptom_key, symptom_data in symptom_database.items():
+        if symptom_data["ar"] in message:
+            detected.append({"symptom": symptom_key, "ar_name": symptom_data["ar"],
+                             "category": symptom_data["category"], "confidence": 0.9})
+            continue
+        for severity_level, severity_data in symptom_data["severity_indicators"].items():
+            for keyword in severity_data["keywords"]:
+                if keyword in message:
+                    detected.append({"symptom": symptom_key, "ar_name": symptom_data["ar"],
+                                     "category": symptom_data["category"], "severity_level": severity_level,
+                                     "severity_ctas": severity_data["ctas"], "confidence": 0.8})
+                    break
+    return detected
+
+
+def legacy_red_flags(message):
+    return [{"flag": flag, "pattern": pattern, "severity": "critical", "action_required": "immediate_emergency"}
+            for flag, patterns in RED_FLAG_PATTERNS.items() for pattern in patterns if pattern in message]
+
+
+def legacy_first_level(message, table, default):
+    for level, keywords in table.items():
+        if any(keyword in message for keyword in keywords):
+            return level
+    return default
+
+
+def legacy_urgency(text):
+    text_lower = text.lower()
+    if any(keyword in text_lower for keyword in CRITICAL_KEYWORDS):
+        return 'critical'
+    if any(keyword in text_lower for keyword in URGENT_KEYWORDS):
+        return 'urgent'
+    return 'normal'
+
+
+def legacy_location(text):
+    text_lower = text.lower()
+    for arabic_name, coords in RIYADH_NEIGHBORHOODS.items():
+        if arabic_name in text or coords['name'].lower() in text_lower:
+            return arabic_name
+    return None
+
+
+def legacy_all(message):
+    return (legacy_detect_symptoms(message, SYMPTOM_DATABASE), legacy_red_flags(message),
+            legacy_first_level(message, SEVERITY_KEYWORDS, "mild"),
+            legacy_first_level(message, URGENCY_KEYWORDS, "routine"),
+            [c for c in CONDITION_KEYWORDS if legacy_first_level(message, {c: CONDITION_KEYWORDS[c]}, None)],
+            legacy_urgency(message), legacy_location(message))
+
+
+def compiled_all(message):
+    # The engine's detectors share one scan of the message (scan_message)
+    found = scan_message(message)
+    return (symptom_matcher.from_tags(found), detect_red_flags(message),
+            next((level for level in SEVERITY_KEYWORDS if ("severity", level) in found), "mild"),
+            next((level for level in URGENCY_KEYWORDS if ("urgency", level) in found), "routine"),
+            [c for c in CONDITION_KEYWORDS if ("condition", c) in found], analyze_urgency(message),
+            location_detector.detect_location_from_text(message).get('neighborhood'))
+
+
+# --- Data ---
+
+def grow(symptom_database, factor):
+    """The database with factor-1 clones of every entry, each with its own keyword variants"""
+    grown = dict(symptom_database)
+    for copy in range(1, factor):
+        suffix = VARIANT_SUFFIXES[(copy - 1) % len(VARIANT_SUFFIXES)]
+        for key, data in symptom_database.items():
+            grown[f"{key}_{copy}"] = {
+                **data,
+                "ar": f"{data['ar']} {suffix}",
+                "severity_indicators": {
+                    level: {**severity, "keywords": [f"{keyword} {suffix}" for keyword in severity["keywords"]]}
+                    for level, severity in data["severity_indicators"].items()
+                },
+            }
+    return grown
+
+
+def corpus(size, symptom_database, rng):
+    """Patient-like messages mixing filler with keywords from every table"""
+    keywords = [data["ar"] for data in symptom_database.values()]
+    keywords += [k for data in symptom_database.values() for s in data["severity_indicators"].values()
+                 for k in s["keywords"]]
+    keywords += [p for patterns in RED_FLAG_PATTERNS.values() for p in patterns]
+    keywords += list(RIYADH_NEIGHBORHOODS) + [c['name'] for c in RIYADH_NEIGHBORHOODS.values()]
+    keywords += URGENT_KEYWORDS + CRITICAL_KEYWORDS + [k for ks in CONDITION_KEYWORDS.values() for k in ks]
+
+    messages = []
+    for _ in range(size):
+        words = rng.sample(FILLER, rng.randint(3, 8)) + rng.sample(keywords, rng.randint(0, 3))
+        rng.shuffle(words)
+        messages.append(" ".join(words))
+    return messages
+
+
+def per_message_us(function, messages):
+    began = time.perf_counter()
+    for message in messages:
+        function(message)
+    return (time.perf_counter() - began) / len(messages) * 1e6
+
+
+def main():
+    args = [int(arg) for arg in sys.argv[1:]]
+    size = args[0] if len(args) > 0 else 2000
+    factor = args[1] if len(args) > 1 else 10
+    rng = random.Random(42)
+
+    messages = corpus(size, SYMPTOM_DATABASE, rng)
+    mismatches = sum(1 for message in messages if legacy_all(message) != compiled_all(message))
+    scan_message.cache_clear()
+    print(f"\n🔎 all detectors, {size} messages: {mismatches} differences from the old loops")
+    print(f"   old loops {per_message_us(legacy_all, messages):8.1f} µs/message   "
+          f"compiled {per_message_us(compiled_all, messages):8.1f} µs/message")
+
+    print(f"\n📊 symptom detection, knowledge base at 1x and {factor}x")
+    print(f"   {'size':<6}{'keywords':>10}{'build ms':>10}{'old µs/msg':>12}{'new µs/msg':>12}{'speedup':>9}{'diffs':>7}")
+    for growth in (1, factor):
+        database = grow(SYMPTOM_DATABASE, growth)
+        texts = corpus(size, database, rng)
+        began = time.perf_counter()
+        matcher = SymptomMatcher(database) if growth > 1 else symptom_matcher
+        build_ms = (time.perf_counter() - began) * 1000
+        diffs = sum(1 for text in texts if legacy_detect_symptoms(text, database) != matcher.detect(text))
+        old = per_message_us(lambda text: legacy_detect_symptoms(text, database), texts)
+        new = per_message_us(matcher.detect, texts)
+        print(f"   {str(growth) + 'x':<6}{len(matcher.matcher):>10}{build_ms:>10.1f}{old:>12.1f}{new:>12.1f}"
+              f"{old / new:>8.1f}x{diffs:>7}")
+
+    return mismatches
+
+
+if __name__ == '__main__':
+    sys.exit(1 if main() else 0)
@@ -0,0 +1,102 @@
+"""
+Benchmark: reply latency of red-flag messages on the fast path
+Sends critical presentations ("لا أستطيع التنفس", "ألم صدر شديد", ...) through
+ConversationalAI and EnhancedConversationalAI with a slow stub model
+(LLM_PROVIDER=stub), and fails if the p95 reply time is over the target:
+red-flag turns must not wait for a completion
+
+Usage:
+    python benchmark_red_flag_fast_path.py [turns] [target_ms] [model_ms]    # default: 200 50 1500
+"""
+
+import sys
+import os
+import time
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+args = [int(arg) for arg in sys.argv[1:]]
+TURNS = args[0] if len(args) > 0 else 200
+TARGET_MS = args[1] if len(args) > 1 else 50
+os.environ['LLM_PROVIDER'] = 'stub'
+os.environ['LLM_STUB_TTFT_MS'] = str(args[2] if len(args) > 2 else 1500)
+
+from src.main import app
+from src.services.conversational_ai import ConversationalAI
+from src.services.enhanced_conversational_ai import EnhancedConversationalAI
+from src.services.facility_snapshot import facility_snapshot_store
+from src.services.sample_stats import percentile
+from src.services.triage_training_module import training_module
+
+training_module.training_data_file = os.devnull  # benchmark sessions are not training data
+
+RED_FLAG_MESSAGES = [
+    "لا أستطيع التنفس",
+    "عندي ألم صدر شديد من نصف ساعة",
+    "أبوي أغمي علي فجأة",
+    "عندي نزيف شديد من الجرح",
+    "أسوأ صداع في حياتي",
+]
+LOCATIONS = [
+    {'latitude': 24.7136, 'longitude': 46.6753},   # الرياض
+    {'latitude': 16.8892, 'longitude': 42.5511},   # جازان
+    None,                                          # الموقع غير معروف
+]
+
+
+def measure(send):
+    """أزمنة الرد (مللي ثانية) لعدد TURNS من الرسائل الحرجة"""
+    latencies = []
+    for turn in range(TURNS):
+        message = RED_FLAG_MESSAGES[turn % len(RED_FLAG_MESSAGES)]
+        location = LOCATIONS[turn % len(LOCATIONS)]
+        began = time.perf_counter()
+        response = send(f"benchmark-{turn}", message, location)
+        latencies.append((time.perf_counter() - began) * 1000)
+        assert response.get('fast_path'), f"not on the fast path: {message}"
+    return latencies
+
+
+def conversational(session_id, message, location):
+    ai = conversational_ai
+    ai.start_conversation(session_id)
+    return ai.process_message(session_id, message, gps_data=location)
+
+
+def enhanced(session_id, message, location):
+    ai = EnhancedConversationalAI()
+    ai.start_new_session(session_id)
+    return ai.process_message(message, {'location': location} if location else {})
+
+
+def main():
+    began = time.perf_counter()
+    facility_snapshot_store.get()  # built once per process and data version
+    print(f"\n🏥 facility snapshot built in {(time.perf_counter() - began) * 1000:.0f} ms (shared, not per request)")
+
+    ai = EnhancedConversationalAI()
+    ai.start_new_session('benchmark-model')
+    began = time.perf_counter()
+    ai.process_message('عندي صداع خفيف')
+    print(f"   regular turn (stub model): {(time.perf_counter() - began) * 1000:.0f} ms")
+
+    print(f"\n📊 {TURNS} red-flag turns per service; target p95 < {TARGET_MS} ms")
+    print(f"   {'service':<28}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    over = []
+    for name, send in [('ConversationalAI', conversational), ('EnhancedConversationalAI', enhanced)]:
+        latencies = measure(send)
+        p95 = percentile(latencies, 95)
+        print(f"   {name:<28}{percentile(latencies, 50):>9}{p95:>9}{percentile(latencies, 99):>9}"
+              f"{round(max(latencies), 1):>9}")
+        if p95 > TARGET_MS:
+            over.append(name)
+    return over
+
+
+if __name__ == '__main__':
+    with app.app_context():
+        conversational_ai = ConversationalAI()
+        over_target = main()
+    if over_target:
+        print(f"\n❌ Over {TARGET_MS} ms: {', '.join(over_target)}")
+        sys.exit(1)
+    print(f"\n✅ Red-flag replies within {TARGET_MS} ms")
@@ -0,0 +1,143 @@
+"""
+Benchmark: bitset/spatial-index filtering vs. the original per-facility loop
+Runs AdvancedSearchService.apply_filters against synthetic facilities (no database needed)
+
+Usage:
+    python benchmark_search_filters.py [sizes...]      # default: 10000 100000
+"""
+
+import sys
+import os
+import random
+import time
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.models.search import SearchFilters, FacilityProfile, PerformanceMetrics
+from src.services.advanced_search import AdvancedSearchService
+from src.services.facility_snapshot import FacilitySnapshot
+
+SPECIALTIES = [
+    'قلب', 'أطفال', 'عظام', 'نساء وولادة', 'أعصاب', 'جلدية', 'عيون', 'أنف وأذن',
+    'أسنان', 'باطنة', 'جراحة', 'أورام', 'كلى', 'نفسية', 'طب أسرة', 'علاج طبيعي'
+]
+SERVICES = [
+    'طوارئ', 'أشعة', 'مختبر', 'صيدلية', 'عناية مركزة', 'غسيل كلوي',
+    'تنويم', 'عيادات خارجية', 'رعاية عاجلة', 'إسعاف'
+]
+ORGANIZATIONS = ['وزارة الصحة', 'الحرس الوطني', 'القطاع الخاص', 'الخدمات الطبية العسكرية']
+CLUSTERS = ['تجمع الرياض الأول', 'تجمع الرياض الثاني', 'تجمع الرياض الثالث', 'تجمع جازان الصحي', '']
+
+QUERIES = {
+    'specialty + radius': dict(specialties=['قلب'], location={"lat": 24.7136, "lng": 46.6753}, max_distance_km=20.0),
+    'org + services': dict(organizations=['وزارة الصحة'], required_services=['طوارئ', 'أشعة']),
+    'cluster + emergency': dict(clusters=['تجمع جازان الصحي'], accepts_emergency=True),
+    'radius only (50 km)': dict(location={"lat": 24.7136, "lng": 46.6753}, max_distance_km=50.0),
+}
+
+
+def make_facilities(count, seed=42):
+    """توليد منشآت اصطناعية موزعة على المملكة"""
+    rnd = random.Random(seed)
+    facilities = []
+    for i in range(count):
+        facilities.append(FacilityProfile(
+            id=i + 1,
+            name=f'منشأة {i + 1}',
+            name_en=f'Facility {i + 1}',
+            type=rnd.choice(['hospital', 'clinic', 'urgent_care_center']),
+            location={"lat": rnd.uniform(16.5, 31.5), "lng": rnd.uniform(36.5, 55.5)},
+            address='',
+            city='',
+            district='',
+            organization=rnd.choice(ORGANIZATIONS),
+            cluster=rnd.choice(CLUSTERS),
+            specialties=rnd.sample(SPECIALTIES, rnd.randint(1, 6)),
+            services=rnd.sample(SERVICES, rnd.randint(1, 5)),
+            performance=PerformanceMetrics(
+                overall_rating=round(rnd.uniform(3.0, 5.0), 1),
+                avg_wait_time_minutes=rnd.randint(5, 90),
+                patient_satisfaction=rnd.uniform(70, 98),
+                current_occupancy=rnd.uniform(40, 99),
+            ),
+            is_active=rnd.random() > 0.05,
+            accepts_emergency=rnd.random() > 0.5,
+        ))
+    return facilities
+
+
+def legacy_apply_filters(service, facilities, filters):
+    """حلقة الفلترة الأصلية (منشأة واحدة في كل مرة) للمقارنة"""
+    filtered = []
+    for facility in facilities:
+        if not facility.is_active:
+            continue
+        if filters.specialties:
+            if not any(spec in facility.specialties for spec in filters.specialties):
+                continue
+        if filters.organizations:
+            if facility.organization not in filters.organizations:
+                continue
+        if filters.clusters:
+            if facility.cluster not in filters.clusters:
+                continue
+        if filters.required_services:
+            if not all(service_name in facility.services for service_name in filters.required_services):
+                continue
+        distance_km = 0.0
+        if filters.location:
+            distance_km = service.calculate_distance(filters.location, facility.location)
+            if distance_km > filters.max_distance_km:
+                continue
+        if facility.performance.overall_rating < filters.min_rating:
+            continue
+        if filters.available_now:
+            if facility.performance.current_occupancy >= 95:
+                continue
+        if filters.accepts_emergency:
+            if not facility.accepts_emergency:
+                continue
+        if filters.accepts_appointments:
+            if not facility.accepts_appointments:
+                continue
+        filtered.append((facility, distance_km))
+    return filtered
+
+
+def timed(func, repeat=5):
+    """أفضل زمن تنفيذ بالمللي ثانية"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return best, result
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000]
+    service = AdvancedSearchService()
+
+    for size in sizes:
+        facilities = make_facilities(size)
+
+        start = time.perf_counter()
+        snapshot = FacilitySnapshot(facilities)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        print(f"\n📊 {size:,} facilities (index build: {build_ms:.1f} ms)")
+        print(f"   {'query':<22}{'matches':>9}{'loop ms':>11}{'index ms':>11}{'speedup':>10}")
+
+        for name, params in QUERIES.items():
+            filters = SearchFilters(**params)
+            legacy_ms, expected = timed(lambda: legacy_apply_filters(service, facilities, filters))
+            indexed_ms, actual = timed(lambda: service.apply_filters(snapshot, filters))
+
+            assert [(f.id, d) for f, d in actual] == [(f.id, d) for f, d in expected], name
+
+            print(f"   {name:<22}{len(actual):>9,}{legacy_ms:>11.2f}{indexed_ms:>11.2f}"
+                  f"{legacy_ms / indexed_ms if indexed_ms else 0:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+Benchmark: concurrent routing-log writes and analytics reads per SQLite profile
+Runs writer and reader threads against a throwaway database file and reports
+p50/p99 latency for each profile in sqlite_profile.PROFILES
+
+Usage:
+    python benchmark_sqlite_profile.py [seconds] [writers] [readers]    # default: 5 4 8
+"""
+
+import sys
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, func, select, insert
+from sqlalchemy.exc import OperationalError
+
+from src.models.user import db
+from src.models.hospital import Hospital  # noqa: F401  (referenced by ServiceRequest foreign keys)
+from src.models.service_schedule import ServiceRequest
+from src.services.sqlite_profile import PROFILES, engine_options, apply_profile
+from src.services.sample_stats import percentile
+
+SERVICE_TYPES = ['emergency', 'cardiology', 'pediatrics', 'icu', 'dialysis']
+CITIES = ['Riyadh', 'Jeddah', 'Dammam', 'Jazan', 'Makkah']
+SEED_ROWS = 50000
+
+
+def make_row(rnd, when):
+    """صف طلب توجيه اصطناعي"""
+    return {
+        "service_type": rnd.choice(SERVICE_TYPES),
+        "patient_city": rnd.choice(CITIES),
+        "patient_latitude": rnd.uniform(16.5, 31.5),
+        "patient_longitude": rnd.uniform(36.5, 55.5),
+        "distance_km": rnd.uniform(0.5, 50),
+        "was_available": rnd.random() > 0.2,
+        "availability_status": rnd.choice(['available', 'limited', 'unavailable']),
+        "wait_time_minutes": rnd.randint(5, 90),
+        "request_datetime": when,
+    }
+
+
+def run_profile(name, seconds, writers, readers):
+    """تشغيل الحمل المتزامن على ملف قاعدة بيانات جديد"""
+    directory = tempfile.mkdtemp(prefix=f"wain_aroh_{name}_")
+    engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}", **engine_options(name))
+    apply_profile(engine, name)
+
+    table = ServiceRequest.__table__
+    db.metadata.create_all(engine)
+
+    rnd = random.Random(1)
+    start = datetime.utcnow() - timedelta(days=30)
+    with engine.begin() as connection:
+        connection.execute(insert(table), [
+            make_row(rnd, start + timedelta(seconds=i * 50)) for i in range(SEED_ROWS)
+        ])
+
+    write_ms, read_ms, errors = [], [], []
+    stop = threading.Event()
+    lock = threading.Lock()
+
+    def writer(seed):
+        local = random.Random(seed)
+        while not stop.is_set():
+            began = time.perf_counter()
+            try:
+                # One row per commit, like the synchronous routing log
+                with engine.begin() as connection:
+                    connection.execute(insert(table), [make_row(local, datetime.utcnow())])
+            except OperationalError as e:
+                with lock:
+                    errors.append(str(e.orig))
+                continue
+            with lock:
+                write_ms.append((time.perf_counter() - began) * 1000)
+
+    def reader(seed):
+        local = random.Random(seed)
+        while not stop.is_set():
+            since = datetime.utcnow() - timedelta(days=local.randint(1, 30))
+            query = select(table.c.service_type, func.count(table.c.id)).where(
+                table.c.request_datetime >= since
+            ).group_by(table.c.service_type)
+            began = time.perf_counter()
+            try:
+                with engine.connect() as connection:
+                    connection.execute(query).all()
+            except OperationalError as e:
+                with lock:
+                    errors.append(str(e.orig))
+                continue
+            with lock:
+                read_ms.append((time.perf_counter() - began) * 1000)
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=reader, args=(100 + i,)) for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    engine.dispose()
+    shutil.rmtree(directory, ignore_errors=True)
+
+    return {
+        "writes": len(write_ms),
+        "write_p50": percentile(write_ms, 50),
+        "write_p99": percentile(write_ms, 99),
+        "reads": len(read_ms),
+        "read_p50": percentile(read_ms, 50),
+        "read_p99": percentile(read_ms, 99),
+        "errors": len(errors),
+    }
+
+
+def format_ms(value):
+    """زمن بالمللي ثانية في عمود عرضه 9 (- إذا لم توجد عينات)"""
+    return f"{value:>9.1f}" if value is not None else f"{'-':>9}"
+
+
+def main():
+    args = [int(arg) for arg in sys.argv[1:]]
+    seconds = args[0] if len(args) > 0 else 5
+    writers = args[1] if len(args) > 1 else 4
+    readers = args[2] if len(args) > 2 else 8
+
+    print(f"\n📊 {seconds}s, {writers} writer / {readers} reader threads, {SEED_ROWS:,} seeded requests")
+    print(f"   {'profile':<12}{'writes':>8}{'w p50':>9}{'w p99':>9}{'reads':>8}{'r p50':>9}{'r p99':>9}{'errors':>8}")
+
+    for name in ['default'] + [profile for profile in PROFILES if profile != 'default']:
+        result = run_profile(name, seconds, writers, readers)
+        print(f"   {name:<12}{result['writes']:>8,}{format_ms(result['write_p50'])}{format_ms(result['write_p99'])}"
+              f"{result['reads']:>8,}{format_ms(result['read_p50'])}{format_ms(result['read_p99'])}{result['errors']:>8}")
+    print("   (latencies in ms)")
+
+
+if __name__ == '__main__':
+    main()
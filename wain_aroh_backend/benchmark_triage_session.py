@@ -0,0 +1,90 @@
+"""
+Benchmark: per-turn triage cost as a conversation gets longer
+Replays a long synthetic conversation (a patient repeating and rephrasing the
+same complaints) through AdvancedTriageEngine the way a conversation turn
+uses it (analyze_message, then calculate_final_ctas once complete), and
+compares it with the engine as it was (evidence lists extended every turn,
+CTAS recomputed on every call): CTAS level at every turn, time per turn early
+and late in the conversation, evidence held, and the size of the training
+record payload
+
+Usage:
+    python benchmark_triage_session.py [turns]    # default: 400
+"""
+
+import sys
+import os
+import json
+import time
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.services.advanced_triage_engine import AdvancedTriageEngine
+from src.services.sample_stats import percentile
+
+PATIENT_MESSAGES = [
+    "عندي ألم في الصدر من أمس",
+    "الألم ضاغط وينتشر إلى الذراع",
+    "عمري 55 سنة وعندي سكري",
+    "منذ 2 يوم والألم مستمر",
+    "أحس بتعرق وضيق في التنفس",
+    "الألم شديد الآن",
+    "عندي ألم في الصدر ضاغط",
+    "ما أقدر أنام من الألم",
+]
+
+
+class GrowingEvidenceEngine(AdvancedTriageEngine):
+    """The engine as it was: evidence lists extended every turn, so the CTAS is recomputed every time"""
+
+    def _add_evidence(self, field, items):
+        self.extracted_data[field].extend(items)
+        self.evidence_revision += 1
+        return len(items)
+
+
+def replay(engine, turns):
+    """
+    Time per turn (µs) and CTAS level per turn (None before the assessment is complete);
+    each turn is analyze_message plus calculate_final_ctas once complete
+    """
+    turn_us, levels = [], []
+    for turn in range(turns):
+        began = time.perf_counter()
+        analysis = engine.analyze_message(PATIENT_MESSAGES[turn % len(PATIENT_MESSAGES)])
+        level = engine.calculate_final_ctas()["ctas_level"] if analysis["assessment_complete"] else None
+        turn_us.append((time.perf_counter() - began) * 1e6)
+        levels.append(level)
+    return turn_us, levels
+
+
+def record_payload_bytes(engine):
+    """Size of the evidence part of a training record (_record_session)"""
+    data = engine.extracted_data
+    return len(json.dumps({field: data[field] for field in ("symptoms", "severity_indicators", "red_flags")},
+                          ensure_ascii=False).encode('utf-8'))
+
+
+def main():
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    window = max(1, turns // 10)
+
+    print(f"\n📊 {turns} turns; µs per turn over the first and last {window} turns")
+    print(f"   {'engine':<14}{'first p50':>10}{'last p50':>10}{'last p95':>10}"
+          f"{'symptoms':>10}{'severity':>10}{'flags':>7}{'record KB':>11}")
+    levels = {}
+    for name, engine_class in [("as it was", GrowingEvidenceEngine), ("incremental", AdvancedTriageEngine)]:
+        engine = engine_class()
+        turn_us, levels[name] = replay(engine, turns)
+        data = engine.extracted_data
+        print(f"   {name:<14}{percentile(turn_us[:window], 50):>10}{percentile(turn_us[-window:], 50):>10}"
+              f"{percentile(turn_us[-window:], 95):>10}{len(data['symptoms']):>10}"
+              f"{len(data['severity_indicators']):>10}{len(data['red_flags']):>7}"
+              f"{record_payload_bytes(engine) / 1024:>11.1f}")
+
+    mismatches = sum(1 for old, new in zip(*levels.values()) if old != new)
+    print(f"\n   CTAS level differs on {mismatches} of {turns} turns")
+    return mismatches
+
+
+if __name__ == '__main__':
+    sys.exit(1 if main() else 0)
@@ -0,0 +1,87 @@
+"""
+Prompt Budget Check
+Prints the region-scoped system prompt size per region, then plays a long
+synthetic conversation through ConversationContext and prints the prompt
+tokens of every turn next to the old full-history prompt; fails if any turn
+exceeds CONVERSATION_PROMPT_BUDGET
+
+Usage:
+    python check_prompt_budget.py [turns]      # default: 40; exit code 1 if a turn is over budget
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('OPENAI_API_KEY', 'check')  # no completions are made
+
+from src.main import app
+from src.services.conversational_ai import ConversationalAI, TURN_INSTRUCTIONS
+from src.services.conversation_context import count_message_tokens
+from src.services.region_detector import RegionDetector
+from src.services.system_prompt_builder import system_prompt_builder, STAGE_TEMPLATES
+
+PATIENT_MESSAGES = [
+    "عندي صداع شديد من أمس ومعه غثيان خفيف",
+    "الألم تقريباً ٧ من ١٠ ويزيد مع الضوء",
+    "لا يوجد حمى لكن أحس بدوخة أحياناً",
+    "أنا في جازان حي الروضة",
+    "هل أحتاج أروح الطوارئ أو يكفي مركز رعاية عاجلة؟",
+]
+ASSISTANT_REPLY = ("شكراً لك على التوضيح. بناءً على ما ذكرته، أحتاج أعرف بعض التفاصيل الإضافية حتى أوجهك "
+                   "للمكان المناسب: منذ متى بدأ الألم بالضبط؟ وهل تعاني من أي أمراض مزمنة؟ ") * 2
+
+
+def check_budget(turns):
+    """عدد التوكنات لكل دور؛ يعيد الأدوار التي تجاوزت الميزانية"""
+    ai = ConversationalAI()
+    budget = ai.context.token_budget
+    state = {
+        'messages': [], 'patient_data': {}, 'location': None, 'ctas_level': None,
+        'symptoms': [], 'stage': 'symptoms', 'location_requested': False, 'location_provided': False
+    }
+
+    print("\n🗺️  system prompt tokens per region and stage")
+    print(f"   {'region':<10}" + "".join(f"{stage:>16}" for stage in STAGE_TEMPLATES))
+    for code in ['unknown'] + list(RegionDetector.REGIONS):
+        print(f"   {code:<10}" + "".join(
+            f"{count_message_tokens([{'content': system_prompt_builder.build(code, stage)}]):>16,}"
+            for stage in STAGE_TEMPLATES
+        ))
+
+    print(f"\n📏 budget {budget} tokens, last {ai.context.keep_turns} turns verbatim")
+    print(f"   {'turn':>4}{'full history':>14}{'bounded':>10}{'folded msgs':>13}")
+
+    over = []
+    for turn in range(1, turns + 1):
+        text = PATIENT_MESSAGES[turn % len(PATIENT_MESSAGES)]
+        if turn % 10 == 0:
+            text *= 40  # an occasional very long message
+        state['messages'].append({'role': 'user', 'content': text})
+        if turn == 3:
+            state['symptoms'] = ['صداع', 'غثيان', 'دوخة']
+            state['ctas_level'] = 3
+        if turn == 4:
+            state['region'] = RegionDetector.detect_region(city='جازان')
+        system_prompt = system_prompt_builder.build((state.get('region') or {}).get('code'), state['stage'])
+
+        full = count_message_tokens(
+            [{'content': system_prompt}] + state['messages'] + [{'content': TURN_INSTRUCTIONS}]
+        )
+        _, bounded = ai.context.build(system_prompt, state, [TURN_INSTRUCTIONS])
+        if bounded > budget:
+            over.append(turn)
+
+        if turn <= 5 or turn % 5 == 0:
+            print(f"   {turn:>4}{full:>14,}{bounded:>10,}{state.get('context_folded', 0):>13}")
+        state['messages'].append({'role': 'assistant', 'content': ASSISTANT_REPLY})
+
+    return over
+
+
+if __name__ == '__main__':
+    with app.app_context():
+        over_budget = check_budget(int(sys.argv[1]) if len(sys.argv) > 1 else 40)
+    if over_budget:
+        print(f"\n❌ Turns over budget: {over_budget}")
+        sys.exit(1)
+    print("\n✅ Every turn within the prompt budget")
@@ -0,0 +1,115 @@
+"""
+Query Count Check
+Calls the hospital listing endpoints and fails if any issues more queries than
+its budget (the budgets do not grow with the number of hospitals, so an N+1
+regression exceeds them as soon as there are a few facilities)
+
+Runs against a temporary database (DATABASE_URL) seeded with SEED_HOSPITALS
+hospitals, each with an organization, a cluster, catalog services and service
+configurations, so the result does not depend on what app.db contains.
+
+Usage:
+    python check_query_counts.py      # exit code 1 if an endpoint exceeds its budget
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+sys.path.insert(0, os.path.dirname(__file__))
+
+# A directory, so the WAL and shared-memory files go with it
+_database_dir = tempfile.mkdtemp(prefix='query_counts_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_database_dir, 'app.db')}"
+
+from src.main import app
+from src.models.user import db
+from src.models.hospital import Hospital, Organization, RiyadhCluster, Service, ServiceCategory
+from src.models.service_schedule import HospitalService
+from src.services.query_counter import assert_max_queries
+
+SEED_HOSPITALS = 6
+SERVICES_PER_HOSPITAL = 3
+CATALOG_SERVICES = SERVICES_PER_HOSPITAL * 2
+
+# (endpoint, max queries, expected rows) - one query for the rows plus one per selectin-loaded collection
+BUDGETS = [
+    ('/api/admin/hospitals', 1, ('hospitals', SEED_HOSPITALS)),
+    ('/api/admin/hospitals?include_services=true', 2, ('hospitals', SEED_HOSPITALS)),
+    ('/api/admin/services', 1, ('services', CATALOG_SERVICES)),
+]
+
+
+def seed():
+    """Hospitals spread over two organizations and two clusters, with services"""
+    organizations = [
+        Organization(name_ar=f'جهة {i}', name_en=f'Organization {i}', type='ministry') for i in range(2)
+    ]
+    clusters = [
+        RiyadhCluster(name_ar=f'تجمع {i}', name_en=f'Cluster {i}', cluster_number=i + 1) for i in range(2)
+    ]
+    categories = [ServiceCategory(name_ar=f'فئة {i}', name_en=f'Category {i}') for i in range(2)]
+    catalog = [
+        Service(name_ar=f'خدمة {i}', name_en=f'Service {i}', category=categories[i % 2])
+        for i in range(CATALOG_SERVICES)
+    ]
+    db.session.add_all(organizations + clusters + categories + catalog)
+
+    for i in range(SEED_HOSPITALS):
+        hospital = Hospital(
+            name_ar=f'مستشفى {i}', name_en=f'Hospital {i}', facility_type='hospital',
+            organization=organizations[i % 2], cluster=clusters[i % 2],
+            latitude=24.7 + i / 100, longitude=46.6 + i / 100
+        )
+        hospital.services = catalog[i % 2::2][:SERVICES_PER_HOSPITAL]
+        db.session.add(hospital)
+        for j in range(SERVICES_PER_HOSPITAL):
+            db.session.add(HospitalService(
+                hospital=hospital, service_type='emergency',
+                service_name_ar=f'خدمة {j}', service_name_en=f'Service {j}'
+            ))
+    db.session.commit()
+
+
+def check_counts():
+    """Run every endpoint under its budget; return the failures"""
+    failures = []
+    client = app.test_client()
+
+    with app.app_context():
+        seed()
+        hospital = Hospital.query.first()
+        budgets = list(BUDGETS) + [(f'/api/admin/hospitals/{hospital.id}', 2, None)]
+        print(f"🏥 {Hospital.query.count()} hospitals in database")
+
+        for endpoint, limit, expected in budgets:
+            db.session.remove()  # start each request with an empty identity map
+            try:
+                with assert_max_queries(db.engine, limit) as counter:
+                    response = client.get(endpoint)
+            except AssertionError as e:
+                print(f"❌ {endpoint}: {e}")
+                failures.append(endpoint)
+                continue
+
+            # A budget met by an error or an empty listing checks nothing
+            rows = None
+            if expected and response.status_code == 200:
+                rows = len(response.get_json().get(expected[0]) or [])
+            if response.status_code != 200 or (expected and rows < expected[1]):
+                print(f"❌ {endpoint}: HTTP {response.status_code}, {rows} rows - nothing was checked")
+                failures.append(endpoint)
+                continue
+            print(f"✅ {endpoint}: {counter.count} queries (budget {limit}, HTTP {response.status_code})")
+
+    return failures
+
+if __name__ == '__main__':
+    try:
+        failed = check_counts()
+    finally:
+        shutil.rmtree(_database_dir, ignore_errors=True)
+    if failed:
+        print(f"\n❌ {len(failed)} endpoints exceed their query budget or returned nothing to check")
+        sys.exit(1)
+    print("\n✅ All listing endpoints within their query budget")
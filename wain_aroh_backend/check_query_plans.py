@@ -0,0 +1,112 @@
+"""
+Query Plan Check
+Runs EXPLAIN QUERY PLAN on the hot routing/availability/analytics queries and
+fails if any of them falls back to a full table scan (missing or unused index)
+
+Usage:
+    python check_query_plans.py      # exit code 1 if a hot query scans a table
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+from datetime import datetime, timedelta
+
+from src.main import app
+from src.models.user import db
+from src.models.hospital import Hospital
+from src.models.service_schedule import (
+    HospitalService, ServiceSchedule, ScheduleOverride, ServiceRequest,
+    ServiceRequestHourlyRollup, ServiceAvailabilityInterval
+)
+
+
+def hot_queries():
+    """The queries that run on every routing, availability or dashboard request"""
+    now = datetime(2025, 1, 1, 12, 0)
+    week_ago = now - timedelta(days=7)
+    service_ids = [1, 2, 3]
+
+    return {
+        "router: services by type": db.session.query(HospitalService, Hospital).join(
+            Hospital, HospitalService.hospital_id == Hospital.id
+        ).filter(
+            HospitalService.service_type == "emergency",
+            HospitalService.is_active == True,
+            Hospital.is_active == True
+        ),
+        "availability: active overrides": ScheduleOverride.query.filter(
+            ScheduleOverride.service_id.in_(service_ids),
+            ScheduleOverride.is_active == True,
+            ScheduleOverride.start_datetime <= now,
+            ScheduleOverride.end_datetime >= now
+        ).order_by(ScheduleOverride.id),
+        "availability: active schedules": ServiceSchedule.query.filter(
+            ServiceSchedule.service_id.in_(service_ids),
+            ServiceSchedule.is_active == True
+        ).order_by(ServiceSchedule.priority.desc(), ServiceSchedule.id),
+        "availability: calendar lookup": ServiceAvailabilityInterval.query.filter(
+            ServiceAvailabilityInterval.service_id.in_(service_ids),
+            ServiceAvailabilityInterval.start_datetime <= now,
+            ServiceAvailabilityInterval.end_datetime > now
+        ),
+        "analytics: requests by date": ServiceRequest.query.filter(
+            ServiceRequest.request_datetime >= week_ago,
+            ServiceRequest.request_datetime <= now
+        ),
+        "analytics: requests by service type": ServiceRequest.query.filter(
+            ServiceRequest.service_type == "emergency",
+            ServiceRequest.request_datetime >= week_ago
+        ),
+        "analytics: requests by city": ServiceRequest.query.filter(
+            ServiceRequest.patient_city == "Riyadh",
+            ServiceRequest.request_datetime >= week_ago
+        ),
+        "analytics: hourly rollup range": ServiceRequestHourlyRollup.query.filter(
+            ServiceRequestHourlyRollup.hour_start >= week_ago,
+            ServiceRequestHourlyRollup.hour_start < now
+        ),
+        "hospitals by city": Hospital.query.filter(Hospital.city == "Riyadh"),
+        "hospitals by facility type": Hospital.query.filter_by(facility_type="hospital"),
+    }
+
+
+def explain(query):
+    """EXPLAIN QUERY PLAN detail lines for an ORM query"""
+    compiled = query.statement.compile(
+        dialect=db.engine.dialect, compile_kwargs={"render_postcompile": True}
+    )
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    with db.engine.connect() as connection:
+        rows = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + compiled.string, params)
+        return [row[-1] for row in rows]
+
+
+def full_scans(plan):
+    """Plan lines that read a whole table (SQLite reports SEARCH when an index narrows the read)"""
+    return [line for line in plan if line.startswith("SCAN ") and "CONSTANT ROW" not in line]
+
+
+def check_plans():
+    """Explain every hot query; return the names of those that scan a table"""
+    failures = []
+
+    with app.app_context():
+        for name, query in hot_queries().items():
+            plan = explain(query)
+            scans = full_scans(plan)
+            print(f"{'❌' if scans else '✅'} {name}")
+            for line in plan:
+                print(f"      {line}")
+            if scans:
+                failures.append(name)
+
+    return failures
+
+if __name__ == '__main__':
+    failed = check_plans()
+    if failed:
+        print(f"\n❌ {len(failed)} hot queries fall back to a full table scan: {', '.join(failed)}")
+        sys.exit(1)
+    print("\n✅ All hot queries use an index")
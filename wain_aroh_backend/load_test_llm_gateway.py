@@ -0,0 +1,74 @@
+"""
+Load Test: the conversation API under concurrent patients, fully offline
+Runs with LLM_PROVIDER=stub (deterministic local model backend with a simulated
+latency), so no API key or network is needed, and prints request latency next
+to the LLM gateway stats (in-flight limit, retries, circuit state, tokens)
+
+Usage:
+    python load_test_llm_gateway.py [patients] [turns] [ttft_ms] [ms_per_token]    # default: 32 4 300 10
+    LLM_STUB_FAIL_EVERY=7 python load_test_llm_gateway.py                             # inject transient failures
+"""
+
+import sys
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+args = [int(arg) for arg in sys.argv[1:]]
+PATIENTS = args[0] if len(args) > 0 else 32
+TURNS = args[1] if len(args) > 1 else 4
+os.environ['LLM_PROVIDER'] = 'stub'
+os.environ.setdefault('LLM_STUB_TTFT_MS', str(args[2] if len(args) > 2 else 300))
+os.environ.setdefault('LLM_STUB_MS_PER_TOKEN', str(args[3] if len(args) > 3 else 10))
+
+from src.main import app
+from src.services.llm_gateway import llm_gateway
+from src.services.sample_stats import percentile
+
+PATIENT_MESSAGES = [
+    "عندي صداع من أمس",
+    "الألم متوسط تقريباً ٦ من ١٠",
+    "لا يوجد حمى",
+    "أنا في الرياض حي النخيل",
+]
+
+
+def run_patient(index):
+    """محادثة كاملة لمريض واحد؛ يعيد زمن كل رسالة ورموز الحالة"""
+    client = app.test_client()
+    session_id = client.post('/api/conversation/start', json={}).get_json()['session_id']
+    latencies, statuses = [], []
+    for turn in range(TURNS):
+        began = time.perf_counter()
+        response = client.post('/api/conversation/message', json={
+            'session_id': session_id,
+            'message': PATIENT_MESSAGES[turn % len(PATIENT_MESSAGES)],
+        })
+        latencies.append((time.perf_counter() - began) * 1000)
+        statuses.append(response.status_code)
+    return latencies, statuses
+
+
+def main():
+    print(f"\n📊 {PATIENTS} concurrent patients x {TURNS} turns; stub model "
+          f"{os.environ['LLM_STUB_TTFT_MS']} ms + {os.environ['LLM_STUB_MS_PER_TOKEN']} ms/token; "
+          f"gateway concurrency {llm_gateway.max_concurrency}")
+
+    began = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=PATIENTS) as pool:
+        results = list(pool.map(run_patient, range(PATIENTS)))
+    elapsed = time.perf_counter() - began
+
+    latencies = [ms for patient, _ in results for ms in patient]
+    failed = sum(1 for _, statuses in results for status in statuses if status != 200)
+    print(f"   {len(latencies)} messages in {elapsed:.1f} s ({len(latencies) / elapsed:.1f}/s), {failed} failed")
+    print(f"   message latency p50 {percentile(latencies, 50)} ms, p95 {percentile(latencies, 95)} ms, "
+          f"p99 {percentile(latencies, 99)} ms")
+    print("\n🔌 LLM gateway")
+    print(json.dumps(llm_gateway.stats(), ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
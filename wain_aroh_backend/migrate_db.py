@@ -0,0 +1,47 @@
+"""
+Database Migrations
+Upgrade an existing app.db in place (also runs automatically at app startup)
+
+Usage:
+    python migrate_db.py            # apply pending migrations
+    python migrate_db.py --status   # list applied and pending migrations
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.main import app
+from src.models.user import db
+from src.migrations.runner import applied_versions, pending_migrations, upgrade, current_version
+from src.migrations.versions import MIGRATIONS
+
+
+def show_status():
+    """Print applied and pending migrations"""
+    
+    with app.app_context():
+        applied = applied_versions(db.engine)
+        print(f"🗄️  Schema version: {current_version(db.engine)}")
+        for version, name, _ in sorted(MIGRATIONS):
+            mark = "✅" if version in applied else "⏳"
+            print(f"   {mark} {version:04d} {name}")
+
+
+def migrate():
+    """Apply pending migrations"""
+    
+    with app.app_context():
+        pending = pending_migrations(db.engine)
+        if not pending:
+            print(f"✅ Database is up to date (version {current_version(db.engine)})")
+            return
+        
+        applied = upgrade(db.engine)
+        print(f"✅ Applied {len(applied)} migrations, now at version {current_version(db.engine)}")
+
+if __name__ == '__main__':
+    if '--status' in sys.argv:
+        show_status()
+    else:
+        migrate()
@@ -0,0 +1,33 @@
+"""
+Refresh Availability Calendar
+Regenerate the materialized service availability calendar (run daily from cron so the window keeps rolling forward)
+
+Usage:
+    python refresh_availability_calendar.py               # every service
+    python refresh_availability_calendar.py 12 15 ...     # only these service ids
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.main import app
+from src.services.availability_calendar import availability_calendar
+
+
+def refresh_calendar(service_ids=None):
+    """Regenerate availability intervals"""
+    
+    with app.app_context():
+        print("📅 Regenerating availability calendar...")
+        
+        timelines = availability_calendar.regenerate(service_ids)
+        intervals = sum(len(segments) for segments in timelines.values())
+        
+        window_start, window_end = availability_calendar.window()
+        print(f"✅ Stored {intervals} intervals for {len(timelines)} services")
+        print(f"   Window: {window_start.isoformat()} → {window_end.isoformat()}")
+
+if __name__ == '__main__':
+    ids = [int(arg) for arg in sys.argv[1:]] or None
+    refresh_calendar(ids)
@@ -0,0 +1,30 @@
+"""
+Refresh Routing Rollup
+Fold newly logged routing requests into the hourly analytics rollup (run from cron;
+the request-log flusher also syncs after every batch it writes)
+
+Usage:
+    python refresh_routing_rollup.py              # fold rows logged since the last sync
+    python refresh_routing_rollup.py --rebuild    # recompute the whole rollup
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.main import app
+from src.services.routing_rollup import routing_rollup_store
+
+
+def refresh_rollup(rebuild=False):
+    """Sync (or rebuild) the hourly rollup"""
+    
+    with app.app_context():
+        print("📊 Rebuilding routing rollup..." if rebuild else "📊 Syncing routing rollup...")
+        
+        rows = routing_rollup_store.rebuild() if rebuild else routing_rollup_store.sync()
+        
+        print(f"✅ Rolled up {rows} routing requests")
+
+if __name__ == '__main__':
+    refresh_rollup('--rebuild' in sys.argv[1:])
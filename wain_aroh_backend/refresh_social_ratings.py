@@ -0,0 +1,38 @@
+"""
+Refresh Social Rating Aggregates
+Recompute the materialized per-facility rating aggregates (run from cron or after ingesting reviews)
+
+Usage:
+    python refresh_social_ratings.py            # refresh every facility
+    python refresh_social_ratings.py --stale    # only missing or expired aggregates
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.main import app
+from src.services.social_rating_store import social_rating_store
+from src.services.facility_snapshot import facility_snapshot_store
+
+
+def refresh_ratings(stale_only=False):
+    """Recompute rating aggregates"""
+    
+    with app.app_context():
+        print("⭐ Refreshing social rating aggregates...")
+        
+        if stale_only:
+            count = social_rating_store.ensure_fresh()
+        else:
+            count = social_rating_store.refresh()
+        
+        if count:
+            # Every worker rebuilds its facility snapshot with the new aggregates
+            facility_snapshot_store.invalidate()
+        
+        print(f"✅ Updated {count} facility aggregates")
+        print(f"   TTL: {social_rating_store.ttl_seconds} seconds")
+
+if __name__ == '__main__':
+    refresh_ratings(stale_only='--stale' in sys.argv)
@@ -58,11 +58,24 @@ app.register_blueprint(schedule_admin_api)
 app.register_blueprint(routing_api)
 
 # uncomment if you need to use database
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
+    'DATABASE_URL', f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# SQLite pragmas (WAL, busy timeout, ...) and pool settings, see SQLITE_PROFILE
+from src.services.sqlite_profile import engine_options, apply_profile
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options()
 db.init_app(app)
 with app.app_context():
+    apply_profile(db.engine)
     db.create_all()
+    # Bring existing databases up to the current indexes
+    from src.migrations.runner import upgrade
+    upgrade(db.engine)
+
+# Batched write-behind for routing request logs
+from src.services.request_log_buffer import request_log_buffer
+request_log_buffer.init_app(app)
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
@@ -0,0 +1,75 @@
+"""
+Schema Migration Runner
+Applies pending migrations from versions.MIGRATIONS and records them in schema_migrations
+"""
+
+from datetime import datetime
+from typing import Dict, List
+
+from sqlalchemy import text
+
+from .versions import MIGRATIONS
+
+
+def _ensure_table(connection):
+    """Create the bookkeeping table if missing"""
+    connection.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, "
+        "name VARCHAR(200) NOT NULL, "
+        "applied_at DATETIME NOT NULL)"
+    ))
+
+
+def applied_versions(engine) -> Dict[int, str]:
+    """Versions already applied to the database, mapped to their name"""
+    with engine.begin() as connection:
+        _ensure_table(connection)
+        rows = connection.execute(text("SELECT version, name FROM schema_migrations"))
+        return {version: name for version, name in rows}
+
+
+def pending_migrations(engine) -> List[tuple]:
+    """Migrations not applied yet, in version order"""
+    applied = applied_versions(engine)
+    return [migration for migration in sorted(MIGRATIONS) if migration[0] not in applied]
+
+
+def upgrade(engine) -> List[int]:
+    """
+    Apply every pending migration, each in its own transaction
+
+    Call after db.create_all(): tables are created from the models, and
+    migrations bring older databases up to the same indexes and columns.
+
+    Returns:
+        Versions applied by this call
+    """
+    applied = []
+
+    for version, name, statements in pending_migrations(engine):
+        with engine.begin() as connection:
+            # Another process may have applied it since we looked
+            already = connection.execute(
+                text("SELECT 1 FROM schema_migrations WHERE version = :version"),
+                {"version": version}
+            ).first()
+            if already:
+                continue
+
+            for statement in statements:
+                connection.execute(text(statement))
+
+            connection.execute(
+                text("INSERT INTO schema_migrations (version, name, applied_at) "
+                     "VALUES (:version, :name, :applied_at)"),
+                {"version": version, "name": name, "applied_at": datetime.utcnow()}
+            )
+        applied.append(version)
+
+    return applied
+
+
+def current_version(engine) -> int:
+    """Highest applied migration version (0 for a database never migrated)"""
+    return max(applied_versions(engine), default=0)
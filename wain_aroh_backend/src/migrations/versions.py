@@ -0,0 +1,41 @@
+"""
+Schema Migrations
+Ordered list of in-place upgrades for existing app.db files
+
+Each migration is (version, name, statements). Versions only ever grow;
+never edit a migration that has shipped, add a new one instead. Index
+names match the ones declared on the models so fresh databases created
+by db.create_all() and upgraded ones end up with the same schema.
+"""
+
+MIGRATIONS = [
+    (
+        1,
+        "hot_path_indexes",
+        [
+            # IntelligentRouter: services by type, active only
+            "CREATE INDEX IF NOT EXISTS ix_service_configurations_type_active "
+            "ON service_configurations (service_type, is_active)",
+
+            # Availability: active schedules per service, by priority
+            "CREATE INDEX IF NOT EXISTS ix_service_schedules_service_active_priority "
+            "ON service_schedules (service_id, is_active, priority)",
+
+            # Availability: active overrides per service covering a datetime
+            "CREATE INDEX IF NOT EXISTS ix_schedule_overrides_service_active_window "
+            "ON schedule_overrides (service_id, is_active, start_datetime, end_datetime)",
+
+            # Routing analytics: date range, optionally per service type or city
+            "CREATE INDEX IF NOT EXISTS ix_service_requests_request_datetime "
+            "ON service_requests (request_datetime)",
+            "CREATE INDEX IF NOT EXISTS ix_service_requests_type_datetime "
+            "ON service_requests (service_type, request_datetime)",
+            "CREATE INDEX IF NOT EXISTS ix_service_requests_city_datetime "
+            "ON service_requests (patient_city, request_datetime)",
+
+            # Facility listings by city and type
+            "CREATE INDEX IF NOT EXISTS ix_hospitals_city ON hospitals (city)",
+            "CREATE INDEX IF NOT EXISTS ix_hospitals_facility_type ON hospitals (facility_type)",
+        ],
+    ),
+]
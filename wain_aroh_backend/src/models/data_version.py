@@ -0,0 +1,19 @@
+"""
+Data Version Model
+عدادات إصدار البيانات المشتركة بين العمليات
+"""
+
+from src.models.user import db
+from datetime import datetime
+
+
+class DataVersion(db.Model):
+    """Counter bumped on every write to a data set, read by per-process caches of that data"""
+    __tablename__ = 'data_versions'
+    
+    name = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<DataVersion {self.name} @ {self.version}>"
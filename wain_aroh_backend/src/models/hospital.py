@@ -4,6 +4,7 @@ Hospital and Healthcare Facility Models
 
 from src.models.user import db
 from datetime import datetime
+from sqlalchemy.orm import joinedload, selectinload, lazyload
 
 class Organization(db.Model):
     """Healthcare organization/entity"""
@@ -96,6 +97,11 @@ class Service(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    @staticmethod
+    def load_options():
+        """Loader options for listings serialized with to_dict (category joined)"""
+        return [joinedload(Service.category)]
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -125,6 +131,10 @@ hospital_services = db.Table('hospital_services',
 class Hospital(db.Model):
     """Healthcare facilities"""
     __tablename__ = 'hospitals'
+    __table_args__ = (
+        db.Index('ix_hospitals_city', 'city'),
+        db.Index('ix_hospitals_facility_type', 'facility_type'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name_ar = db.Column(db.String(200), nullable=False)
@@ -169,6 +179,28 @@ class Hospital(db.Model):
     services = db.relationship('Service', secondary=hospital_services, lazy='subquery',
                               backref=db.backref('hospitals', lazy=True))
     
+    @staticmethod
+    def load_options(include_organization=True, include_cluster=True, include_services=False):
+        """
+        Loader options for hospital listings, chosen by the fields that will be read
+        
+        Organization and cluster are many-to-one, so they are joined into the
+        main query. Services are many-to-many, so they are loaded with one
+        extra IN query (with their categories joined), and skipped entirely
+        when not requested instead of following the relationship's default
+        subquery load.
+        """
+        options = []
+        if include_organization:
+            options.append(joinedload(Hospital.organization))
+        if include_cluster:
+            options.append(joinedload(Hospital.cluster))
+        if include_services:
+            options.append(selectinload(Hospital.services).joinedload(Service.category))
+        else:
+            options.append(lazyload(Hospital.services))
+        return options
+    
     def to_dict(self, include_services=False):
         result = {
             'id': self.id,
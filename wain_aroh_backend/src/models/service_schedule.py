@@ -3,9 +3,11 @@ Service Schedule and On-Call Coverage Models
 Manages hospital services, schedules, and real-time availability
 """
 
-from datetime import datetime, time
+from bisect import bisect_right
+from datetime import datetime, time, timedelta
 from enum import Enum
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Time, Date, ForeignKey, Text, JSON, Float
+from typing import Optional
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Time, Date, ForeignKey, Text, JSON, Float, Index
 from sqlalchemy.orm import relationship
 from .user import db
 
@@ -49,6 +51,9 @@ class AvailabilityStatus(str, Enum):
 class HospitalService(db.Model):
     """Hospital services configuration"""
     __tablename__ = 'service_configurations'
+    __table_args__ = (
+        Index('ix_service_configurations_type_active', 'service_type', 'is_active'),
+    )
     
     id = Column(Integer, primary_key=True)
     hospital_id = Column(Integer, ForeignKey('hospitals.id'), nullable=False)
@@ -84,6 +89,9 @@ class HospitalService(db.Model):
 class ServiceSchedule(db.Model):
     """Service schedules and on-call coverage"""
     __tablename__ = 'service_schedules'
+    __table_args__ = (
+        Index('ix_service_schedules_service_active_priority', 'service_id', 'is_active', 'priority'),
+    )
     
     id = Column(Integer, primary_key=True)
     service_id = Column(Integer, ForeignKey('service_configurations.id'), nullable=False)
@@ -129,6 +137,10 @@ class ServiceSchedule(db.Model):
 class ScheduleOverride(db.Model):
     """Temporary schedule overrides (e.g., emergency closures, special events)"""
     __tablename__ = 'schedule_overrides'
+    __table_args__ = (
+        Index('ix_schedule_overrides_service_active_window',
+              'service_id', 'is_active', 'start_datetime', 'end_datetime'),
+    )
     
     id = Column(Integer, primary_key=True)
     service_id = Column(Integer, ForeignKey('service_configurations.id'), nullable=False)
@@ -195,9 +207,38 @@ class ServiceAvailabilityLog(db.Model):
     def __repr__(self):
         return f"<ServiceAvailabilityLog {self.change_type} at {self.created_at}>"
 
+class ServiceAvailabilityInterval(db.Model):
+    """Materialized availability calendar: one row per constant-status interval"""
+    __tablename__ = 'service_availability_calendar'
+    __table_args__ = (
+        Index('ix_availability_calendar_service_start', 'service_id', 'start_datetime'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    service_id = Column(Integer, ForeignKey('service_configurations.id'), nullable=False)
+    
+    # Half-open interval [start_datetime, end_datetime)
+    start_datetime = Column(DateTime, nullable=False)
+    end_datetime = Column(DateTime, nullable=False)
+    
+    # Availability during the interval
+    available = Column(Boolean, nullable=False)
+    status = Column(String(20), nullable=False)
+    result = Column(JSON, nullable=False)  # Full is_service_available result
+    
+    generated_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<ServiceAvailabilityInterval {self.status} for Service {self.service_id} from {self.start_datetime}>"
+
 class ServiceRequest(db.Model):
     """Track patient service requests for analytics"""
     __tablename__ = 'service_requests'
+    __table_args__ = (
+        Index('ix_service_requests_request_datetime', 'request_datetime'),
+        Index('ix_service_requests_type_datetime', 'service_type', 'request_datetime'),
+        Index('ix_service_requests_city_datetime', 'patient_city', 'request_datetime'),
+    )
     
     id = Column(Integer, primary_key=True)
     
@@ -237,6 +278,42 @@ class ServiceRequest(db.Model):
     def __repr__(self):
         return f"<ServiceRequest {self.service_type} at {self.request_datetime}>"
 
+class ServiceRequestHourlyRollup(db.Model):
+    """Hourly pre-aggregated ServiceRequest counters for analytics dashboards"""
+    __tablename__ = 'service_request_hourly_rollups'
+    
+    id = Column(Integer, primary_key=True)
+    
+    # Dimensions
+    hour_start = Column(DateTime, nullable=False, index=True)
+    service_type = Column(String(50))
+    patient_city = Column(String(100))
+    availability_status = Column(String(20))
+    
+    # Measures
+    request_count = Column(Integer, nullable=False, default=0)
+    available_count = Column(Integer, nullable=False, default=0)
+    accepted_count = Column(Integer, nullable=False, default=0)
+    distance_sum = Column(Float, nullable=False, default=0.0)
+    wait_time_sum = Column(Integer, nullable=False, default=0)
+    wait_time_count = Column(Integer, nullable=False, default=0)
+    
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<ServiceRequestHourlyRollup {self.service_type} at {self.hour_start}>"
+
+class AnalyticsRollupState(db.Model):
+    """High-water mark of source rows already folded into a rollup table"""
+    __tablename__ = 'analytics_rollup_state'
+    
+    name = Column(String(100), primary_key=True)
+    last_source_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<AnalyticsRollupState {self.name} @ {self.last_source_id}>"
+
 # Helper function to check if a service is available at a specific datetime
 def is_service_available(service_id: int, check_datetime: datetime = None) -> dict:
     """
@@ -249,11 +326,99 @@ def is_service_available(service_id: int, check_datetime: datetime = None) -> di
     Returns:
         dict with keys: available (bool), status (str), reason (str), alternative (dict)
     """
+    return evaluate_availability([service_id], check_datetime)[service_id]
+
+def evaluate_availability(service_ids, check_datetime: datetime = None, services: dict = None) -> dict:
+    """
+    Check availability of many services at once
+    
+    Loads the active overrides and schedules of all services in two queries
+    (plus one for the services themselves unless they are passed in) and
+    resolves each service in memory with the same priority rules as
+    is_service_available: override first, then schedules by priority.
+    
+    Args:
+        service_ids: IDs of the hospital services
+        check_datetime: DateTime to check (default: now)
+        services: Optional dict of already loaded HospitalService by id
+    
+    Returns:
+        dict mapping service_id to the is_service_available result
+    """
     if check_datetime is None:
         check_datetime = datetime.now()
     
-    # Get service
-    service = HospitalService.query.get(service_id)
+    service_ids = list(dict.fromkeys(service_ids))
+    if not service_ids:
+        return {}
+    
+    if services is None:
+        services = {
+            service.id: service
+            for service in HospitalService.query.filter(HospitalService.id.in_(service_ids))
+        }
+    
+    # Active overrides covering the datetime (first one per service wins)
+    overrides = {}
+    for override in ScheduleOverride.query.filter(
+        ScheduleOverride.service_id.in_(service_ids),
+        ScheduleOverride.is_active == True,
+        ScheduleOverride.start_datetime <= check_datetime,
+        ScheduleOverride.end_datetime >= check_datetime
+    ).order_by(ScheduleOverride.id):
+        overrides.setdefault(override.service_id, override)
+    
+    # Active schedules, ordered by priority within each service
+    schedules = {}
+    for schedule in ServiceSchedule.query.filter(
+        ServiceSchedule.service_id.in_(service_ids),
+        ServiceSchedule.is_active == True
+    ).order_by(ServiceSchedule.priority.desc(), ServiceSchedule.id):
+        schedules.setdefault(schedule.service_id, []).append(schedule)
+    
+    return {
+        service_id: resolve_availability(
+            services.get(service_id),
+            overrides.get(service_id),
+            schedules.get(service_id, []),
+            check_datetime
+        )
+        for service_id in service_ids
+    }
+
+def schedule_applies(schedule: ServiceSchedule, check_datetime: datetime) -> bool:
+    """Check whether a schedule covers a specific datetime"""
+    check_date = check_datetime.date()
+    
+    if schedule.schedule_type == "temporary":
+        # Temporary schedule with date range
+        if schedule.start_date and schedule.end_date:
+            return schedule.start_date <= check_date <= schedule.end_date
+        return False
+    elif schedule.schedule_type == "holiday":
+        # Holiday schedule with date range
+        if schedule.start_date and schedule.end_date:
+            return schedule.start_date <= check_date <= schedule.end_date
+        return False
+    
+    # Regular or on-call schedule
+    if schedule.day_of_week is None or schedule.day_of_week == check_datetime.weekday():
+        if schedule.start_time and schedule.end_time:
+            return schedule.start_time <= check_datetime.time() <= schedule.end_time
+        # No time restriction = all day
+        return True
+    return False
+
+def resolve_availability(service, override, schedules, check_datetime: datetime) -> dict:
+    """
+    Resolve availability from already loaded rows
+    
+    Args:
+        service: HospitalService (or None if not found)
+        override: Active ScheduleOverride covering the datetime, if any
+        schedules: Active ServiceSchedule rows ordered by priority (highest first)
+        check_datetime: DateTime to check
+    """
     if not service or not service.is_active:
         return {
             "available": False,
@@ -263,13 +428,6 @@ def is_service_available(service_id: int, check_datetime: datetime = None) -> di
         }
     
     # Check for active overrides (highest priority)
-    override = ScheduleOverride.query.filter(
-        ScheduleOverride.service_id == service_id,
-        ScheduleOverride.is_active == True,
-        ScheduleOverride.start_datetime <= check_datetime,
-        ScheduleOverride.end_datetime >= check_datetime
-    ).first()
-    
     if override:
         return {
             "available": override.availability_status == "available",
@@ -282,41 +440,8 @@ def is_service_available(service_id: int, check_datetime: datetime = None) -> di
         }
     
     # Check regular schedules
-    day_of_week = check_datetime.weekday()
-    check_time = check_datetime.time()
-    check_date = check_datetime.date()
-    
-    # Get applicable schedules (ordered by priority)
-    schedules = ServiceSchedule.query.filter(
-        ServiceSchedule.service_id == service_id,
-        ServiceSchedule.is_active == True
-    ).order_by(ServiceSchedule.priority.desc()).all()
-    
     for schedule in schedules:
-        # Check if schedule applies to this datetime
-        applies = False
-        
-        if schedule.schedule_type == "temporary":
-            # Temporary schedule with date range
-            if schedule.start_date and schedule.end_date:
-                if schedule.start_date <= check_date <= schedule.end_date:
-                    applies = True
-        elif schedule.schedule_type == "holiday":
-            # Holiday schedule with date range
-            if schedule.start_date and schedule.end_date:
-                if schedule.start_date <= check_date <= schedule.end_date:
-                    applies = True
-        else:
-            # Regular or on-call schedule
-            if schedule.day_of_week is None or schedule.day_of_week == day_of_week:
-                if schedule.start_time and schedule.end_time:
-                    if schedule.start_time <= check_time <= schedule.end_time:
-                        applies = True
-                else:
-                    # No time restriction = all day
-                    applies = True
-        
-        if applies:
+        if schedule_applies(schedule, check_datetime):
             return {
                 "available": schedule.availability_status in ["available", "limited"],
                 "status": schedule.availability_status,
@@ -337,3 +462,131 @@ def is_service_available(service_id: int, check_datetime: datetime = None) -> di
         "reason": "No active schedule for this time",
         "alternative": None
     }
+
+# Smallest step past an inclusive end bound (end times/datetimes are inclusive)
+_TICK = timedelta(microseconds=1)
+
+def availability_timelines(service_ids, range_start: datetime, range_end: datetime,
+                           services: dict = None) -> dict:
+    """
+    Availability segments for many services over [range_start, range_end)
+    
+    Loads services, schedules and overlapping overrides once (three queries),
+    collects every instant at which a schedule window, a schedule date range,
+    a day of week or an override begins or ends, and resolves availability
+    once per interval between consecutive boundaries. Adjacent intervals
+    with the same result are merged.
+    
+    Args:
+        service_ids: IDs of the hospital services
+        range_start: Start of the range (inclusive)
+        range_end: End of the range (exclusive)
+        services: Optional dict of already loaded HospitalService by id
+    
+    Returns:
+        dict mapping service_id to a list of segments; each segment is the
+        is_service_available result plus "start" and "end" (half-open)
+    """
+    service_ids = list(dict.fromkeys(service_ids))
+    if not service_ids or range_start >= range_end:
+        return {service_id: [] for service_id in service_ids}
+    
+    if services is None:
+        services = {
+            service.id: service
+            for service in HospitalService.query.filter(HospitalService.id.in_(service_ids))
+        }
+    
+    overrides = {}
+    for override in ScheduleOverride.query.filter(
+        ScheduleOverride.service_id.in_(service_ids),
+        ScheduleOverride.is_active == True,
+        ScheduleOverride.start_datetime < range_end,
+        ScheduleOverride.end_datetime >= range_start
+    ).order_by(ScheduleOverride.id):
+        overrides.setdefault(override.service_id, []).append(override)
+    
+    schedules = {}
+    for schedule in ServiceSchedule.query.filter(
+        ServiceSchedule.service_id.in_(service_ids),
+        ServiceSchedule.is_active == True
+    ).order_by(ServiceSchedule.priority.desc(), ServiceSchedule.id):
+        schedules.setdefault(schedule.service_id, []).append(schedule)
+    
+    return {
+        service_id: build_timeline(
+            services.get(service_id),
+            overrides.get(service_id, []),
+            schedules.get(service_id, []),
+            range_start,
+            range_end
+        )
+        for service_id in service_ids
+    }
+
+def availability_timeline(service_id: int, range_start: datetime, range_end: datetime) -> list:
+    """Availability segments of one service over [range_start, range_end)"""
+    return availability_timelines([service_id], range_start, range_end)[service_id]
+
+def build_timeline(service, overrides, schedules, range_start: datetime, range_end: datetime) -> list:
+    """
+    Sweep the boundaries of already loaded rows into availability segments
+    
+    Args:
+        service: HospitalService (or None if not found)
+        overrides: Active ScheduleOverride rows overlapping the range, ordered by id
+        schedules: Active ServiceSchedule rows ordered by priority (highest first)
+        range_start: Start of the range (inclusive)
+        range_end: End of the range (exclusive)
+    """
+    boundaries = {range_start, range_end}
+    
+    if service and service.is_active:
+        for override in overrides:
+            boundaries.add(override.start_datetime)
+            if override.end_datetime < range_end:
+                boundaries.add(override.end_datetime + _TICK)
+        
+        # Day-level boundaries (day of week, date ranges) and daily time windows
+        day = range_start.date()
+        while datetime.combine(day, time.min) < range_end:
+            midnight = datetime.combine(day, time.min)
+            boundaries.add(midnight)
+            for schedule in schedules:
+                if schedule.schedule_type in ("temporary", "holiday"):
+                    continue
+                if schedule.start_time and schedule.end_time:
+                    boundaries.add(datetime.combine(day, schedule.start_time))
+                    boundaries.add(datetime.combine(day, schedule.end_time) + _TICK)
+            day += timedelta(days=1)
+    
+    points = sorted(point for point in boundaries if range_start <= point <= range_end)
+    
+    segments = []
+    for start, end in zip(points, points[1:]):
+        override = next(
+            (o for o in overrides if o.start_datetime <= start <= o.end_datetime),
+            None
+        )
+        result = resolve_availability(service, override, schedules, start)
+        
+        if segments and segments[-1]["end"] == start and _same_result(segments[-1], result):
+            segments[-1]["end"] = end
+        else:
+            segments.append({"start": start, "end": end, **result})
+    
+    return segments
+
+def segment_at(segments: list, check_datetime: datetime) -> Optional[dict]:
+    """Find the segment covering a datetime (segments sorted and contiguous)"""
+    starts = [segment["start"] for segment in segments]
+    index = bisect_right(starts, check_datetime) - 1
+    if index >= 0 and check_datetime < segments[index]["end"]:
+        return segments[index]
+    return None
+
+def _same_result(segment: dict, result: dict) -> bool:
+    """Compare a segment with an availability result, ignoring the segment bounds"""
+    return len(segment) == len(result) + 2 and all(
+        segment.get(key) == value for key, value in result.items()
+    )
@@ -96,3 +96,50 @@ class FacilityReview(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+
+
+class FacilityRatingAggregate(db.Model):
+    """Materialized aggregate rating per facility (one row per hospital)"""
+    __tablename__ = 'facility_rating_aggregates'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    hospital_id = db.Column(db.Integer, db.ForeignKey('hospitals.id'), nullable=False, unique=True, index=True)
+    
+    # Aggregate across platforms
+    overall_rating = db.Column(db.Float, default=0.0)  # 0-5
+    total_reviews = db.Column(db.Integer, default=0)
+    positive_reviews = db.Column(db.Integer, default=0)
+    negative_reviews = db.Column(db.Integer, default=0)
+    neutral_reviews = db.Column(db.Integer, default=0)
+    sentiment_score = db.Column(db.Float, default=0.0)  # -1 to 1
+    platforms_count = db.Column(db.Integer, default=0)
+    
+    # Per-platform breakdown, as returned by SocialMediaService
+    platforms = db.Column(db.JSON)
+    
+    # Source of the numbers: 'ingested' (SocialMediaRating rows) or 'generated'
+    source = db.Column(db.String(20), default='generated')
+    
+    # Timestamps
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def aggregate_dict(self):
+        """Aggregate block in the same shape as SocialMediaService._calculate_aggregate_rating"""
+        return {
+            'overall_rating': self.overall_rating,
+            'total_reviews': self.total_reviews,
+            'positive_reviews': self.positive_reviews,
+            'negative_reviews': self.negative_reviews,
+            'neutral_reviews': self.neutral_reviews,
+            'sentiment_score': self.sentiment_score,
+            'platforms_count': self.platforms_count
+        }
+    
+    def to_dict(self):
+        return {
+            'hospital_id': self.hospital_id,
+            'platforms': self.platforms or {},
+            'aggregate': self.aggregate_dict(),
+            'source': self.source,
+            'computed_at': self.computed_at.isoformat() if self.computed_at else None
+        }
@@ -8,6 +8,7 @@ from src.models.hospital import (
     Hospital, Service, ServiceCategory, 
     Organization, RiyadhCluster, hospital_services
 )
+from src.services.facility_snapshot import facility_snapshot_store
 from functools import wraps
 
 admin_api_bp = Blueprint('admin_api', __name__)
@@ -51,6 +52,7 @@ def create_organization():
         )
         db.session.add(org)
         db.session.commit()
+        facility_snapshot_store.invalidate()
         return jsonify({
             'success': True,
             'organization': org.to_dict()
@@ -76,6 +78,7 @@ def update_organization(org_id):
             org.type = data['type']
         
         db.session.commit()
+        facility_snapshot_store.invalidate()
         return jsonify({
             'success': True,
             'organization': org.to_dict()
@@ -93,6 +96,7 @@ def delete_organization(org_id):
         org = Organization.query.get_or_404(org_id)
         db.session.delete(org)
         db.session.commit()
+        facility_snapshot_store.invalidate()
         return jsonify({'success': True})
     except Exception as e:
         db.session.rollback()
@@ -130,6 +134,7 @@ def create_cluster():
         )
         db.session.add(cluster)
         db.session.commit()
+        facility_snapshot_store.invalidate()
         return jsonify({
             'success': True,
             'cluster': cluster.to_dict()
@@ -184,7 +189,7 @@ def create_service_category():
 def get_services():
     """Get all services"""
     try:
-        services = Service.query.all()
+        services = Service.query.options(*Service.load_options()).all()
         return jsonify({
             'success': True,
             'services': [service.to_dict() for service in services]
@@ -240,6 +245,7 @@ def update_service(service_id):
             service.is_emergency = data['is_emergency']
         
         db.session.commit()
+        facility_snapshot_store.invalidate()
         return jsonify({
             'success': True,
             'service': service.to_dict()
@@ -257,6 +263,7 @@ def delete_service(service_id):
         service = Service.query.get_or_404(service_id)
         db.session.delete(service)
         db.session.commit()
+        facility_snapshot_store.invalidate()
         return jsonify({'success': True})
     except Exception as e:
         db.session.rollback()
@@ -270,7 +277,8 @@ def delete_service(service_id):
 def get_hospitals():
     """Get all hospitals with optional filtering"""
     try:
-        query = Hospital.query
+        include_services = request.args.get('include_services', 'false').lower() == 'true'
+        query = Hospital.query.options(*Hospital.load_options(include_services=include_services))
         
         # Apply filters
         org_id = request.args.get('organization_id', type=int)
@@ -288,7 +296,6 @@ def get_hospitals():
             query = query.filter_by(is_emergency=is_emergency)
         
         hospitals = query.all()
-        include_services = request.args.get('include_services', 'false').lower() == 'true'
         
         return jsonify({
             'success': True,
@@ -303,7 +310,9 @@ def get_hospitals():
 def get_hospital(hospital_id):
     """Get a specific hospital"""
     try:
-        hospital = Hospital.query.get_or_404(hospital_id)
+        hospital = Hospital.query.options(
+            *Hospital.load_options(include_services=True)
+        ).get_or_404(hospital_id)
         return jsonify({
             'success': True,
             'hospital': hospital.to_dict(include_services=True)
@@ -345,6 +354,7 @@ def create_hospital():
         )
         db.session.add(hospital)
         db.session.commit()
+        facility_snapshot_store.invalidate()
         
         return jsonify({
             'success': True,
@@ -377,6 +387,7 @@ def update_hospital(hospital_id):
                 setattr(hospital, field, data[field])
         
         db.session.commit()
+        facility_snapshot_store.invalidate()
         return jsonify({
             'success': True,
             'hospital': hospital.to_dict()
@@ -394,6 +405,7 @@ def delete_hospital(hospital_id):
         hospital = Hospital.query.get_or_404(hospital_id)
         db.session.delete(hospital)
         db.session.commit()
+        facility_snapshot_store.invalidate()
         return jsonify({'success': True})
     except Exception as e:
         db.session.rollback()
@@ -414,6 +426,7 @@ def add_hospital_service(hospital_id):
         if service not in hospital.services:
             hospital.services.append(service)
             db.session.commit()
+            facility_snapshot_store.invalidate()
         
         return jsonify({
             'success': True,
@@ -435,6 +448,7 @@ def remove_hospital_service(hospital_id, service_id):
         if service in hospital.services:
             hospital.services.remove(service)
             db.session.commit()
+            facility_snapshot_store.invalidate()
         
         return jsonify({'success': True})
     except Exception as e:
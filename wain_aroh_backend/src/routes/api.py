@@ -5,12 +5,15 @@ from datetime import datetime
 from src.services.ai_triage import chat_with_ai, analyze_symptoms, transcribe_audio, text_to_speech
 from src.data.facilities import FACILITIES, CTAS_DEFINITIONS, get_facilities_by_ctas, get_facility_by_id
 import math
+import uuid
+from src.services.session_store import create_session_store, session_store_stats
+from src.services.llm_gateway import llm_gateway
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
-# In-memory session storage (for prototype)
-sessions = {}
-assessments = []
+# Session and assessment storage (bounded and expiring; shared across workers with SESSION_STORE_BACKEND=sqlite)
+sessions = create_session_store('chat')
+assessments = create_session_store('assessment', ttl_seconds=7 * 24 * 60 * 60, max_entries=20000)
 
 @api_bp.route('/health', methods=['GET'])
 def health_check():
@@ -46,8 +49,9 @@ def chat():
             }), 400
         
         # Initialize session if not exists
-        if session_id not in sessions:
-            sessions[session_id] = {
+        session = sessions.get(session_id)
+        if session is None:
+            session = {
                 "id": session_id,
                 "started_at": datetime.now().isoformat(),
                 "messages": [],
@@ -71,11 +75,12 @@ def chat():
             })
             
             # Update session
-            sessions[session_id]['messages'] = messages
+            session['messages'] = messages
             
             # If assessment is available, save it
             if result.get('assessment'):
-                sessions[session_id]['assessment'] = result['assessment']
+                session['assessment'] = result['assessment']
+            sessions[session_id] = session
             
             return jsonify({
                 "success": True,
@@ -135,14 +140,14 @@ def analyze():
             
             # Save assessment
             assessment = {
-                "id": len(assessments) + 1,
+                "id": uuid.uuid4().hex,
                 "timestamp": datetime.now().isoformat(),
                 "symptoms": symptoms,
                 "ctas_level": result['ctas_level'],
                 "care_type": result['care_type'],
                 "location": location
             }
-            assessments.append(assessment)
+            assessments[assessment['id']] = assessment
             
             return jsonify(result)
         else:
@@ -282,18 +287,19 @@ def get_stats():
     """Get dashboard statistics"""
     try:
         total_sessions = len(sessions)
-        total_assessments = len(assessments)
+        recorded_assessments = assessments.values()
+        total_assessments = len(recorded_assessments)
         
         # Count by CTAS level
         ctas_distribution = {i: 0 for i in range(1, 6)}
-        for assessment in assessments:
+        for assessment in recorded_assessments:
             level = assessment.get('ctas_level')
             if level in ctas_distribution:
                 ctas_distribution[level] += 1
         
         # Count by care type
         care_type_distribution = {}
-        for assessment in assessments:
+        for assessment in recorded_assessments:
             care_type = assessment.get('care_type', 'unknown')
             care_type_distribution[care_type] = care_type_distribution.get(care_type, 0) + 1
         
@@ -314,13 +320,42 @@ def get_stats():
             "error": str(e)
         }), 500
 
+@api_bp.route('/sessions/stats', methods=['GET'])
+def get_session_stats():
+    """Session store metrics: entries, estimated bytes, hits and evictions per store"""
+    try:
+        return jsonify({
+            "success": True,
+            "stats": session_store_stats()
+        })
+        
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@api_bp.route('/llm/stats', methods=['GET'])
+def get_llm_stats():
+    """LLM gateway metrics: circuit state, in-flight calls, latency and token usage per caller"""
+    try:
+        return jsonify({
+            "success": True,
+            "stats": llm_gateway.stats()
+        })
+        
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
 @api_bp.route('/dashboard/assessments', methods=['GET'])
 def get_assessments():
     """Get recent assessments"""
     try:
         limit = request.args.get('limit', 50, type=int)
-        recent_assessments = assessments[-limit:]
-        recent_assessments.reverse()
+        recent_assessments = sorted(assessments.values(), key=lambda a: a['timestamp'], reverse=True)[:limit]
         
         return jsonify({
             "success": True,
@@ -5,6 +5,7 @@ Natural dialogue-based patient navigation
 
 from flask import Blueprint, request, jsonify
 from src.services.conversational_ai import conversational_ai
+from src.services.response_streaming import sse_response, streaming_metrics
 import uuid
 
 conversation_api_bp = Blueprint('conversation_api', __name__, url_prefix='/api/conversation')
@@ -64,6 +65,59 @@ def send_message():
             'error': str(e)
         }), 500
 
+@conversation_api_bp.route('/message/stream', methods=['POST'])
+def stream_message():
+    """
+    Send a message and stream the reply over Server-Sent Events
+    
+    Events: "token" (reply text as it is generated), then "done" (the same
+    payload as /message plus time_to_first_token_ms), or "error"
+    """
+    try:
+        data = request.json
+        
+        session_id = data.get('session_id')
+        message = data.get('message')
+        gps_data = data.get('gps_data')
+        
+        if not session_id or not message:
+            return jsonify({
+                'success': False,
+                'error': 'Session ID and message required'
+            }), 400
+        
+        events = conversational_ai.stream_message(
+            session_id=session_id,
+            user_message=message,
+            gps_data=gps_data
+        )
+        
+        return sse_response('conversation', (
+            (event, {'success': True, **payload} if event == 'done' else payload)
+            for event, payload in events
+        ))
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@conversation_api_bp.route('/stream/metrics', methods=['GET'])
+def get_stream_metrics():
+    """Time-to-first-token and stream duration percentiles per streaming endpoint"""
+    try:
+        return jsonify({
+            'success': True,
+            'metrics': streaming_metrics.stats()
+        })
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @conversation_api_bp.route('/location', methods=['POST'])
 def provide_location():
     """Provide GPS location during conversation"""
@@ -194,6 +248,37 @@ def get_history():
             'error': str(e)
         }), 500
 
+@conversation_api_bp.route('/context', methods=['GET'])
+def get_context():
+    """Get the bounded model context of a conversation (summary and per-turn prompt tokens)"""
+    try:
+        session_id = request.args.get('session_id')
+        
+        if not session_id:
+            return jsonify({
+                'success': False,
+                'error': 'Session ID required'
+            }), 400
+        
+        context = conversational_ai.get_context_info(session_id)
+        if context is None:
+            return jsonify({
+                'success': False,
+                'error': 'Session not found'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'session_id': session_id,
+            **context
+        })
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @conversation_api_bp.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
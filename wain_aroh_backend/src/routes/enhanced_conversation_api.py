@@ -10,12 +10,14 @@ import os
 import uuid
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-from src.services.enhanced_conversational_ai import EnhancedConversationalAI
+from src.services.enhanced_conversational_ai import EnhancedConversationalAI, response_deadline_metrics
+from src.services.session_store import create_session_store
+from src.services.response_streaming import sse_response
 
 enhanced_conversation_api = Blueprint('enhanced_conversation_api', __name__)
 
-# Store active sessions (in production, use Redis or database)
-active_sessions = {}
+# Active sessions (bounded and expiring; shared across workers with SESSION_STORE_BACKEND=sqlite)
+active_sessions = create_session_store('enhanced_conversation')
 
 @enhanced_conversation_api.route('/api/conversation/start', methods=['POST'])
 def start_conversation():
@@ -62,15 +64,21 @@ def send_message():
             }), 400
         
         # Get or create session
-        if session_id not in active_sessions:
+        ai = active_sessions.get(session_id)
+        if ai is None:
             ai = EnhancedConversationalAI()
             ai.start_new_session(session_id)
-            active_sessions[session_id] = ai
-        else:
-            ai = active_sessions[session_id]
         
-        # Process message
-        response = ai.process_message(message, context)
+        def save_late_reply(updated_ai, reply_index):
+            # Only into the stored session, and only while its last message is still the
+            # reply this one supersedes (not after it was deleted, expired or moved on)
+            current = active_sessions.get(session_id)
+            if current is not None and len(current.conversation_history) == reply_index + 1:
+                active_sessions[session_id] = updated_ai
+        
+        # Process message (replies within the response budget; a late model reply is saved when it arrives)
+        response = ai.process_message(message, context, on_late_reply=save_late_reply)
+        active_sessions[session_id] = ai
         
         return jsonify({
             "success": True,
@@ -83,19 +91,76 @@ def send_message():
             "error": str(e)
         }), 500
 
+@enhanced_conversation_api.route('/api/conversation/session/<session_id>/stream', methods=['POST'])
+def stream_message(session_id):
+    """
+    Send a message and stream the reply over Server-Sent Events
+    
+    Events: "token" (reply text as it is generated), then "done" (triage
+    analysis, final assessment and recommendations), or "error"
+    """
+    try:
+        data = request.json
+        message = data.get('message')
+        context = data.get('context', {})
+        
+        if not message:
+            return jsonify({
+                "success": False,
+                "error": "message is required"
+            }), 400
+        
+        # Get or create session
+        ai = active_sessions.get(session_id)
+        if ai is None:
+            ai = EnhancedConversationalAI()
+            ai.start_new_session(session_id)
+        
+        def events():
+            for event, payload in ai.stream_message(message, context):
+                if event == "done":
+                    # Save before the client can send its next message
+                    active_sessions[session_id] = ai
+                    payload = {"success": True, "data": payload}
+                yield event, payload
+        
+        return sse_response('enhanced_conversation', events())
+        
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@enhanced_conversation_api.route('/api/conversation/fallback/metrics', methods=['GET'])
+def get_fallback_metrics():
+    """
+    How often replies fell back to the triage engine (deadline or error) and reply latency
+    """
+    try:
+        return jsonify({
+            "success": True,
+            "data": response_deadline_metrics.stats()
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
 @enhanced_conversation_api.route('/api/conversation/session/<session_id>', methods=['GET'])
 def get_session_info(session_id):
     """
     Get information about a conversation session
     """
     try:
-        if session_id not in active_sessions:
+        ai = active_sessions.get(session_id)
+        if ai is None:
             return jsonify({
                 "success": False,
                 "error": "Session not found"
             }), 404
-        
-        ai = active_sessions[session_id]
         summary = ai.get_session_summary()
         
         return jsonify({
@@ -115,20 +180,20 @@ def get_conversation_history(session_id):
     Get full conversation history for a session
     """
     try:
-        if session_id not in active_sessions:
+        ai = active_sessions.get(session_id)
+        if ai is None:
             return jsonify({
                 "success": False,
                 "error": "Session not found"
             }), 404
         
-        ai = active_sessions[session_id]
-        
         return jsonify({
             "success": True,
             "data": {
                 "session_id": session_id,
                 "history": ai.conversation_history,
-                "message_count": len(ai.conversation_history)
+                "message_count": len(ai.conversation_history),
+                "late_replies": getattr(ai, 'late_replies', [])
             }
         }), 200
         
@@ -144,14 +209,13 @@ def get_current_assessment(session_id):
     Get current triage assessment for a session
     """
     try:
-        if session_id not in active_sessions:
+        ai = active_sessions.get(session_id)
+        if ai is None:
             return jsonify({
                 "success": False,
                 "error": "Session not found"
             }), 404
         
-        ai = active_sessions[session_id]
-        
         if not ai.triage_engine:
             return jsonify({
                 "success": False,
@@ -185,17 +249,16 @@ def end_conversation(session_id):
     End a conversation session
     """
     try:
-        if session_id not in active_sessions:
+        ai = active_sessions.get(session_id)
+        if ai is None:
             return jsonify({
                 "success": False,
                 "error": "Session not found"
             }), 404
-        
-        ai = active_sessions[session_id]
         summary = ai.get_session_summary()
         
         # Remove from active sessions
-        del active_sessions[session_id]
+        active_sessions.delete(session_id)
         
         return jsonify({
             "success": True,
@@ -279,7 +279,7 @@ def get_system_overview():
     Get system overview
     """
     try:
-        hospitals = Hospital.query.all()
+        hospitals = Hospital.query.options(*Hospital.load_options()).all()
         
         # حساب الإحصائيات العامة
         total_facilities = len(hospitals)
@@ -8,6 +8,7 @@ from flask import Blueprint, request, jsonify
 from datetime import datetime
 from ..services.intelligent_router import IntelligentRouter
 from ..services.schedule_manager import ScheduleManager
+from ..services.request_log_buffer import request_log_buffer
 from ..models.service_schedule import ServiceType
 
 routing_api = Blueprint('routing_api', __name__)
@@ -186,31 +187,44 @@ def get_coverage_map():
 @routing_api.route('/api/routing/check-service', methods=['POST'])
 def check_service_availability():
     """
-    Check if a specific service is available at a hospital
+    Check if a specific service (or several services) is available
     
     Request body:
     {
         "service_id": 1,
+        "service_ids": [1, 2, 3] (optional, instead of service_id),
         "check_datetime": "2025-01-15T14:30:00" (optional)
     }
     """
     try:
         data = request.get_json()
         
-        if 'service_id' not in data:
+        if 'service_id' not in data and 'service_ids' not in data:
             return jsonify({
                 "success": False,
-                "error": "service_id is required"
+                "error": "service_id or service_ids is required"
             }), 400
         
-        service_id = data['service_id']
         check_datetime_str = data.get('check_datetime')
         
         check_datetime = None
         if check_datetime_str:
             check_datetime = datetime.fromisoformat(check_datetime_str)
         
-        availability = ScheduleManager.check_availability(service_id, check_datetime)
+        if 'service_ids' in data:
+            availabilities = ScheduleManager.check_availability_bulk(data['service_ids'], check_datetime)
+            
+            return jsonify({
+                "success": True,
+                "check_datetime": (check_datetime or datetime.now()).isoformat(),
+                "availability": {
+                    str(service_id): availability
+                    for service_id, availability in availabilities.items()
+                }
+            }), 200
+        
+        service_id = data['service_id']
+        availability = ScheduleManager.check_availability_bulk([service_id], check_datetime)[service_id]
         
         return jsonify({
             "success": True,
@@ -361,6 +375,14 @@ def get_routing_analytics():
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+@routing_api.route('/api/routing/log-buffer', methods=['GET'])
+def get_log_buffer_stats():
+    """Get routing log write-behind queue depth and flush latency"""
+    return jsonify({
+        "success": True,
+        "log_buffer": request_log_buffer.stats()
+    }), 200
+
 def _get_arabic_service_name(service_type: str) -> str:
     """Get Arabic name for service type"""
     arabic_names = {
@@ -490,24 +490,49 @@ def check_availability():
 
 @schedule_admin_api.route('/api/admin/availability/status', methods=['GET'])
 def get_service_status():
-    """Get service availability status for a date range"""
+    """
+    Get service availability status for a date range
+    
+    Query params: service_id, start_date, end_date (YYYY-MM-DD) and
+    mode=hourly (default, one entry per hour) or mode=segments
+    (availability intervals for the admin UI)
+    """
     try:
-        service_id = request.args.get('service_id', type=int, required=True)
+        service_id = request.args.get('service_id', type=int)
+        if service_id is None:
+            return jsonify({"success": False, "error": "service_id is required"}), 400
         start_date_str = request.args.get('start_date')
         end_date_str = request.args.get('end_date')
         
         start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date() if start_date_str else None
         end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date() if end_date_str else None
         
-        statuses = ScheduleManager.get_service_status(service_id, start_date, end_date)
+        mode = request.args.get('mode', 'hourly')
         
-        return jsonify({
+        response = {
             "success": True,
             "service_id": service_id,
             "start_date": (start_date or date.today()).isoformat(),
-            "end_date": (end_date or (date.today() + timedelta(days=7))).isoformat(),
-            "statuses": statuses
-        }), 200
+            "end_date": (end_date or ((start_date or date.today()) + timedelta(days=7))).isoformat(),
+            "mode": mode
+        }
+        
+        if mode == 'segments':
+            segments = ScheduleManager.get_service_timeline(service_id, start_date, end_date)
+            response["segments"] = [{
+                "start": segment["start"].isoformat(),
+                "end": segment["end"].isoformat(),
+                "available": segment["available"],
+                "status": segment["status"],
+                "reason": segment.get("reason"),
+                "on_call": segment.get("on_call"),
+                "wait_time": segment.get("wait_time"),
+                "alternative": segment.get("alternative")
+            } for segment in segments]
+        else:
+            response["statuses"] = ScheduleManager.get_service_status(service_id, start_date, end_date)
+        
+        return jsonify(response), 200
         
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
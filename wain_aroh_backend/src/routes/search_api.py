@@ -12,7 +12,8 @@ from ..models.search import (
     search_result_to_dict, facility_to_dict
 )
 from ..services.advanced_search import search_service
-from ..services.social_media_service import social_media_service
+from ..services.facility_snapshot import facility_snapshot_store
+from ..services.search_cache import search_result_cache
 from ..models.hospital import Hospital
 # Database is imported from models.user
 # from ..database.db import db
@@ -21,93 +22,6 @@ from ..models.hospital import Hospital
 search_bp = Blueprint('search', __name__, url_prefix='/api/search')
 
 
-def hospital_to_facility_profile(hospital: Hospital) -> FacilityProfile:
-    """
-    تحويل نموذج المستشفى إلى ملف المنشأة
-    Convert Hospital model to FacilityProfile
-    """
-    # استخراج الموقع
-    location = {"lat": 24.7136, "lng": 46.6753}  # موقع افتراضي (الرياض)
-    if hasattr(hospital, 'latitude') and hasattr(hospital, 'longitude'):
-        if hospital.latitude and hospital.longitude:
-            location = {
-                "lat": float(hospital.latitude),
-                "lng": float(hospital.longitude)
-            }
-    
-    # إنشاء مقاييس الأداء
-    # الحصول على التقييمات من مواقع التواصل الاجتماعي
-    social_ratings = social_media_service.generate_mock_ratings(
-        hospital.id,
-        hospital.name_ar if hasattr(hospital, 'name_ar') else str(hospital.id),
-        hospital.facility_type if hasattr(hospital, 'facility_type') else 'hospital'
-    )
-    
-    # استخدام التقييم المجمع من مواقع التواصل
-    overall_rating = social_ratings['aggregate']['overall_rating']
-    total_reviews = social_ratings['aggregate']['total_reviews']
-    
-    performance = PerformanceMetrics(
-        overall_rating=overall_rating,
-        total_reviews=total_reviews,
-        avg_wait_time_minutes=hospital.avg_wait_time if hasattr(hospital, 'avg_wait_time') else 30,
-        patient_satisfaction=hospital.patient_satisfaction if hasattr(hospital, 'patient_satisfaction') else 85.0,
-        on_time_appointments=hospital.on_time_rate if hasattr(hospital, 'on_time_rate') else 90.0,
-        current_occupancy=hospital.occupancy if hasattr(hospital, 'occupancy') else 75.0,
-        avg_daily_patients=hospital.daily_patients if hasattr(hospital, 'daily_patients') else 100,
-        available_beds=hospital.available_beds if hasattr(hospital, 'available_beds') else 50,
-        available_doctors=hospital.available_doctors if hasattr(hospital, 'available_doctors') else 20,
-        social_media_ratings=social_ratings
-    )
-    
-    # التخصصات
-    specialties = []
-    if hasattr(hospital, 'specialties') and hospital.specialties:
-        if isinstance(hospital.specialties, str):
-            specialties = [s.strip() for s in hospital.specialties.split(',')]
-        else:
-            specialties = hospital.specialties
-    
-    # الخدمات
-    services = []
-    if hasattr(hospital, 'services') and hospital.services:
-        if isinstance(hospital.services, str):
-            services = [s.strip() for s in hospital.services.split(',')]
-        else:
-            services = hospital.services
-    
-    # إنشاء ملف المنشأة
-    facility = FacilityProfile(
-        id=hospital.id,
-        name=hospital.name_ar if hasattr(hospital, 'name_ar') else str(hospital.id),
-        name_en=hospital.name_en if hasattr(hospital, 'name_en') else '',
-        type=hospital.facility_type if hasattr(hospital, 'facility_type') else 'hospital',
-        location=location,
-        address=hospital.address_ar if hasattr(hospital, 'address_ar') else '',
-        city=hospital.city if hasattr(hospital, 'city') else 'الرياض',
-        district=hospital.district_ar if hasattr(hospital, 'district_ar') else '',
-        organization=hospital.organization.name_ar if hospital.organization else '',
-        cluster=hospital.cluster.name_ar if hospital.cluster else '',
-        specialties=specialties,
-        services=services,
-        phone=hospital.phone if hasattr(hospital, 'phone') else '',
-        emergency_phone=hospital.phone_emergency if hasattr(hospital, 'phone_emergency') else '',
-        email=hospital.email if hasattr(hospital, 'email') else '',
-        website=hospital.website if hasattr(hospital, 'website') else '',
-        total_beds=hospital.capacity_beds if hasattr(hospital, 'capacity_beds') else 0,
-        emergency_beds=hospital.capacity_emergency_beds if hasattr(hospital, 'capacity_emergency_beds') else 0,
-        icu_beds=0,
-        total_doctors=0,
-        performance=performance,
-        is_active=hospital.is_active if hasattr(hospital, 'is_active') else True,
-        accepts_emergency=hospital.is_emergency if hasattr(hospital, 'is_emergency') else True,
-        accepts_appointments=True,
-        description=hospital.description_ar if hasattr(hospital, 'description_ar') else '',
-    )
-    
-    return facility
-
-
 @search_bp.route('/facilities', methods=['POST'])
 def search_facilities():
     """
@@ -148,17 +62,22 @@ def search_facilities():
             limit=data.get('limit', 10)
         )
         
-        # الحصول على المستشفيات من قاعدة البيانات
-        hospitals = Hospital.query.all()
+        # توحيد الفلاتر (ترتيب القوائم وتقريب الموقع) لاستخدام الذاكرة المؤقتة
+        filters = search_result_cache.canonicalize(filters)
+        cache_key = search_result_cache.make_key(filters)
+        
+        # الحصول على لقطة المنشآت الحالية
+        snapshot = facility_snapshot_store.get()
         
-        # تحويل إلى ملفات المنشآت
-        facilities = [hospital_to_facility_profile(h) for h in hospitals]
+        cached = search_result_cache.get(cache_key, snapshot.generation)
+        if cached is not None:
+            return jsonify(dict(cached, cache_hit=True))
         
         # تنفيذ البحث
-        response = search_service.search(facilities, filters)
+        response = search_service.search(snapshot, filters)
         
         # تحويل النتائج إلى JSON
-        return jsonify({
+        payload = {
             'success': True,
             'results': [search_result_to_dict(r) for r in response.results],
             'total_results': response.total_results,
@@ -167,8 +86,12 @@ def search_facilities():
             'total_pages': response.total_pages,
             'applied_filters': response.applied_filters,
             'stats': response.stats,
-            'search_time_ms': response.search_time_ms
-        })
+            'search_time_ms': response.search_time_ms,
+            'data_version': snapshot.version
+        }
+        search_result_cache.put(cache_key, snapshot.generation, payload)
+        
+        return jsonify(dict(payload, cache_hit=False))
         
     except Exception as e:
         return jsonify({
@@ -184,16 +107,14 @@ def get_facility_details(facility_id):
     Get details of a specific facility
     """
     try:
-        hospital = Hospital.query.get(facility_id)
+        facility = facility_snapshot_store.get().get(facility_id)
         
-        if not hospital:
+        if not facility:
             return jsonify({
                 'success': False,
                 'error': 'المنشأة غير موجودة'
             }), 404
         
-        facility = hospital_to_facility_profile(hospital)
-        
         return jsonify({
             'success': True,
             'facility': facility_to_dict(facility)
@@ -227,11 +148,8 @@ def compare_facilities():
                 'error': 'يجب تحديد منشأتين على الأقل للمقارنة'
             }), 400
         
-        # الحصول على المستشفيات
-        hospitals = Hospital.query.filter(Hospital.id.in_(facility_ids)).all()
-        
-        # تحويل إلى ملفات المنشآت
-        facilities = [hospital_to_facility_profile(h) for h in hospitals]
+        # الحصول على المنشآت من اللقطة
+        facilities = facility_snapshot_store.get().select(facility_ids)
         
         # تنفيذ المقارنة
         comparison = search_service.compare_facilities(facilities, facility_ids)
@@ -255,8 +173,10 @@ def get_specialties():
     Get list of available specialties
     """
     try:
-        # الحصول على جميع المستشفيات
-        hospitals = Hospital.query.all()
+        # الحصول على جميع المستشفيات (دون تحميل العلاقات)
+        hospitals = Hospital.query.options(
+            *Hospital.load_options(include_organization=False, include_cluster=False)
+        ).all()
         
         # جمع التخصصات
         specialties_set = set()
@@ -289,7 +209,9 @@ def get_organizations():
     Get list of healthcare organizations
     """
     try:
-        hospitals = Hospital.query.all()
+        hospitals = Hospital.query.options(
+            *Hospital.load_options(include_cluster=False)
+        ).all()
         
         organizations_set = set()
         for hospital in hospitals:
@@ -317,7 +239,9 @@ def get_clusters():
     Get list of healthcare clusters
     """
     try:
-        hospitals = Hospital.query.all()
+        hospitals = Hospital.query.options(
+            *Hospital.load_options(include_organization=False)
+        ).all()
         
         clusters_set = set()
         for hospital in hospitals:
@@ -345,7 +269,9 @@ def get_available_filters():
     Get all available filters
     """
     try:
-        hospitals = Hospital.query.all()
+        hospitals = Hospital.query.options(
+            *Hospital.load_options(include_services=True)
+        ).all()
         
         # جمع التخصصات
         specialties_set = set()
@@ -424,21 +350,11 @@ def search_nearby():
         radius_km = data.get('radius_km', 10)
         limit = data.get('limit', 5)
         
-        # إنشاء فلاتر بسيطة
-        filters = SearchFilters(
-            location=location,
-            max_distance_km=radius_km,
-            sort_by=SortBy.DISTANCE,
-            limit=limit
+        # البحث عن الأقرب باستخدام الفهرس المكاني
+        response = search_service.search_nearby(
+            facility_snapshot_store.get(), location, radius_km, limit
         )
         
-        # الحصول على المستشفيات
-        hospitals = Hospital.query.all()
-        facilities = [hospital_to_facility_profile(h) for h in hospitals]
-        
-        # تنفيذ البحث
-        response = search_service.search(facilities, filters)
-        
         return jsonify({
             'success': True,
             'results': [search_result_to_dict(r) for r in response.results],
@@ -451,3 +367,15 @@ def search_nearby():
             'error': str(e)
         }), 500
 
+
+@search_bp.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """
+    إحصائيات الذاكرة المؤقتة للبحث ولقطة المنشآت
+    Search cache hit/miss counters and facility snapshot info
+    """
+    return jsonify({
+        'success': True,
+        'cache': search_result_cache.stats(),
+        'snapshot': facility_snapshot_store.stats()
+    })
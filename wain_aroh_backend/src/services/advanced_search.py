@@ -4,14 +4,17 @@ Advanced Search Service for Medical Centers and Specialized Clinics
 """
 
 import math
+import heapq
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Union
 from dataclasses import asdict
 
 from ..models.search import (
     SearchFilters, SearchResult, SearchResponse, FacilityProfile,
     PerformanceMetrics, SortBy, search_result_to_dict
 )
+from .facility_snapshot import FacilitySnapshot
+from .facility_bitsets import bitset_ordinals, BitsetMembership
 
 
 class AdvancedSearchService:
@@ -21,6 +24,15 @@ class AdvancedSearchService:
         """تهيئة الخدمة"""
         self.facilities_cache = []
         self.last_cache_update = None
+    
+    @staticmethod
+    def _as_snapshot(
+        facilities: Union[List[FacilityProfile], FacilitySnapshot]
+    ) -> FacilitySnapshot:
+        """تحويل قائمة المنشآت إلى لقطة مفهرسة إذا لزم الأمر"""
+        if isinstance(facilities, FacilitySnapshot):
+            return facilities
+        return FacilitySnapshot(facilities)
         
     def calculate_distance(self, loc1: Dict[str, float], loc2: Dict[str, float]) -> float:
         """
@@ -121,7 +133,7 @@ class AdvancedSearchService:
     
     def apply_filters(
         self,
-        facilities: List[FacilityProfile],
+        facilities: Union[List[FacilityProfile], FacilitySnapshot],
         filters: SearchFilters
     ) -> List[Tuple[FacilityProfile, float]]:
         """
@@ -129,47 +141,38 @@ class AdvancedSearchService:
         Apply filters to facilities list
         
         Args:
-            facilities: قائمة المنشآت
+            facilities: قائمة المنشآت أو لقطة المنشآت
             filters: الفلاتر
             
         Returns:
             قائمة المنشآت المطابقة مع المسافة
         """
+        snapshot = self._as_snapshot(facilities)
         filtered = []
         
-        for facility in facilities:
-            # التحقق من الحالة النشطة
-            if not facility.is_active:
-                continue
-            
-            # فلتر التخصصات
-            if filters.specialties:
-                if not any(spec in facility.specialties for spec in filters.specialties):
-                    continue
-            
-            # فلتر الجهات
-            if filters.organizations:
-                if facility.organization not in filters.organizations:
-                    continue
-            
-            # فلتر التجمعات
-            if filters.clusters:
-                if facility.cluster not in filters.clusters:
-                    continue
-            
-            # فلتر الخدمات المطلوبة
-            if filters.required_services:
-                if not all(service in facility.services for service in filters.required_services):
-                    continue
+        # الفلاتر الفئوية (الحالة، التخصصات، الجهات، التجمعات، الخدمات، الطوارئ، المواعيد)
+        # تُحسب دفعة واحدة كعمليات AND/OR على مجموعات البت
+        mask = snapshot.bitsets.match(filters)
+        
+        # عند تحديد الموقع نحسب المسافة للمنشآت الناجية داخل نصف القطر فقط
+        in_radius = None
+        if filters.location:
+            survivors = None
+            if mask != snapshot.bitsets.active_mask:
+                survivors = BitsetMembership(mask)
+            in_radius = snapshot.spatial_index.query_radius(
+                filters.location["lat"], filters.location["lng"], filters.max_distance_km,
+                allowed=survivors
+            )
+            ordinals = sorted(in_radius)
+        else:
+            ordinals = bitset_ordinals(mask)
+        
+        for ordinal in ordinals:
+            facility = snapshot.facilities[ordinal]
             
-            # حساب المسافة
-            distance_km = 0.0
-            if filters.location:
-                distance_km = self.calculate_distance(filters.location, facility.location)
-                
-                # فلتر المسافة القصوى
-                if distance_km > filters.max_distance_km:
-                    continue
+            # المسافة (محسوبة مسبقاً من الفهرس المكاني)
+            distance_km = in_radius[ordinal] if in_radius is not None else 0.0
             
             # فلتر التقييم الأدنى
             if facility.performance.overall_rating < filters.min_rating:
@@ -180,16 +183,6 @@ class AdvancedSearchService:
                 if facility.performance.current_occupancy >= 95:
                     continue
             
-            # فلتر قبول الطوارئ
-            if filters.accepts_emergency:
-                if not facility.accepts_emergency:
-                    continue
-            
-            # فلتر قبول المواعيد
-            if filters.accepts_appointments:
-                if not facility.accepts_appointments:
-                    continue
-            
             filtered.append((facility, distance_km))
         
         return filtered
@@ -236,6 +229,112 @@ class AdvancedSearchService:
         
         return results
     
+    def sort_key(
+        self,
+        facility: FacilityProfile,
+        filters: SearchFilters,
+        distance_km: float
+    ) -> float:
+        """
+        مفتاح الترتيب التصاعدي لمنشأة واحدة
+        Scalar ascending sort key matching sort_results for filters.sort_by
+        
+        Descending criteria are negated so every ordering is "smallest first".
+        """
+        sort_by = filters.sort_by
+        performance = facility.performance
+        
+        if sort_by == SortBy.RELEVANCE:
+            return -self.calculate_relevance_score(facility, filters, distance_km)
+        
+        elif sort_by == SortBy.DISTANCE:
+            return distance_km
+        
+        elif sort_by == SortBy.RATING:
+            return -performance.overall_rating
+        
+        elif sort_by == SortBy.AVAILABILITY:
+            return performance.current_occupancy
+        
+        elif sort_by == SortBy.PERFORMANCE:
+            return -(
+                performance.overall_rating * 0.4 +
+                (100 - performance.current_occupancy) * 0.3 +
+                performance.patient_satisfaction * 0.3
+            )
+        
+        return 0.0
+    
+    def select_top(
+        self,
+        filtered: List[Tuple[FacilityProfile, float]],
+        filters: SearchFilters,
+        k: int
+    ) -> List[Tuple[FacilityProfile, float]]:
+        """
+        اختيار أفضل k منشآت حسب معيار الترتيب
+        Partial top-k selection, O(n log k) instead of sorting all n facilities
+        
+        Ties keep the filtered order, exactly like the stable sort in sort_results.
+        
+        Args:
+            filtered: المنشآت المطابقة مع المسافة
+            filters: الفلاتر (تحدد معيار الترتيب)
+            k: عدد المنشآت المطلوبة
+            
+        Returns:
+            أفضل k منشآت مرتبة
+        """
+        if k <= 0:
+            return []
+        
+        keys = [
+            self.sort_key(facility, filters, distance_km)
+            for facility, distance_km in filtered
+        ]
+        
+        if k >= len(filtered):
+            positions = sorted(range(len(filtered)), key=keys.__getitem__)
+        else:
+            positions = heapq.nsmallest(k, range(len(filtered)), key=keys.__getitem__)
+        
+        return [filtered[i] for i in positions]
+    
+    def calculate_stats(self, filtered: List[Tuple[FacilityProfile, float]]) -> Dict:
+        """
+        حساب إحصائيات النتائج في مرور واحد
+        Compute the stats block in one streaming pass over scalar fields
+        
+        Args:
+            filtered: المنشآت المطابقة مع المسافة
+            
+        Returns:
+            الإحصائيات
+        """
+        if not filtered:
+            return {}
+        
+        total_distance = 0.0
+        total_rating = 0.0
+        total_wait = 0
+        available_count = 0
+        
+        for facility, distance_km in filtered:
+            performance = facility.performance
+            total_distance += distance_km
+            total_rating += performance.overall_rating
+            total_wait += performance.avg_wait_time_minutes
+            if performance.current_occupancy < 90:
+                available_count += 1
+        
+        count = len(filtered)
+        return {
+            "avg_distance": round(total_distance / count, 2),
+            "avg_rating": round(total_rating / count, 2),
+            "avg_wait_time": round(total_wait / count, 0),
+            "available_count": available_count,
+        }
+    
     def generate_recommendation_reason(
         self,
         facility: FacilityProfile,
@@ -294,9 +393,61 @@ class AdvancedSearchService:
         else:
             return "منشأة موصى بها"
     
+    def build_result(
+        self,
+        facility: FacilityProfile,
+        filters: SearchFilters,
+        distance_km: float
+    ) -> SearchResult:
+        """
+        إنشاء نتيجة بحث لمنشأة واحدة
+        Build the SearchResult for one facility
+        
+        Args:
+            facility: المنشأة
+            filters: فلاتر البحث
+            distance_km: المسافة
+            
+        Returns:
+            نتيجة البحث
+        """
+        # حساب درجة الصلة
+        relevance_score = self.calculate_relevance_score(facility, filters, distance_km)
+        
+        # التخصصات المطابقة
+        matched_specialties = []
+        if filters.specialties:
+            matched_specialties = list(set(facility.specialties) & set(filters.specialties))
+        
+        # الخدمات المطابقة
+        matched_services = []
+        if filters.required_services:
+            matched_services = list(set(facility.services) & set(filters.required_services))
+        
+        # حساب التوفر
+        is_available = facility.performance.current_occupancy < 90
+        estimated_wait_time = facility.performance.avg_wait_time_minutes
+        
+        # توليد سبب التوصية
+        recommendation_reason = self.generate_recommendation_reason(
+            facility, filters, distance_km, matched_specialties
+        )
+        
+        # إنشاء نتيجة البحث
+        return SearchResult(
+            facility=facility,
+            relevance_score=relevance_score,
+            distance_km=distance_km,
+            is_available=is_available,
+            estimated_wait_time=estimated_wait_time,
+            matched_specialties=matched_specialties,
+            matched_services=matched_services,
+            recommendation_reason=recommendation_reason
+        )
+    
     def search(
         self,
-        facilities: List[FacilityProfile],
+        facilities: Union[List[FacilityProfile], FacilitySnapshot],
         filters: SearchFilters
     ) -> SearchResponse:
         """
@@ -304,7 +455,7 @@ class AdvancedSearchService:
         Execute advanced search
         
         Args:
-            facilities: قائمة المنشآت
+            facilities: قائمة المنشآت أو لقطة المنشآت (FacilitySnapshot)
             filters: فلاتر البحث
             
         Returns:
@@ -314,65 +465,24 @@ class AdvancedSearchService:
         
         # تطبيق الفلاتر
         filtered_facilities = self.apply_filters(facilities, filters)
+        total_results = len(filtered_facilities)
         
-        # إنشاء نتائج البحث
-        results = []
-        for facility, distance_km in filtered_facilities:
-            # حساب درجة الصلة
-            relevance_score = self.calculate_relevance_score(facility, filters, distance_km)
-            
-            # التخصصات المطابقة
-            matched_specialties = []
-            if filters.specialties:
-                matched_specialties = list(set(facility.specialties) & set(filters.specialties))
-            
-            # الخدمات المطابقة
-            matched_services = []
-            if filters.required_services:
-                matched_services = list(set(facility.services) & set(filters.required_services))
-            
-            # حساب التوفر
-            is_available = facility.performance.current_occupancy < 90
-            estimated_wait_time = facility.performance.avg_wait_time_minutes
-            
-            # توليد سبب التوصية
-            recommendation_reason = self.generate_recommendation_reason(
-                facility, filters, distance_km, matched_specialties
-            )
-            
-            # إنشاء نتيجة البحث
-            result = SearchResult(
-                facility=facility,
-                relevance_score=relevance_score,
-                distance_km=distance_km,
-                is_available=is_available,
-                estimated_wait_time=estimated_wait_time,
-                matched_specialties=matched_specialties,
-                matched_services=matched_services,
-                recommendation_reason=recommendation_reason
-            )
-            
-            results.append(result)
-        
-        # ترتيب النتائج
-        results = self.sort_results(results, filters.sort_by)
-        
-        # حساب الإحصائيات
-        stats = {}
-        if results:
-            stats = {
-                "avg_distance": round(sum(r.distance_km for r in results) / len(results), 2),
-                "avg_rating": round(sum(r.facility.performance.overall_rating for r in results) / len(results), 2),
-                "avg_wait_time": round(sum(r.estimated_wait_time for r in results) / len(results), 0),
-                "available_count": sum(1 for r in results if r.is_available),
-            }
+        # حساب الإحصائيات في مرور واحد على القيم العددية
+        stats = self.calculate_stats(filtered_facilities)
         
         # التصفح (Pagination)
-        total_results = len(results)
         total_pages = math.ceil(total_results / filters.limit)
         start_idx = (filters.page - 1) * filters.limit
         end_idx = start_idx + filters.limit
-        paginated_results = results[start_idx:end_idx]
+        
+        # اختيار أفضل end_idx منشأة فقط بدلاً من ترتيب القائمة كاملة
+        top_ranked = self.select_top(filtered_facilities, filters, end_idx)
+        
+        # إنشاء نتائج البحث الكاملة لمنشآت الصفحة المطلوبة فقط
+        paginated_results = [
+            self.build_result(facility, filters, distance_km)
+            for facility, distance_km in top_ranked[start_idx:end_idx]
+        ]
         
         # حساب وقت البحث
         search_time = (datetime.now() - start_time).total_seconds() * 1000
@@ -398,6 +508,65 @@ class AdvancedSearchService:
         
         return response
     
+    def search_nearby(
+        self,
+        facilities: Union[List[FacilityProfile], FacilitySnapshot],
+        location: Dict[str, float],
+        radius_km: float,
+        limit: int
+    ) -> SearchResponse:
+        """
+        البحث عن أقرب المنشآت النشطة
+        Find the k nearest active facilities within a radius
+        
+        Uses the k-nearest query of the spatial index, so only the returned
+        facilities are scored and materialized.
+        
+        Args:
+            facilities: قائمة المنشآت أو لقطة المنشآت
+            location: موقع المريض
+            radius_km: نصف قطر البحث
+            limit: عدد النتائج
+            
+        Returns:
+            نتائج البحث مرتبة حسب المسافة
+        """
+        start_time = datetime.now()
+        snapshot = self._as_snapshot(facilities)
+        
+        filters = SearchFilters(
+            location=location,
+            max_distance_km=radius_km,
+            sort_by=SortBy.DISTANCE,
+            limit=limit
+        )
+        
+        nearest = snapshot.spatial_index.nearest(
+            location["lat"], location["lng"], limit, max_distance_km=radius_km
+        )
+        results = [
+            self.build_result(snapshot.facilities[ordinal], filters, distance_km)
+            for ordinal, distance_km in nearest
+        ]
+        total_results = len(snapshot.spatial_index.query_radius(
+            location["lat"], location["lng"], radius_km
+        )) if len(results) == limit else len(results)
+        
+        search_time = (datetime.now() - start_time).total_seconds() * 1000
+        
+        return SearchResponse(
+            results=results,
+            total_results=total_results,
+            page=1,
+            limit=limit,
+            total_pages=math.ceil(total_results / limit) if limit else 0,
+            applied_filters={
+                "max_distance_km": radius_km,
+                "sort_by": SortBy.DISTANCE.value,
+            },
+            search_time_ms=round(search_time, 2)
+        )
+    
     def get_facility_by_id(
         self,
         facilities: List[FacilityProfile],
@@ -6,7 +6,9 @@ Provides sophisticated remote triage capabilities with continuous learning
 import json
 import re
 from datetime import datetime
-from typing import Dict, List, Tuple, Optional
+from functools import lru_cache
+from itertools import chain
+from typing import Dict, FrozenSet, List, Tuple, Optional
 import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
@@ -22,6 +24,156 @@ from src.data.medical_knowledge_base import (
     apply_age_modifier,
     evaluate_clinical_rule
 )
+from src.services.arabic_normalizer import normalized_keywords, normalized_table
+from src.services.keyword_matcher import KeywordMatcher
+
+# Phrases that make a presentation CTAS 1 on their own
+RED_FLAG_PATTERNS = {
+    "chest_pain_severe": ["ألم صدر شديد", "ألم صدر ضاغط", "ألم في الصدر والذراع"],
+    "difficulty_breathing": ["لا أستطيع التنفس", "صعوبة شديدة في التنفس", "أختنق"],
+    "loss_of_consciousness": ["فقدت الوعي", "أغمي علي", "فاقد الوعي"],
+    "severe_bleeding": ["نزيف شديد", "دم كثير", "لا يتوقف النزيف"],
+    "stroke_symptoms": ["ضعف في الذراع", "كلام غير واضح", "وجه متدلي"],
+    "severe_headache": ["أسوأ صداع", "صداع مفاجئ شديد", "صداع كالصاعقة"],
+    "confusion": ["مشوش", "لا أعرف أين أنا", "تشوش ذهني"],
+    "high_fever_with_rash": ["حمى مرتفعة وطفح", "حمى وبقع"],
+    "vomiting_blood": ["تقيؤ دم", "قيء أحمر", "قيء أسود"],
+    "severe_abdominal_pain": ["ألم بطن شديد", "بطن صلب", "ألم حاد في البطن"]
+}
+
+
+SEVERITY_KEYWORDS = {
+    "severe": ["شديد", "قوي", "لا يطاق", "أسوأ", "فظيع"],
+    "moderate": ["متوسط", "مزعج", "ملحوظ"],
+    "mild": ["خفيف", "بسيط", "طفيف", "قليل"]
+}
+
+URGENCY_KEYWORDS = {
+    "immediate": ["الآن", "فوراً", "طوارئ", "مفاجئ", "فجأة"],
+    "urgent": ["عاجل", "سريع", "مستعجل"],
+    "routine": ["عادي", "منذ فترة", "مزمن"]
+}
+
+CONDITION_KEYWORDS = {
+    "diabetes": ["سكري", "السكر"],
+    "hypertension": ["ضغط", "ضغط الدم"],
+    "asthma": ["ربو", "الربو"],
+    "heart_disease": ["قلب", "قلبية"]
+}
+
+
+class SymptomMatcher:
+    """
+    A symptom database compiled into keyword matcher entries
+    
+    detect() returns the same entries, in the same order, as checking every
+    symptom's Arabic name and then every severity level's keywords in turn,
+    with a single pass over the message. Names and keywords are normalized
+    (normalize_arabic) and deduplicated when the matcher is built.
+    """
+    
+    def __init__(self, symptom_database: Dict):
+        self.symptoms = list(symptom_database.items())
+        self.levels = [list(data["severity_indicators"].items()) for _, data in self.symptoms]
+        
+        # Tag ("symptom", symptom index, severity level index); level -1 is the symptom's name
+        self.entries = []
+        for index, (_, symptom_data) in enumerate(self.symptoms):
+            self.entries.append((symptom_data["ar"], ("symptom", index, -1)))
+            for level_index, (_, severity_data) in enumerate(self.levels[index]):
+                self.entries.extend(
+                    (keyword, ("symptom", index, level_index))
+                    for keyword in normalized_keywords(severity_data["keywords"])
+                )
+        self.matcher = KeywordMatcher(self.entries, normalize=True)
+    
+    def detect(self, message: str) -> List[Dict]:
+        return self.from_tags(self.matcher.tags(message))
+    
+    def from_tags(self, tags) -> List[Dict]:
+        """Detected symptoms from the tags of a scan (other tags are ignored)"""
+        detected = []
+        named = set()
+        
+        for _, index, level_index in sorted(tag for tag in tags if tag[0] == "symptom"):
+            symptom_key, symptom_data = self.symptoms[index]
+            if level_index == -1:
+                named.add(index)
+                detected.append({
+                    "symptom": symptom_key,
+                    "ar_name": symptom_data["ar"],
+                    "category": symptom_data["category"],
+                    "confidence": 0.9
+                })
+            elif index not in named:
+                severity_level, severity_data = self.levels[index][level_index]
+                detected.append({
+                    "symptom": symptom_key,
+                    "ar_name": symptom_data["ar"],
+                    "category": symptom_data["category"],
+                    "severity_level": severity_level,
+                    "severity_ctas": severity_data["ctas"],
+                    "confidence": 0.8
+                })
+        
+        return detected
+
+
+def _table_entries(namespace: str, table: Dict[str, List[str]]):
+    return ((keyword, (namespace, key)) for key, keywords in table.items() for keyword in keywords)
+
+
+# Every keyword table of the engine normalized and compiled once into a single matcher
+symptom_matcher = SymptomMatcher(SYMPTOM_DATABASE)
+_red_flag_keys = list(RED_FLAG_PATTERNS)
+_triage_matcher = KeywordMatcher(chain(
+    symptom_matcher.entries,
+    (
+        (pattern, ("red_flag", flag_index, pattern_index))
+        for flag_index, patterns in enumerate(RED_FLAG_PATTERNS.values())
+        for pattern_index, pattern in enumerate(patterns)
+    ),
+    _table_entries("severity", normalized_table(SEVERITY_KEYWORDS)),
+    _table_entries("urgency", normalized_table(URGENCY_KEYWORDS)),
+    _table_entries("condition", normalized_table(CONDITION_KEYWORDS)),
+), normalize=True)
+
+
+@lru_cache(maxsize=256)
+def scan_message(message: str) -> FrozenSet[Tuple]:
+    """
+    Tags of every triage keyword in a message
+    
+    One pass over the message, shared by all the detectors that look at it during a turn.
+    """
+    return frozenset(_triage_matcher.tags(message))
+
+
+def detect_red_flags(message: str) -> List[Dict]:
+    """
+    Red flag phrases in a message (no engine state needed, so the fast path can run it first)
+    """
+    red_flags_found = []
+    
+    for _, flag_index, pattern_index in sorted(tag for tag in scan_message(message) if tag[0] == "red_flag"):
+        flag_key = _red_flag_keys[flag_index]
+        red_flags_found.append({
+            "flag": flag_key,
+            "pattern": RED_FLAG_PATTERNS[flag_key][pattern_index],
+            "severity": "critical",
+            "action_required": "immediate_emergency"
+        })
+    
+    return red_flags_found
+
+
+# Identity of an evidence item: seeing it again in a later turn adds nothing
+EVIDENCE_KEYS = {
+    "symptoms": lambda symptom: (symptom["symptom"], symptom.get("severity_level")),
+    "severity_indicators": lambda severity: (severity["level"], severity["urgency"], severity["score"]),
+    "red_flags": lambda red_flag: (red_flag["flag"], red_flag["pattern"]),
+}
+
 
 class AdvancedTriageEngine:
     """
@@ -31,6 +183,10 @@ class AdvancedTriageEngine:
     3. Red flag detection
     4. Age/comorbidity adjustment
     5. Pattern recognition
+    
+    Evidence (symptoms, severity indicators, red flags) is kept once per key
+    (EVIDENCE_KEYS) in the order first seen. evidence_revision changes only when
+    something new is learned, and the final CTAS is recomputed only then.
     """
     
     def __init__(self):
@@ -49,6 +205,44 @@ class AdvancedTriageEngine:
         }
         self.confidence_score = 0.0
         self.assessment_complete = False
+        self.evidence_revision = 0
+        self._evidence_keys = {field: set() for field in EVIDENCE_KEYS}
+        self._final_ctas = None
+        self._final_ctas_revision = None
+    
+    def __setstate__(self, state):
+        """
+        Unpickle, rebuilding the evidence keys (and deduplicating) for sessions saved without them
+        """
+        self.__dict__.update(state)
+        if "_evidence_keys" not in state:
+            self.evidence_revision = 0
+            self._evidence_keys = {field: set() for field in EVIDENCE_KEYS}
+            self._final_ctas = None
+            self._final_ctas_revision = None
+            for field in EVIDENCE_KEYS:
+                items, self.extracted_data[field] = self.extracted_data[field], []
+                self._add_evidence(field, items)
+    
+    def _add_evidence(self, field: str, items: List[Dict]) -> int:
+        """
+        Add the items not seen before in this session to extracted_data[field]
+        
+        Returns:
+            Number of new items
+        """
+        key_of = EVIDENCE_KEYS[field]
+        seen = self._evidence_keys[field]
+        added = 0
+        for item in items:
+            key = key_of(item)
+            if key not in seen:
+                seen.add(key)
+                self.extracted_data[field].append(item)
+                added += 1
+        if added:
+            self.evidence_revision += 1
+        return added
         
     def analyze_message(self, message: str, context: Dict = None) -> Dict:
         """
@@ -58,15 +252,15 @@ class AdvancedTriageEngine:
         
         # Extract symptoms
         detected_symptoms = self._detect_symptoms(message)
-        self.extracted_data["symptoms"].extend(detected_symptoms)
+        self._add_evidence("symptoms", detected_symptoms)
         
         # Extract severity indicators
         severity = self._assess_severity(message, detected_symptoms)
-        self.extracted_data["severity_indicators"].append(severity)
+        self._add_evidence("severity_indicators", [severity])
         
         # Check for red flags
         red_flags = self._check_red_flags(message)
-        self.extracted_data["red_flags"].extend(red_flags)
+        self._add_evidence("red_flags", red_flags)
         
         # Extract vital information
         self._extract_vital_info(message)
@@ -90,68 +284,16 @@ class AdvancedTriageEngine:
         """
         Detect symptoms mentioned in the message using NLP and keyword matching
         """
-        detected = []
-        message_lower = message.lower()
-        
-        for symptom_key, symptom_data in SYMPTOM_DATABASE.items():
-            # Check Arabic name
-            if symptom_data["ar"] in message:
-                detected.append({
-                    "symptom": symptom_key,
-                    "ar_name": symptom_data["ar"],
-                    "category": symptom_data["category"],
-                    "confidence": 0.9
-                })
-                continue
-            
-            # Check severity keywords
-            for severity_level, severity_data in symptom_data["severity_indicators"].items():
-                for keyword in severity_data["keywords"]:
-                    if keyword in message:
-                        detected.append({
-                            "symptom": symptom_key,
-                            "ar_name": symptom_data["ar"],
-                            "category": symptom_data["category"],
-                            "severity_level": severity_level,
-                            "severity_ctas": severity_data["ctas"],
-                            "confidence": 0.8
-                        })
-                        break
-        
-        return detected
+        return symptom_matcher.from_tags(scan_message(message))
     
     def _assess_severity(self, message: str, symptoms: List[Dict]) -> Dict:
         """
         Assess the severity of symptoms based on descriptors and context
         """
-        severity_keywords = {
-            "severe": ["شديد", "قوي", "لا يطاق", "أسوأ", "فظيع"],
-            "moderate": ["متوسط", "مزعج", "ملحوظ"],
-            "mild": ["خفيف", "بسيط", "طفيف", "قليل"]
-        }
-        
-        urgency_keywords = {
-            "immediate": ["الآن", "فوراً", "طوارئ", "مفاجئ", "فجأة"],
-            "urgent": ["عاجل", "سريع", "مستعجل"],
-            "routine": ["عادي", "منذ فترة", "مزمن"]
-        }
-        
-        severity_level = "mild"
-        urgency_level = "routine"
-        
-        message_lower = message.lower()
-        
-        # Check severity
-        for level, keywords in severity_keywords.items():
-            if any(keyword in message for keyword in keywords):
-                severity_level = level
-                break
-        
-        # Check urgency
-        for level, keywords in urgency_keywords.items():
-            if any(keyword in message for keyword in keywords):
-                urgency_level = level
-                break
+        # Most severe / most urgent level with a keyword in the message
+        found = scan_message(message)
+        severity_level = next((level for level in SEVERITY_KEYWORDS if ("severity", level) in found), "mild")
+        urgency_level = next((level for level in URGENCY_KEYWORDS if ("urgency", level) in found), "routine")
         
         # Calculate severity score
         severity_score = self._calculate_severity_score(severity_level, urgency_level, symptoms)
@@ -193,32 +335,7 @@ class AdvancedTriageEngine:
         """
         Check for red flag symptoms that require immediate attention
         """
-        red_flags_found = []
-        
-        red_flag_patterns = {
-            "chest_pain_severe": ["ألم صدر شديد", "ألم صدر ضاغط", "ألم في الصدر والذراع"],
-            "difficulty_breathing": ["لا أستطيع التنفس", "صعوبة شديدة في التنفس", "أختنق"],
-            "loss_of_consciousness": ["فقدت الوعي", "أغمي علي", "فاقد الوعي"],
-            "severe_bleeding": ["نزيف شديد", "دم كثير", "لا يتوقف النزيف"],
-            "stroke_symptoms": ["ضعف في الذراع", "كلام غير واضح", "وجه متدلي"],
-            "severe_headache": ["أسوأ صداع", "صداع مفاجئ شديد", "صداع كالصاعقة"],
-            "confusion": ["مشوش", "لا أعرف أين أنا", "تشوش ذهني"],
-            "high_fever_with_rash": ["حمى مرتفعة وطفح", "حمى وبقع"],
-            "vomiting_blood": ["تقيؤ دم", "قيء أحمر", "قيء أسود"],
-            "severe_abdominal_pain": ["ألم بطن شديد", "بطن صلب", "ألم حاد في البطن"]
-        }
-        
-        for flag_key, patterns in red_flag_patterns.items():
-            for pattern in patterns:
-                if pattern in message:
-                    red_flags_found.append({
-                        "flag": flag_key,
-                        "pattern": pattern,
-                        "severity": "critical",
-                        "action_required": "immediate_emergency"
-                    })
-        
-        return red_flags_found
+        return detect_red_flags(message)
     
     def _extract_vital_info(self, message: str):
         """
@@ -233,7 +350,7 @@ class AdvancedTriageEngine:
         for pattern in age_patterns:
             match = re.search(pattern, message)
             if match:
-                self.extracted_data["age"] = int(match.group(1))
+                self._set_vital("age", int(match.group(1)))
                 break
         
         # Extract duration
@@ -244,21 +361,21 @@ class AdvancedTriageEngine:
         for pattern in duration_patterns:
             match = re.search(pattern, message)
             if match:
-                self.extracted_data["duration"] = f"{match.group(1)} {match.group(2)}"
+                self._set_vital("duration", f"{match.group(1)} {match.group(2)}")
                 break
         
         # Extract chronic conditions
-        condition_keywords = {
-            "diabetes": ["سكري", "السكر"],
-            "hypertension": ["ضغط", "ضغط الدم"],
-            "asthma": ["ربو", "الربو"],
-            "heart_disease": ["قلب", "قلبية"]
-        }
-        
-        for condition, keywords in condition_keywords.items():
-            if any(keyword in message for keyword in keywords):
+        found = scan_message(message)
+        for condition in CONDITION_KEYWORDS:
+            if ("condition", condition) in found:
                 if condition not in self.extracted_data["chronic_conditions"]:
                     self.extracted_data["chronic_conditions"].append(condition)
+                    self.evidence_revision += 1
+    
+    def _set_vital(self, field: str, value):
+        if self.extracted_data[field] != value:
+            self.extracted_data[field] = value
+            self.evidence_revision += 1
     
     def _calculate_confidence(self) -> float:
         """
@@ -324,6 +441,15 @@ class AdvancedTriageEngine:
         return questions[:2]  # Return max 2 questions
     
     def calculate_final_ctas(self) -> Dict:
+        """
+        Final CTAS assessment, recomputed only when the evidence has changed since the last call
+        """
+        if self._final_ctas is None or self._final_ctas_revision != self.evidence_revision:
+            self._final_ctas = self._compute_final_ctas()
+            self._final_ctas_revision = self.evidence_revision
+        return self._final_ctas
+    
+    def _compute_final_ctas(self) -> Dict:
         """
         Calculate final CTAS level using multi-layered approach
         """
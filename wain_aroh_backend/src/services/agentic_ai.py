@@ -6,12 +6,12 @@ Agentic AI System for Wain Aroh
 - Intelligent decision making
 """
 
-from openai import OpenAI
 import json
 from datetime import datetime, timedelta
 from src.data.facilities_ngh import FACILITIES, get_clinics, get_virtual_opd, get_main_hospital
+from src.services.llm_gateway import llm_gateway
 
-client = OpenAI()
+client = llm_gateway.client('agentic_ai')
 
 class AgenticAI:
     """
@@ -1,10 +1,12 @@
 import os
 import json
-from openai import OpenAI
 from src.data.facilities import CTAS_DEFINITIONS, get_facilities_by_ctas, get_recommended_care_type
+from src.services.llm_gateway import llm_gateway
 
-# Initialize OpenAI client (API key is already configured in environment)
-client = OpenAI()
+# Model calls go through the shared LLM gateway (pooled connections, deadlines, retries)
+client = llm_gateway.client('ai_triage')
+# Interactive triage: fail over to the caller's error path instead of waiting LLM_TIMEOUT_SECONDS
+TRIAGE_DEADLINE_SECONDS = float(os.environ.get('TRIAGE_DEADLINE_SECONDS', 10))
 
 TRIAGE_SYSTEM_PROMPT = """أنت مساعد طبي ذكي متخصص في تقييم الحالات الصحية وتوجيه المرضى إلى الجهة الصحية المناسبة.
 
@@ -52,6 +54,7 @@ def chat_with_ai(messages, session_data=None):
         
         # Call OpenAI API
         response = client.chat.completions.create(
+            deadline=TRIAGE_DEADLINE_SECONDS,
             model="gpt-4.1-mini",
             messages=full_messages,
             temperature=0.7,
@@ -123,6 +126,7 @@ def analyze_symptoms(symptoms_text):
 """
         
         response = client.chat.completions.create(
+            deadline=TRIAGE_DEADLINE_SECONDS,
             model="gpt-4.1-mini",
             messages=[
                 {"role": "system", "content": TRIAGE_SYSTEM_PROMPT},
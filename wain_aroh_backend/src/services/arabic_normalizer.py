@@ -0,0 +1,56 @@
+"""
+Arabic Normalizer
+Spelling normalization for matching patient messages against the Arabic keyword tables
+
+Patients write the same word several ways: أ/إ/آ/ا, ى/ي, ة/ه, with or
+without tatweel (ـ) and diacritics. normalize_arabic() folds these to one
+form (and lowercases the English names mixed into some tables). Keyword
+tables are normalized and deduplicated once at load time with
+normalized_keywords()/normalized_table(), so the knowledge base needs one
+spelling per keyword and each incoming message is normalized once.
+
+Normalization removes characters, so match positions refer to the
+normalized text.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, Hashable, Iterable, List
+
+# Tatweel, tanween, harakat, shadda, sukun, hamza marks and superscript alef
+_MARKS = re.compile('[\u0640\u064B-\u065F\u0670]')
+# str.replace per letter: several times faster than str.translate on Arabic text
+_LETTERS = (('أ', 'ا'), ('إ', 'ا'), ('آ', 'ا'), ('ٱ', 'ا'), ('ى', 'ي'), ('ة', 'ه'))
+
+
+def _normalize(text: str) -> str:
+    text = _MARKS.sub('', text)
+    for variant, letter in _LETTERS:
+        text = text.replace(variant, letter)
+    return text.lower()
+
+
+@lru_cache(maxsize=256)
+def normalize_arabic(text: str) -> str:
+    """
+    Normalized spelling of a message
+
+    Cached: the detectors that look at the same message during a turn share one normalization.
+    """
+    return _normalize(text)
+
+
+def normalized_keywords(keywords: Iterable[str]) -> List[str]:
+    """
+    Normalized keywords of one table entry, without the redundant ones
+
+    Drops duplicates after normalization and keywords that contain another keyword of
+    the entry (any text with them also has the shorter one, so the entry matches anyway).
+    """
+    unique = list(dict.fromkeys(keyword for keyword in map(_normalize, keywords) if keyword))
+    return [keyword for keyword in unique if not any(other != keyword and other in keyword for other in unique)]
+
+
+def normalized_table(table: Dict[Hashable, Iterable[str]]) -> Dict[Hashable, List[str]]:
+    """A {key: [keywords]} table with normalized_keywords() for every key"""
+    return {key: normalized_keywords(keywords) for key, keywords in table.items()}
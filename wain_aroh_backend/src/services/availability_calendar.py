@@ -0,0 +1,140 @@
+"""
+Availability Calendar
+Materialized per-service availability intervals for the next N days
+
+Each service's availability timeline is stored as rows of
+ServiceAvailabilityInterval and regenerated only for the affected service
+when ScheduleManager writes its schedules or overrides (and for every
+service by refresh_availability_calendar.py as the window rolls), so
+routing reads availability with one indexed range query instead of
+resolving schedules. Reads never write: services without rows are
+resolved live.
+"""
+
+import os
+from datetime import datetime, time, timedelta
+from typing import Dict, Iterable
+
+from ..models.user import db
+from ..models.service_schedule import (
+    HospitalService, ServiceAvailabilityInterval,
+    availability_timelines, evaluate_availability
+)
+
+
+class AvailabilityCalendar:
+    """Materialized availability calendar, regenerated on writes"""
+
+    def __init__(self, horizon_days=None):
+        if horizon_days is None:
+            horizon_days = int(os.environ.get('AVAILABILITY_CALENDAR_DAYS', 14))
+        self.horizon_days = horizon_days
+        self.hits = 0
+        self.misses = 0
+        self.regenerated = 0
+        self.last_regenerated_at = None
+
+    def window(self, now: datetime = None):
+        """Calendar window [today 00:00, today + horizon_days)"""
+        start = datetime.combine((now or datetime.now()).date(), time.min)
+        return start, start + timedelta(days=self.horizon_days)
+
+    def regenerate(self, service_ids: Iterable[int] = None) -> Dict[int, list]:
+        """
+        Rebuild the calendar rows of some services (default: all)
+
+        Returns:
+            dict mapping service_id to its freshly computed segments
+        """
+        if service_ids is None:
+            service_ids = [service_id for (service_id,) in db.session.query(HospitalService.id)]
+        service_ids = list(dict.fromkeys(service_ids))
+        if not service_ids:
+            return {}
+
+        window_start, window_end = self.window()
+        timelines = availability_timelines(service_ids, window_start, window_end)
+
+        ServiceAvailabilityInterval.query.filter(
+            ServiceAvailabilityInterval.service_id.in_(service_ids)
+        ).delete(synchronize_session=False)
+
+        now = datetime.utcnow()
+        db.session.bulk_insert_mappings(ServiceAvailabilityInterval, [
+            {
+                "service_id": service_id,
+                "start_datetime": segment["start"],
+                "end_datetime": segment["end"],
+                "available": segment["available"],
+                "status": segment["status"],
+                "result": self._result(segment),
+                "generated_at": now
+            }
+            for service_id, segments in timelines.items()
+            for segment in segments
+        ])
+        db.session.commit()
+
+        self.regenerated += len(service_ids)
+        self.last_regenerated_at = now
+        return timelines
+
+    def lookup(self, service_ids: Iterable[int], check_datetime: datetime = None,
+               services: dict = None) -> Dict[int, dict]:
+        """
+        Availability of many services at one instant
+
+        Same result as evaluate_availability. Inside the calendar window this
+        is a single range read; services without rows (unknown ids, or whose
+        window has rolled past before the next refresh) and instants outside
+        the window are resolved live, without writing.
+        """
+        if check_datetime is None:
+            check_datetime = datetime.now()
+
+        service_ids = list(dict.fromkeys(service_ids))
+        if not service_ids:
+            return {}
+
+        window_start, window_end = self.window()
+        if not window_start <= check_datetime < window_end:
+            return evaluate_availability(service_ids, check_datetime, services=services)
+
+        results = {
+            interval.service_id: interval.result
+            for interval in ServiceAvailabilityInterval.query.filter(
+                ServiceAvailabilityInterval.service_id.in_(service_ids),
+                ServiceAvailabilityInterval.start_datetime <= check_datetime,
+                ServiceAvailabilityInterval.end_datetime > check_datetime
+            )
+        }
+
+        missing = [service_id for service_id in service_ids if service_id not in results]
+        self.hits += len(service_ids) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            results.update(evaluate_availability(missing, check_datetime, services=services))
+
+        return {service_id: results[service_id] for service_id in service_ids}
+
+    def stats(self) -> Dict:
+        """Calendar hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            "horizon_days": self.horizon_days,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups * 100, 2) if lookups else 0.0,
+            "services_regenerated": self.regenerated,
+            "last_regenerated_at": self.last_regenerated_at.isoformat() if self.last_regenerated_at else None
+        }
+
+    @staticmethod
+    def _result(segment: dict) -> dict:
+        """Availability result of a segment without its bounds"""
+        return {key: value for key, value in segment.items() if key not in ("start", "end")}
+
+
+# Global instance
+availability_calendar = AvailabilityCalendar()
@@ -0,0 +1,170 @@
+"""
+Conversation Context
+Bounded model input for ConversationalAI: the last N turns verbatim, older turns
+folded into a running summary, and the structured facts already in the state
+
+Layout of every request:
+    system prompt
+    system: facts (symptoms, CTAS, location, region) + summary of folded turns
+    last CONVERSATION_KEEP_TURNS turns, verbatim
+    per-turn instructions
+
+The whole request is kept under CONVERSATION_PROMPT_BUDGET tokens: older turns
+are folded first, then the summary is shortened, then the oldest verbatim
+messages are truncated (the patient's latest message last).
+"""
+
+import os
+from typing import Dict, List, Tuple
+
+from src.services.token_count import MESSAGE_OVERHEAD_TOKENS, estimate_tokens
+
+SUMMARY_LINE_CHARS = 160        # folded messages are clipped to this length
+MAX_SUMMARY_LINES = 24          # oldest lines drop off first (the facts keep what matters)
+TRUNCATION_MARK = "…"
+
+
+def count_message_tokens(messages: List[Dict]) -> int:
+    """Prompt tokens of a chat request"""
+    return sum(estimate_tokens(message['content']) + MESSAGE_OVERHEAD_TOKENS for message in messages)
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 1] + TRUNCATION_MARK
+
+
+def _truncate_to_tokens(text: str, tokens: int) -> str:
+    """Keep the end of a text (the most recent part) within a token count"""
+    if tokens <= 0:
+        return TRUNCATION_MARK
+    if estimate_tokens(text) <= tokens:
+        return text
+    keep = len(text)
+    while keep > 0 and estimate_tokens(text[-keep:]) + 1 > tokens:
+        keep = int(keep * 0.8)
+    return TRUNCATION_MARK + text[-keep:] if keep else TRUNCATION_MARK
+
+
+class ConversationContext:
+    """Builds the messages sent to the model for one conversation turn"""
+
+    def __init__(self, keep_turns: int = None, token_budget: int = None):
+        self.keep_turns = keep_turns or int(os.environ.get('CONVERSATION_KEEP_TURNS', 4))
+        self.token_budget = token_budget or int(os.environ.get('CONVERSATION_PROMPT_BUDGET', 3000))
+
+    def check_budget(self, system_prompt: str):
+        """Fail early if the fixed system prompt alone leaves no room for the conversation"""
+        fixed = count_message_tokens([{'content': system_prompt}])
+        if fixed >= self.token_budget:
+            raise ValueError(
+                f"CONVERSATION_PROMPT_BUDGET ({self.token_budget}) must exceed the system prompt ({fixed} tokens)"
+            )
+
+    def build(self, system_prompt: str, state: Dict, instructions: List[str] = None) -> Tuple[List[Dict], int]:
+        """
+        Model input for the current turn
+
+        Folds turns older than keep_turns into state['context_summary'] (so the
+        state must be saved afterwards).
+
+        Returns:
+            (messages, estimated prompt tokens)
+        """
+        self._fold(state, self._recent_start(state))
+
+        head = {'role': 'system', 'content': system_prompt}
+        tail = [{'role': 'system', 'content': text} for text in (instructions or [])]
+
+        messages, context, recent = self._assemble(head, state, tail)
+        tokens = count_message_tokens(messages)
+
+        # Over budget: fold more turns (keeping the latest patient message)
+        while tokens > self.token_budget and len(recent) > 1:
+            self._fold(state, state.get('context_folded', 0) + self._first_turn_length(recent))
+            messages, context, recent = self._assemble(head, state, tail)
+            tokens = count_message_tokens(messages)
+
+        # Still over: shorten the summary, oldest lines first
+        while tokens > self.token_budget and state.get('context_summary'):
+            state['context_summary'] = state['context_summary'][1:]
+            messages, context, recent = self._assemble(head, state, tail)
+            tokens = count_message_tokens(messages)
+
+        # Still over (very long messages): truncate the facts and remaining turns,
+        # the patient's latest message last; the system prompt and instructions are kept
+        for message in ([context] if context else []) + recent:
+            excess = tokens - self.token_budget
+            if excess <= 0:
+                break
+            before = estimate_tokens(message['content'])
+            message['content'] = _truncate_to_tokens(message['content'], before - excess)
+            tokens -= before - estimate_tokens(message['content'])
+
+        return messages, tokens
+
+    def _recent_start(self, state) -> int:
+        """Index of the first message of the last keep_turns turns (a turn starts at a patient message)"""
+        messages = state['messages']
+        turns = 0
+        for index in range(len(messages) - 1, state.get('context_folded', 0) - 1, -1):
+            if messages[index]['role'] == 'user':
+                turns += 1
+                if turns == self.keep_turns:
+                    return index
+        return state.get('context_folded', 0)
+
+    def _first_turn_length(self, recent) -> int:
+        """Messages up to (not including) the second patient message"""
+        for index in range(1, len(recent)):
+            if recent[index]['role'] == 'user':
+                return index
+        return len(recent) - 1
+
+    def _fold(self, state, fold_to: int):
+        """Move messages [context_folded, fold_to) into the running summary"""
+        folded = state.get('context_folded', 0)
+        if fold_to <= folded:
+            return
+        summary = state.setdefault('context_summary', [])
+        for message in state['messages'][folded:fold_to]:
+            if message['role'] == 'user':
+                summary.append(f"المريض: {_clip(message['content'], SUMMARY_LINE_CHARS)}")
+            elif message['role'] == 'assistant':
+                summary.append(f"المساعد: {_clip(message['content'], SUMMARY_LINE_CHARS // 2)}")
+            # System notes (location, region) are covered by the facts
+        del summary[:-MAX_SUMMARY_LINES]
+        state['context_folded'] = fold_to
+
+    def _assemble(self, head, state, tail):
+        """(messages, context message or None, verbatim messages) for the current fold point"""
+        context = self._context_message(state)
+        recent = [{'role': message['role'], 'content': message['content']}
+                  for message in state['messages'][state.get('context_folded', 0):]]
+        messages = [dict(head)] + ([context] if context else []) + recent + [dict(message) for message in tail]
+        return messages, context, recent
+
+    def _context_message(self, state):
+        """Structured facts and the summary of folded turns, as one system message"""
+        facts = []
+        if state.get('symptoms'):
+            facts.append(f"الأعراض: {'، '.join(state['symptoms'])}")
+        if state.get('ctas_level'):
+            facts.append(f"مستوى CTAS: {state['ctas_level']}")
+        location = state.get('location') or {}
+        if location:
+            place = location.get('city') or location.get('address') or ''
+            facts.append(f"الموقع: {place} ({location.get('latitude')}, {location.get('longitude')})".strip())
+        region = state.get('region') or {}
+        if region.get('code') not in (None, 'unknown'):
+            facts.append(f"المنطقة: {region.get('name_ar') or region['code']}")
+        facts.append(f"المرحلة: {state.get('stage')}")
+
+        summary = state.get('context_summary') or []
+        if not summary and len(facts) == 1:
+            return None
+
+        content = "معلومات المحادثة حتى الآن:\n" + "\n".join(f"- {fact}" for fact in facts)
+        if summary:
+            content += "\n\nملخص الرسائل السابقة:\n" + "\n".join(summary)
+        return {'role': 'system', 'content': content}
@@ -3,8 +3,9 @@ Conversational AI for Wain Aroh
 Natural dialogue-based interaction for patient navigation
 """
 
-from openai import OpenAI
 import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from src.services.location_service import location_service
 from src.services.agentic_ai import agentic_ai
@@ -12,8 +13,55 @@ from src.services.location_detector import location_detector
 from src.data.facilities_ngh import get_main_hospital
 from src.services.recommendation_generator import generate_recommendations, format_recommendations_response
 from src.services.region_detector import region_detector
-
-client = OpenAI()
+from src.services.session_store import create_session_store
+from src.services.response_streaming import JsonStringFieldStream
+from src.services.conversation_context import ConversationContext
+from src.services.system_prompt_builder import system_prompt_builder
+from src.services.llm_gateway import llm_gateway
+from src.services import red_flag_fast_path
+
+client = llm_gateway.client('conversational_ai')
+# A patient is waiting on every call here: give up well before the gateway's LLM_TIMEOUT_SECONDS
+TURN_DEADLINE_SECONDS = float(os.environ.get('CONVERSATION_DEADLINE_SECONDS', 12))
+
+CONVERSATION_STAGES = ['greeting', 'symptoms', 'location', 'triage', 'recommendation', 'booking', 'closing']
+
+# Reply and analysis in one completion (CONVERSATION_TURN_MODE=structured).
+# "reply" comes first so it can be streamed while the analysis is still being generated.
+TURN_SCHEMA = {
+    "name": "conversation_turn",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "reply": {"type": "string"},
+            "analysis": {
+                "type": "object",
+                "properties": {
+                    "stage": {"type": "string", "enum": CONVERSATION_STAGES},
+                    "ctas_level": {"type": ["integer", "null"]},
+                    "symptoms": {"type": "array", "items": {"type": "string"}},
+                    "wants_booking": {"type": "boolean"}
+                },
+                "required": ["stage", "ctas_level", "symptoms", "wants_booking"],
+                "additionalProperties": False
+            }
+        },
+        "required": ["reply", "analysis"],
+        "additionalProperties": False
+    }
+}
+
+TURN_INSTRUCTIONS = """أجب بصيغة JSON فقط:
+- reply: ردك على المريض (النص الذي سيظهر له)
+- analysis: تحليل المحادثة بعد ردك:
+  stage: المرحلة الحالية (greeting, symptoms, location, triage, recommendation, booking, closing)
+  ctas_level: مستوى CTAS (1-5) إذا كان واضحاً، وإلا null
+  symptoms: الأعراض المذكورة
+  wants_booking: هل المريض يريد حجز موعد؟"""
+
+# Analysis calls running alongside the reply (CONVERSATION_TURN_MODE=concurrent)
+_analysis_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='conversation-analysis')
 
 class ConversationalAI:
     """
@@ -27,133 +75,20 @@ class ConversationalAI:
     """
     
     def __init__(self):
-        self.conversation_state = {}
-        self.system_prompt = self._build_system_prompt()
-    
-    def _build_system_prompt(self):
-        """Build comprehensive system prompt for conversational AI"""
-        return """أنت مساعد طبي ذكي لنظام "وين أروح" - نظام التوجيه الصحي الذكي في المملكة العربية السعودية.
-
-**مهمتك الرئيسية:**
-توجيه المرضى للمكان الصحيح بناءً على حالتهم الصحية.
-
-**أسلوب المحادثة:**
-- تحدث بالعربية الفصحى البسيطة
-- كن ودوداً ومطمئناً
-- اسأل أسئلة واضحة ومباشرة
-- لا تستخدم مصطلحات طبية معقدة
-- كن متعاطفاً مع المريض
-
-**خطوات المحادثة:**
-
-1. **الترحيب والسؤال عن الحالة:**
-   - ابدأ بالترحيب
-   - اسأل: "كيف يمكنني مساعدتك؟" أو "ما الذي تشعر به؟"
-
-2. **جمع المعلومات عن الأعراض:**
-   - اسأل عن الأعراض بالتفصيل
-   - متى بدأت الأعراض؟
-   - ما شدة الألم (1-10)؟
-   - هل هناك أعراض أخرى؟
-   - هل حدث فجأة أم تدريجياً؟
-
-3. **السؤال عن الموقع بشكل طبيعي:**
-   - بعد فهم الحالة، اسأل: "أين أنت الآن؟" أو "في أي حي تسكن؟"
-   - إذا لم يعرف، اقترح: "هل يمكنك مشاركة موقعك الحالي لأساعدك في إيجاد أقرب مركز؟"
-   - اشرح: "سأستخدم موقعك فقط لتوجيهك لأقرب مركز رعاية مناسب"
-
-4. **تقييم الحالة (CTAS):**
-   - حدد مستوى الخطورة:
-     * CTAS 1: حالة حرجة جداً (فقدان وعي، ألم صدر شديد مع ضيق تنفس، نزيف حاد)
-     * CTAS 2: حالة طارئة (ألم صدر شديد، كسور، حمى عالية مع أعراض خطيرة)
-     * CTAS 3: حالة عاجلة (آلام متوسطة، حمى، إصابات بسيطة)
-     * CTAS 4: حالة أقل إلحاحاً (أعراض خفيفة، يمكن الانتظار)
-     * CTAS 5: حالة غير عاجلة (فحص دوري، استشارة عامة)
-
-5. **التوجيه للمكان المناسب (فقط بعد التقييم الكامل):**
-   - لا تقدم التوصيات في بداية المحادثة
-   - اجمع المعلومات الكافية أولاً (الأعراض، الشدة، المدة، الموقع)
-   - بعد التقييم الكامل، قدم التوصيات:
-     * CTAS 1-2: طوارئ أقرب مستشفى (في جازان: 22 مستشفى متاح، في الرياض: مستشفى الحرس الوطني)
-     * CTAS 3: مركز رعاية عاجلة (UCC) إذا كان قريباً (18 مركز في جازان، 3 في الرياض)
-     * CTAS 4-5: عيادة أو مركز رعاية ممتدة أو عيادة افتراضية
-
-6. **تقديم التفاصيل:**
-   - اسم المنشأة
-   - العنوان
-   - المسافة والوقت المتوقع
-   - رقم الهاتف
-   - رابط الخريطة
-
-7. **حجز موعد إذا لزم الأمر:**
-   - للحالات غير العاجلة (CTAS 4-5)
-   - اسأل: "هل تريد حجز موعد؟"
-   - اجمع المعلومات: الاسم، رقم الجوال، التاريخ المفضل
-   - احجز وأكد الموعد
-
-8. **الختام:**
-   - اسأل: "هل هناك شيء آخر يمكنني مساعدتك فيه؟"
-   - قدم نصائح إضافية إذا لزم الأمر
-   - تمنى له السلامة
-
-**معلومات مهمة:**
-
-**المناطق المشمولة بالخدمة:**
-
-**1. منطقة الرياض:**
-- مستشفى الحرس الوطني - الرياض (طوارئ 24/7)
-- 3 مراكز رعاية عاجلة (UCC)
-- عيادات متعددة
-
-**2. منطقة جازان (التغطية الشاملة):**
-- 22 مستشفى عام ومتخصص
-- 18 مركز رعاية عاجلة وممتدة
-- تغطية 17 مدينة في المنطقة
-- 1.4 مليون مستفيد
-
-**أهم المستشفيات في جازان:**
-1. مستشفى الملك فهد المركزي - جازان (500 سرير، طوارئ 24/7)
-2. مستشفى الأمير محمد بن ناصر - جازان (450 سرير، طوارئ 24/7)
-3. مستشفى جازان العام (400 سرير، طوارئ 24/7)
-4. مستشفى صبيا العام (300 سرير، طوارئ 24/7)
-5. مستشفى صامطة العام (250 سرير، طوارئ 24/7)
-6. مستشفى أبو عريش العام (200 سرير، طوارئ 24/7)
-7. مستشفى بيش العام (200 سرير، طوارئ 24/7)
-
-**مراكز الرعاية العاجلة في جازان (18 مركز):**
-- 6 مراكز تعمل 24 ساعة
-- 12 مركز تعمل 16 ساعة يومياً
-- موزعة في جميع مدن المنطقة
-
-**حالات الطوارئ:**
-- إذا كانت الحالة حرجة جداً، انصح بالاتصال بالإسعاف 997
-- للحالات الطارئة، وجه للطوارئ في أقرب مستشفى
-- في جازان: جميع المستشفيات الـ22 بها أقسام طوارئ 24/7
-- في الرياض: مستشفى الحرس الوطني ومستشفيات أخرى
-
-**ملاحظات:**
-- لا تقدم تشخيصاً طبياً
-- لا تصف أدوية
-- ركز على التوجيه للمكان المناسب
-- كن حذراً مع الحالات الحرجة
-
-**أمثلة على الأسئلة:**
-- "ما الذي تشعر به؟"
-- "متى بدأت هذه الأعراض؟"
-- "هل الألم شديد؟ من 1 إلى 10، كم تقيمه؟"
-- "هل هناك أعراض أخرى مثل حمى أو غثيان؟"
-- "أين أنت الآن؟ في أي حي؟"
-- "هل يمكنك مشاركة موقعك لأساعدك في إيجاد أقرب مركز؟"
-- "هل تريد حجز موعد في العيادة؟"
-
-**تذكر:**
-أنت تساعد المرضى في اتخاذ القرار الصحيح حول المكان الذي يجب أن يذهبوا إليه.
-كن واضحاً، ودوداً، ومطمئناً.
-"""
+        # Per-session state; every method writes the state back after changing it
+        self.conversation_state = create_session_store('conversation')
+        # structured: one completion returns the reply and the analysis (default)
+        # concurrent: reply and analysis completions run in parallel (the analysis
+        #             sees the conversation up to the patient's message)
+        # sequential: analysis completion after the reply
+        self.turn_mode = os.environ.get('CONVERSATION_TURN_MODE', 'structured')
+        # Recent turns verbatim + running summary, within a per-request token budget
+        self.context = ConversationContext()
+        self.context.check_budget(system_prompt_builder.template_prompt())
     
     def start_conversation(self, session_id):
         """Start a new conversation"""
-        self.conversation_state[session_id] = {
+        state = {
             'messages': [],
             'patient_data': {},
             'location': None,
@@ -169,10 +104,11 @@ class ConversationalAI:
 أنا هنا لمساعدتك في معرفة المكان المناسب للرعاية الصحية.
 
 كيف يمكنني مساعدتك اليوم؟ ما الذي تشعر به؟"""  
-        self.conversation_state[session_id]['messages'].append({
+        state['messages'].append({
             'role': 'assistant',
             'content': welcome_message
         })
+        self.conversation_state[session_id] = state
         
         return {
             'session_id': session_id,
@@ -183,10 +119,124 @@ class ConversationalAI:
     def process_message(self, session_id, user_message, gps_data=None):
         """Process user message and generate response"""
         
-        if session_id not in self.conversation_state:
-            self.start_conversation(session_id)
+        state, messages, prompt_tokens = self._prepare_turn(session_id, user_message, gps_data)
         
-        state = self.conversation_state[session_id]
+        # Red flags: CTAS 1 instruction and nearest emergency department, no model call
+        fast_response = red_flag_fast_path.check_message(user_message, state['location'])
+        if fast_response:
+            return self._red_flag_turn(session_id, state, fast_response)
+        
+        analysis = None
+        if self.turn_mode == 'structured':
+            response = client.chat.completions.create(
+                deadline=TURN_DEADLINE_SECONDS,
+                model="gpt-4.1-mini",
+                messages=messages,
+                temperature=0.7,
+                max_tokens=700,
+                response_format={'type': 'json_schema', 'json_schema': TURN_SCHEMA}
+            )
+            assistant_message, analysis = self._parse_structured_turn(response.choices[0].message.content, state)
+        else:
+            if self.turn_mode == 'concurrent':
+                pending_analysis = _analysis_pool.submit(self._analyze_conversation, state)
+            
+            # Call GPT-4 for response
+            response = client.chat.completions.create(
+                deadline=TURN_DEADLINE_SECONDS,
+                model="gpt-4.1-mini",
+                messages=messages,
+                temperature=0.7,
+                max_tokens=500
+            )
+            
+            assistant_message = response.choices[0].message.content
+            
+            if self.turn_mode == 'concurrent':
+                analysis = pending_analysis.result()
+        
+        self._record_prompt_tokens(prompt_tokens, getattr(response, 'usage', None))
+        return self._complete_turn(session_id, state, user_message, assistant_message, analysis, prompt_tokens)
+    
+    def stream_message(self, session_id, user_message, gps_data=None):
+        """
+        Streaming variant of process_message
+        
+        Yields ("token", text) for each piece of the reply as it arrives, then
+        ("done", response_data) once the turn has been analyzed and saved.
+        """
+        state, messages, prompt_tokens = self._prepare_turn(session_id, user_message, gps_data)
+        
+        fast_response = red_flag_fast_path.check_message(user_message, state['location'])
+        if fast_response:
+            yield 'token', fast_response['message']
+            yield 'done', self._red_flag_turn(session_id, state, fast_response)
+            return
+        
+        structured = self.turn_mode == 'structured'
+        pending_analysis = None
+        if structured:
+            stream = client.chat.completions.create(
+                deadline=TURN_DEADLINE_SECONDS,
+                model="gpt-4.1-mini",
+                messages=messages,
+                temperature=0.7,
+                max_tokens=700,
+                response_format={'type': 'json_schema', 'json_schema': TURN_SCHEMA},
+                stream=True,
+                stream_options={'include_usage': True}
+            )
+            reply_field = JsonStringFieldStream('reply')
+        else:
+            if self.turn_mode == 'concurrent':
+                pending_analysis = _analysis_pool.submit(self._analyze_conversation, state)
+            stream = client.chat.completions.create(
+                deadline=TURN_DEADLINE_SECONDS,
+                model="gpt-4.1-mini",
+                messages=messages,
+                temperature=0.7,
+                max_tokens=500,
+                stream=True,
+                stream_options={'include_usage': True}
+            )
+        
+        parts = []
+        usage = None
+        for chunk in stream:
+            # The final chunk carries the usage and no choices
+            usage = getattr(chunk, 'usage', None) or usage
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                text = reply_field.feed(delta) if structured else delta
+                if text:
+                    yield 'token', text
+        
+        content = ''.join(parts)
+        analysis = None
+        if structured:
+            assistant_message, analysis = self._parse_structured_turn(content, state, reply_field)
+        else:
+            assistant_message = content
+            if pending_analysis:
+                analysis = pending_analysis.result()
+        
+        self._record_prompt_tokens(prompt_tokens, usage)
+        yield 'done', self._complete_turn(session_id, state, user_message, assistant_message, analysis, prompt_tokens)
+    
+    def _prepare_turn(self, session_id, user_message, gps_data):
+        """
+        Record the user message and GPS data
+        
+        Returns:
+            (state, model input, prompt token counts {'estimated', 'actual', 'budget'})
+        """
+        state = self.conversation_state.get(session_id)
+        if state is None:
+            self.start_conversation(session_id)
+            state = self.conversation_state[session_id]
         
         # Add user message to conversation
         state['messages'].append({
@@ -217,27 +267,52 @@ class ConversationalAI:
                     'content': f"معلومة للنظام: {region_message}"
                 })
         
-        # Build conversation context
-        messages = [
-            {'role': 'system', 'content': self.system_prompt}
-        ] + state['messages']
-        
         # Add context about current stage
+        instructions = []
         if state['stage'] == 'symptoms' and not state['location_provided']:
-            messages.append({
-                'role': 'system',
-                'content': 'ملاحظة: بعد جمع معلومات كافية عن الأعراض، اسأل المريض عن موقعه الحالي بشكل طبيعي.'
-            })
+            instructions.append('ملاحظة: بعد جمع معلومات كافية عن الأعراض، اسأل المريض عن موقعه الحالي بشكل طبيعي.')
+        if self.turn_mode == 'structured':
+            instructions.append(TURN_INSTRUCTIONS)
         
-        # Call GPT-4 for response
-        response = client.chat.completions.create(
-            model="gpt-4.1-mini",
-            messages=messages,
-            temperature=0.7,
-            max_tokens=500
-        )
+        # Build conversation context (recent turns + summary, within the token budget)
+        # System prompt for the current stage, with the facilities of the patient's region only
+        system_prompt = system_prompt_builder.build((state.get('region') or {}).get('code'), state['stage'])
+        messages, estimated = self.context.build(system_prompt, state, instructions)
+        prompt_tokens = {'estimated': estimated, 'actual': None, 'budget': self.context.token_budget}
         
-        assistant_message = response.choices[0].message.content
+        return state, messages, prompt_tokens
+    
+    def _red_flag_turn(self, session_id, state, fast_response):
+        """Record the fast-path CTAS 1 reply and save the state"""
+        state['messages'].append({
+            'role': 'assistant',
+            'content': fast_response['message']
+        })
+        state['stage'] = 'recommendation'
+        state['ctas_level'] = 1
+        self.conversation_state[session_id] = state
+        
+        return {
+            'session_id': session_id,
+            'message': fast_response['message'],
+            'stage': state['stage'],
+            'request_location': not state['location_provided'],
+            'ctas_level': 1,
+            'red_flags': fast_response['red_flags'],
+            'nearest_emergency': fast_response['nearest_emergency'],
+            'call_ambulance': fast_response['call_ambulance'],
+            'fast_path': True,
+            'fast_path_ms': fast_response['fast_path_ms']
+        }
+    
+    def _record_prompt_tokens(self, prompt_tokens, usage):
+        """Fill in the prompt tokens the API reports for the turn"""
+        if usage is not None and getattr(usage, 'prompt_tokens', None) is not None:
+            prompt_tokens['actual'] = usage.prompt_tokens
+    
+    def _complete_turn(self, session_id, state, user_message, assistant_message, analysis=None, prompt_tokens=None):
+        """Record the assistant reply, advance the conversation stage and save the state"""
+        location_confirmation = None
         
         # Add assistant response to conversation
         state['messages'].append({
@@ -245,8 +320,9 @@ class ConversationalAI:
             'content': assistant_message
         })
         
-        # Analyze conversation to determine stage and actions
-        analysis = self._analyze_conversation(state)
+        # Analyze conversation to determine stage and actions (unless the turn already did)
+        if analysis is None:
+            analysis = self._analyze_conversation(state)
         
         # Update state based on analysis
         state['stage'] = analysis['stage']
@@ -294,7 +370,7 @@ class ConversationalAI:
                     'role': 'system',
                     'content': confirmation
                 })
-                response_data['location_confirmation'] = confirmation
+                location_confirmation = confirmation
         
         # Generate response with actions
         response_data = {
@@ -304,6 +380,14 @@ class ConversationalAI:
             'request_location': should_request_location
         }
         
+        if location_confirmation:
+            response_data['location_confirmation'] = location_confirmation
+        
+        if prompt_tokens:
+            response_data['prompt_tokens'] = prompt_tokens
+            # Per-turn log for checking the budget (last 50 turns)
+            state['prompt_tokens'] = (state.get('prompt_tokens', []) + [prompt_tokens])[-50:]
+        
         if should_request_location and not state['location_provided']:
             state['location_requested'] = True
             
@@ -359,8 +443,48 @@ class ConversationalAI:
             response_data['recommendations'] = recommendations
             response_data['show_recommendations'] = True
         
+        self.conversation_state[session_id] = state
         return response_data
     
+    def _parse_structured_turn(self, content, state, reply_field=None):
+        """
+        Split a structured completion into the reply text and the analysis
+        
+        A truncated or malformed completion keeps the current analysis; its reply is
+        the text decoded from the "reply" field (reply_field when streamed), and the
+        raw content only when there is no such field.
+        """
+        try:
+            turn = json.loads(content)
+            reply = turn['reply']
+            raw = turn.get('analysis') or {}
+        except (ValueError, TypeError, KeyError, AttributeError):
+            if reply_field is None:
+                reply_field = JsonStringFieldStream('reply')
+                reply_field.feed(content)
+            return (reply_field.text if reply_field.found else content), self._fallback_analysis(state)
+        
+        analysis = self._fallback_analysis(state)
+        if not isinstance(raw, dict):
+            return reply, analysis
+        if raw.get('stage') in CONVERSATION_STAGES:
+            analysis['stage'] = raw['stage']
+        if isinstance(raw.get('ctas_level'), int) and 1 <= raw['ctas_level'] <= 5:
+            analysis['ctas_level'] = raw['ctas_level']
+        if isinstance(raw.get('symptoms'), list) and raw['symptoms']:
+            analysis['symptoms'] = raw['symptoms']
+        analysis['wants_booking'] = bool(raw.get('wants_booking'))
+        return reply, analysis
+    
+    def _fallback_analysis(self, state):
+        """Analysis that leaves the conversation where it is"""
+        return {
+            'stage': state['stage'],
+            'ctas_level': state['ctas_level'],
+            'symptoms': state['symptoms'],
+            'wants_booking': False
+        }
+    
     def _analyze_conversation(self, state):
         """Analyze conversation to determine stage and extract information"""
         
@@ -392,6 +516,7 @@ class ConversationalAI:
         
         try:
             response = client.chat.completions.create(
+                deadline=TURN_DEADLINE_SECONDS,
                 model="gpt-4.1-mini",
                 messages=[
                     {'role': 'user', 'content': analysis_prompt}
@@ -411,12 +536,7 @@ class ConversationalAI:
             pass
         
         # Fallback analysis
-        return {
-            'stage': state['stage'],
-            'ctas_level': state['ctas_level'],
-            'symptoms': state['symptoms'],
-            'wants_booking': False
-        }
+        return self._fallback_analysis(state)
     
     def _format_facility_message(self, recommendation, patient_location):
         """Format facility recommendation as conversational message"""
@@ -488,6 +608,7 @@ class ConversationalAI:
             
             state['booking_slots'] = slots
             state['stage'] = 'booking'
+            self.conversation_state[session_id] = state
             
             return {
                 'session_id': session_id,
@@ -524,6 +645,7 @@ class ConversationalAI:
         
         if result['success']:
             state['stage'] = 'closing'
+            self.conversation_state[session_id] = state
             return {
                 'session_id': session_id,
                 'message': result['confirmation_message'],
@@ -544,13 +666,27 @@ class ConversationalAI:
         
         return state['messages']
 
+    def get_context_info(self, session_id):
+        """Running summary, folded message count and per-turn prompt tokens of a session"""
+        state = self.conversation_state.get(session_id)
+        if not state:
+            return None
+        
+        return {
+            'message_count': len(state['messages']),
+            'folded_messages': state.get('context_folded', 0),
+            'summary': state.get('context_summary', []),
+            'keep_turns': self.context.keep_turns,
+            'token_budget': self.context.token_budget,
+            'prompt_tokens': state.get('prompt_tokens', [])
+        }
+
     def add_file_analysis_to_context(self, session_id, analysis_message, filename):
         """Add file analysis to conversation context"""
-        if session_id not in self.conversation_state:
+        state = self.conversation_state.get(session_id)
+        if state is None:
             return
         
-        state = self.conversation_state[session_id]
-        
         # Add file analysis as system message
         state['messages'].append({
             'role': 'system',
@@ -566,6 +702,7 @@ class ConversationalAI:
             'analysis': analysis_message,
             'timestamp': datetime.now().isoformat()
         })
+        self.conversation_state[session_id] = state
 
 
 # Initialize conversational AI
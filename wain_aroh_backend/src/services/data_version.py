@@ -0,0 +1,86 @@
+"""
+Data Version Counter
+عداد إصدار البيانات المشترك بين العمليات
+
+Per-process caches (facility snapshot, search results) are invalidated in
+the process that handled a write, but gunicorn runs several workers. Each
+writer also bumps a counter row in the database; every process compares
+its cached version with that row, read at most once per check_seconds,
+and rebuilds when it has moved.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+
+from ..models.user import db
+from ..models.data_version import DataVersion
+
+
+class DataVersionCounter:
+    """Database-backed version number of one data set"""
+
+    def __init__(self, name: str, check_seconds: float = None):
+        """
+        Args:
+            name: اسم مجموعة البيانات (مفتاح الصف)
+            check_seconds: أقصى مدة لاستخدام القيمة المقروءة قبل إعادة قراءتها
+        """
+        if check_seconds is None:
+            check_seconds = float(os.environ.get('DATA_VERSION_CHECK_SECONDS', 2))
+        self.name = name
+        self.check_seconds = check_seconds
+        self._lock = threading.Lock()
+        self._version = None
+        self._read_at = 0.0
+
+    def current(self) -> int:
+        """
+        الإصدار الحالي
+        Latest version, re-read from the database at most once per check_seconds
+
+        Must be called inside an application context.
+        """
+        now = time.monotonic()
+        if self._version is not None and now - self._read_at < self.check_seconds:
+            return self._version
+
+        version = self._read()
+        with self._lock:
+            self._version = version
+            self._read_at = now
+            return self._version
+
+    def bump(self) -> int:
+        """
+        رفع الإصدار بعد الكتابة
+        Increment the version (atomically, in its own commit) and return it
+        """
+        for _ in range(2):
+            result = db.session.execute(
+                update(DataVersion)
+                .where(DataVersion.name == self.name)
+                .values(version=DataVersion.version + 1, updated_at=datetime.utcnow())
+            )
+            if result.rowcount == 0:
+                db.session.add(DataVersion(name=self.name, version=1))
+            try:
+                db.session.commit()
+                break
+            except IntegrityError:
+                # عملية أخرى أنشأت الصف في نفس اللحظة: أعد المحاولة بالتحديث
+                db.session.rollback()
+
+        version = self._read()
+        with self._lock:
+            self._version = version
+            self._read_at = time.monotonic()
+            return self._version
+
+    def _read(self) -> int:
+        version = db.session.query(DataVersion.version).filter(DataVersion.name == self.name).scalar()
+        return version or 0
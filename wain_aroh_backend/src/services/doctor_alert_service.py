@@ -5,9 +5,9 @@ Sends alerts to assigned doctors for critical cases
 
 import json
 from datetime import datetime
-from openai import OpenAI
+from src.services.llm_gateway import llm_gateway
 
-client = OpenAI()
+client = llm_gateway.client('doctor_alert_service')
 
 class DoctorAlertService:
     """
@@ -5,9 +5,12 @@ Integrates advanced triage engine with conversational interface
 
 import os
 import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from datetime import datetime
 from typing import Dict, List, Optional
-from openai import OpenAI
 
 # Import advanced triage components
 import sys
@@ -16,6 +19,63 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 from src.services.advanced_triage_engine import AdvancedTriageEngine
 from src.services.triage_training_module import training_module
 from src.data.medical_knowledge_base import SYMPTOM_DATABASE, CTAS_GUIDELINES
+from src.services.llm_gateway import llm_gateway
+from src.services.sample_stats import percentile
+from src.services.red_flag_fast_path import red_flag_response
+
+# Completions run here so a turn can stop waiting after CONVERSATION_RESPONSE_BUDGET_MS
+# while the call finishes in the background
+_COMPLETION_WORKERS = int(os.environ.get('CONVERSATION_COMPLETION_WORKERS', 16))
+_completion_pool = ThreadPoolExecutor(max_workers=_COMPLETION_WORKERS)
+# Completions running or waiting for a worker; past this a turn is answered by the triage engine at once
+_completion_slots = threading.BoundedSemaphore(
+    _COMPLETION_WORKERS + int(os.environ.get('CONVERSATION_COMPLETION_QUEUE', 16))
+)
+
+
+class ResponseDeadlineMetrics:
+    """
+    How turns were answered (model, red flag fast path, rule-based after the deadline,
+    an error or a full completion queue) and reply latency
+    """
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self.counts = {
+            "model": 0, "fast_path": 0, "deadline_fallback": 0, "error_fallback": 0, "overload_fallback": 0,
+            "late_replies": 0, "late_errors": 0, "cancelled": 0
+        }
+        self.reply_ms = deque(maxlen=window)
+        self.late_ms = deque(maxlen=window)
+
+    def record_turn(self, source: str, reply_ms: float):
+        with self._lock:
+            self.counts[source] += 1
+            self.reply_ms.append(reply_ms)
+
+    def record_cancelled(self):
+        with self._lock:
+            self.counts["cancelled"] += 1
+    
+    def record_late(self, completion_ms: float, error: bool = False):
+        with self._lock:
+            self.counts["late_errors" if error else "late_replies"] += 1
+            self.late_ms.append(completion_ms)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            fallbacks = sum(self.counts[source] for source in ("deadline_fallback", "error_fallback", "overload_fallback"))
+            turns = self.counts["model"] + self.counts["fast_path"] + fallbacks
+            return {
+                **self.counts,
+                "turns": turns,
+                "fallback_rate": round(fallbacks / turns, 4) if turns else None,
+                "reply_ms_p50": percentile(self.reply_ms, 50),
+                "reply_ms_p95": percentile(self.reply_ms, 95),
+                "reply_ms_p99": percentile(self.reply_ms, 99),
+                "late_completion_ms_p50": percentile(self.late_ms, 50),
+            }
+
 
 class EnhancedConversationalAI:
     """
@@ -23,11 +83,31 @@ class EnhancedConversationalAI:
     """
     
     def __init__(self):
-        self.client = OpenAI()
+        self.client = llm_gateway.client('enhanced_conversational_ai')
         self.triage_engine = None
         self.conversation_history = []
         self.session_id = None
         self.session_start_time = None
+        self.late_replies = []
+        self.recorded_revision = None
+        # Latency SLO: answer from the triage engine if the model has not replied in time (0 = wait)
+        self.response_budget_ms = int(os.environ.get('CONVERSATION_RESPONSE_BUDGET_MS', 4000))
+        # A completion still running this long after it started is abandoned (frees its worker and gateway slot)
+        self.completion_deadline_ms = int(
+            os.environ.get('CONVERSATION_COMPLETION_DEADLINE_MS', 3 * self.response_budget_ms)
+        )
+    
+    def __getstate__(self):
+        """
+        Pickle without the gateway client (sessions are persisted by the session store)
+        """
+        state = self.__dict__.copy()
+        state.pop('client', None)
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.client = llm_gateway.client('enhanced_conversational_ai')
         
     def start_new_session(self, session_id: str = None):
         """
@@ -37,6 +117,8 @@ class EnhancedConversationalAI:
         self.session_start_time = datetime.now()
         self.triage_engine = AdvancedTriageEngine()
         self.conversation_history = []
+        self.late_replies = []
+        self.recorded_revision = None
         
         welcome_message = self._generate_welcome_message()
         
@@ -56,9 +138,94 @@ class EnhancedConversationalAI:
 
 كيف يمكنني مساعدتك اليوم؟ ما الذي تشعر به؟"""
     
-    def process_message(self, user_message: str, context: Dict = None) -> Dict:
+    def process_message(self, user_message: str, context: Dict = None, on_late_reply=None) -> Dict:
         """
         Process user message with advanced triage analysis
+        
+        Args:
+            on_late_reply: Called with this instance and the index in conversation_history
+                of the reply it supersedes, after a model reply that missed the response
+                budget has been recorded in late_replies (to save the session)
+        """
+        triage_analysis = self._begin_turn(user_message, context)
+        
+        # Red flags: CTAS 1 instruction and nearest emergency department, no model call
+        if triage_analysis["red_flags"]:
+            ai_response = self._red_flag_response(triage_analysis, context)
+            response_deadline_metrics.record_turn("fast_path", ai_response["fast_path_ms"])
+            return self._complete_turn(ai_response, triage_analysis)
+        
+        # Generate AI response
+        ai_response = self._generate_ai_response(user_message, triage_analysis, on_late_reply)
+        
+        return self._complete_turn(ai_response, triage_analysis)
+    
+    def stream_message(self, user_message: str, context: Dict = None):
+        """
+        Streaming variant of process_message
+        
+        Yields ("token", text) for each piece of the reply as it arrives, then
+        ("done", response) with the triage analysis, final assessment and
+        recommendations once the turn is complete. With red flags the CTAS 1
+        instruction is sent first and the model's text follows it.
+        """
+        triage_analysis = self._begin_turn(user_message, context)
+        messages = self._build_messages(user_message, triage_analysis)
+        
+        fast_response = None
+        if triage_analysis["red_flags"]:
+            fast_response = self._red_flag_response(triage_analysis, context)
+            response_deadline_metrics.record_turn("fast_path", fast_response["fast_path_ms"])
+            yield "token", fast_response["message"] + "\n\n"
+        
+        parts = []
+        stream_error = None
+        try:
+            stream = self.client.chat.completions.create(
+                deadline=self.completion_deadline_ms / 1000 if self.completion_deadline_ms else None,
+                model="gpt-4.1-mini",
+                messages=messages,
+                temperature=0.7,
+                max_tokens=500,
+                stream=True
+            )
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield "token", delta
+        except Exception as e:
+            if fast_response:
+                # The patient already has the emergency instruction
+                fast_response["error"] = str(e)
+                yield "done", self._complete_turn(fast_response, triage_analysis)
+                return
+            if not parts:
+                ai_response = self._fallback_response(triage_analysis, e)
+                yield "token", ai_response["message"]
+                yield "done", self._complete_turn(ai_response, triage_analysis)
+                return
+            # Cut off mid-reply: keep what the patient has already seen
+            stream_error = e
+        
+        if fast_response:
+            # No follow-up questions in an emergency
+            ai_response = {**fast_response, "message": fast_response["message"] + "\n\n" + "".join(parts)}
+        else:
+            # Follow-up question is appended after the model's text, so stream it last
+            follow_up = self._follow_up_suffix(triage_analysis)
+            if follow_up:
+                yield "token", follow_up
+            ai_response = self._build_response("".join(parts) + follow_up, triage_analysis)
+        if stream_error:
+            ai_response["error"] = str(stream_error)
+        yield "done", self._complete_turn(ai_response, triage_analysis)
+    
+    def _begin_turn(self, user_message: str, context: Dict = None) -> Dict:
+        """
+        Record the user message and run the triage analysis on it
         """
         # Add to conversation history
         self.conversation_history.append({
@@ -68,11 +235,12 @@ class EnhancedConversationalAI:
         })
         
         # Analyze message with triage engine
-        triage_analysis = self.triage_engine.analyze_message(user_message, context)
-        
-        # Generate AI response
-        ai_response = self._generate_ai_response(user_message, triage_analysis)
-        
+        return self.triage_engine.analyze_message(user_message, context)
+    
+    def _complete_turn(self, ai_response: Dict, triage_analysis: Dict) -> Dict:
+        """
+        Record the AI response and attach the final assessment when complete
+        """
         # Add AI response to history
         self.conversation_history.append({
             "role": "assistant",
@@ -95,9 +263,83 @@ class EnhancedConversationalAI:
         
         return ai_response
     
-    def _generate_ai_response(self, user_message: str, triage_analysis: Dict) -> Dict:
+    def _generate_ai_response(self, user_message: str, triage_analysis: Dict, on_late_reply=None) -> Dict:
         """
         Generate contextual AI response using GPT
+        
+        Waits at most response_budget_ms for the model; after that the reply
+        comes from the triage engine and the model's answer, when it arrives
+        (within completion_deadline_ms), is kept in late_replies for this turn.
+        A completion that has not started by then is cancelled, and when the
+        completion queue is full the triage engine answers without a call.
+        """
+        messages = self._build_messages(user_message, triage_analysis)
+        started = time.perf_counter()
+        
+        if not _completion_slots.acquire(blocking=False):
+            response_deadline_metrics.record_turn("overload_fallback", (time.perf_counter() - started) * 1000)
+            response = self._deadline_response(triage_analysis)
+            response["fallback"] = "overload"
+            return response
+        try:
+            future = _completion_pool.submit(
+                self.client.chat.completions.create,
+                model="gpt-4.1-mini",
+                messages=messages,
+                temperature=0.7,
+                max_tokens=500,
+                deadline=self.completion_deadline_ms / 1000 if self.completion_deadline_ms else None
+            )
+        except Exception:
+            _completion_slots.release()
+            raise
+        future.add_done_callback(lambda done: _completion_slots.release())
+        
+        try:
+            response = future.result(timeout=self.response_budget_ms / 1000 if self.response_budget_ms else None)
+        except FutureTimeoutError:
+            if future.cancel():
+                # Still queued: no call is made and nothing arrives late
+                response_deadline_metrics.record_cancelled()
+            else:
+                turn = len(self.conversation_history) - 1
+                future.add_done_callback(lambda done: self._record_late_reply(done, turn, started, on_late_reply))
+            response_deadline_metrics.record_turn("deadline_fallback", (time.perf_counter() - started) * 1000)
+            return self._deadline_response(triage_analysis)
+        except Exception as e:
+            response_deadline_metrics.record_turn("error_fallback", (time.perf_counter() - started) * 1000)
+            return self._fallback_response(triage_analysis, e)
+        
+        response_deadline_metrics.record_turn("model", (time.perf_counter() - started) * 1000)
+        ai_message = response.choices[0].message.content
+        
+        return self._build_response(ai_message + self._follow_up_suffix(triage_analysis), triage_analysis)
+    
+    def _record_late_reply(self, future, turn: int, started: float, on_late_reply=None):
+        """
+        Keep the model reply of a turn that was answered by the triage engine
+        """
+        completion_ms = (time.perf_counter() - started) * 1000
+        if future.exception() is not None:
+            response_deadline_metrics.record_late(completion_ms, error=True)
+            return
+        
+        response_deadline_metrics.record_late(completion_ms)
+        self.late_replies.append({
+            "turn": turn,
+            "message": future.result().choices[0].message.content,
+            "completion_ms": round(completion_ms, 1),
+            "timestamp": datetime.now().isoformat()
+        })
+        if on_late_reply:
+            try:
+                on_late_reply(self, turn + 1)
+            except Exception as e:
+                print(f"Error saving late reply: {e}")
+    
+    def _build_messages(self, user_message: str, triage_analysis: Dict) -> List[Dict]:
+        """
+        Build the model input: system prompt, recent history and the current message
         """
         # Build system prompt with medical context
         system_prompt = self._build_system_prompt(triage_analysis)
@@ -116,44 +358,74 @@ class EnhancedConversationalAI:
         # Add current message
         messages.append({"role": "user", "content": user_message})
         
-        try:
-            # Call OpenAI API
-            response = self.client.chat.completions.create(
-                model="gpt-4.1-mini",
-                messages=messages,
-                temperature=0.7,
-                max_tokens=500
-            )
-            
-            ai_message = response.choices[0].message.content
-            
-            # Add follow-up questions if needed
-            if triage_analysis["next_questions"]:
-                ai_message += "\n\n" + triage_analysis["next_questions"][0]
-            
-            return {
-                "message": ai_message,
-                "detected_symptoms": triage_analysis["detected_symptoms"],
-                "confidence": triage_analysis["confidence"],
-                "red_flags": triage_analysis["red_flags"]
-            }
-            
-        except Exception as e:
-            # Fallback response
-            fallback_message = "شكراً لمشاركة هذه المعلومات. "
-            
-            if triage_analysis["next_questions"]:
-                fallback_message += triage_analysis["next_questions"][0]
-            else:
-                fallback_message += "هل يمكنك إخباري المزيد عن أعراضك؟"
-            
-            return {
-                "message": fallback_message,
-                "detected_symptoms": triage_analysis["detected_symptoms"],
-                "confidence": triage_analysis["confidence"],
-                "red_flags": triage_analysis["red_flags"],
-                "error": str(e)
-            }
+        return messages
+    
+    def _follow_up_suffix(self, triage_analysis: Dict) -> str:
+        """
+        Follow-up question appended to the model's reply, if any
+        """
+        if triage_analysis["next_questions"]:
+            return "\n\n" + triage_analysis["next_questions"][0]
+        return ""
+    
+    def _build_response(self, ai_message: str, triage_analysis: Dict) -> Dict:
+        """
+        Response payload for a reply text
+        """
+        return {
+            "message": ai_message,
+            "detected_symptoms": triage_analysis["detected_symptoms"],
+            "confidence": triage_analysis["confidence"],
+            "red_flags": triage_analysis["red_flags"]
+        }
+    
+    def _fallback_response(self, triage_analysis: Dict, error: Exception) -> Dict:
+        """
+        Response used when the model call fails
+        """
+        response = self._build_response(self._rule_based_message(triage_analysis), triage_analysis)
+        response["error"] = str(error)
+        response["fallback"] = "error"
+        return response
+    
+    def _red_flag_response(self, triage_analysis: Dict, context: Dict = None) -> Dict:
+        """
+        Precomputed CTAS 1 reply with the nearest emergency department (context location, if sent)
+        """
+        context = context or {}
+        fast = red_flag_response(triage_analysis["red_flags"], context.get("location") or context)
+        
+        response = self._build_response(fast["message"], triage_analysis)
+        for key in ("nearest_emergency", "call_ambulance", "fast_path", "fast_path_ms"):
+            response[key] = fast[key]
+        return response
+    
+    def _deadline_response(self, triage_analysis: Dict) -> Dict:
+        """
+        Response used when the model has not replied within response_budget_ms
+        """
+        response = self._build_response(self._rule_based_message(triage_analysis), triage_analysis)
+        response["fallback"] = "deadline"
+        return response
+    
+    def _rule_based_message(self, triage_analysis: Dict) -> str:
+        """
+        Reply from the triage engine alone: the assessment once complete, else its next question
+        """
+        message = "شكراً لمشاركة هذه المعلومات. "
+        
+        if triage_analysis["assessment_complete"]:
+            assessment = self.triage_engine.calculate_final_ctas()
+            message += f"تصنيف حالتك: CTAS {assessment['ctas_level']}"
+            if assessment.get("ctas_name_ar"):
+                message += f" ({assessment['ctas_name_ar']})"
+            message += f". {assessment['reasoning_ar']}"
+        elif triage_analysis["next_questions"]:
+            message += triage_analysis["next_questions"][0]
+        else:
+            message += "هل يمكنك إخباري المزيد عن أعراضك؟"
+        
+        return message
     
     def _build_system_prompt(self, triage_analysis: Dict) -> str:
         """
@@ -257,16 +529,28 @@ class EnhancedConversationalAI:
     def _record_session(self, final_assessment: Dict):
         """
         Record completed session for training
+        
+        Once per evidence revision: turns that add nothing to the assessment are not
+        recorded again. The conversation is recorded without the per-turn triage data,
+        which the deduplicated evidence lists already hold.
         """
+        revision = self.triage_engine.evidence_revision
+        if getattr(self, 'recorded_revision', None) == revision:
+            return
+        
+        extracted_data = self.triage_engine.extracted_data
         session_data = {
             "session_id": self.session_id,
-            "age": self.triage_engine.extracted_data.get("age"),
-            "gender": self.triage_engine.extracted_data.get("gender"),
-            "chronic_conditions": self.triage_engine.extracted_data.get("chronic_conditions", []),
-            "conversation": self.conversation_history,
-            "symptoms": self.triage_engine.extracted_data.get("symptoms", []),
-            "severity_indicators": self.triage_engine.extracted_data.get("severity_indicators", []),
-            "red_flags": self.triage_engine.extracted_data.get("red_flags", []),
+            "age": extracted_data.get("age"),
+            "gender": extracted_data.get("gender"),
+            "chronic_conditions": extracted_data.get("chronic_conditions", []),
+            "conversation": [
+                {key: value for key, value in message.items() if key != "triage_data"}
+                for message in self.conversation_history
+            ],
+            "symptoms": extracted_data.get("symptoms", []),
+            "severity_indicators": extracted_data.get("severity_indicators", []),
+            "red_flags": extracted_data.get("red_flags", []),
             "ctas_level": final_assessment["ctas_level"],
             "confidence": final_assessment["confidence"],
             "reasoning": final_assessment["reasoning_ar"]
@@ -274,6 +558,7 @@ class EnhancedConversationalAI:
         
         try:
             training_module.record_triage_session(session_data)
+            self.recorded_revision = revision
         except Exception as e:
             print(f"Error recording session: {e}")
     
@@ -287,8 +572,10 @@ class EnhancedConversationalAI:
             "message_count": len(self.conversation_history),
             "symptoms_detected": len(self.triage_engine.extracted_data.get("symptoms", [])) if self.triage_engine else 0,
             "confidence": self.triage_engine.confidence_score if self.triage_engine else 0,
-            "assessment_complete": self.triage_engine.assessment_complete if self.triage_engine else False
+            "assessment_complete": self.triage_engine.assessment_complete if self.triage_engine else False,
+            "late_replies": len(getattr(self, 'late_replies', []))
         }
 
 # Create global instance
 enhanced_ai = EnhancedConversationalAI()
+response_deadline_metrics = ResponseDeadlineMetrics()
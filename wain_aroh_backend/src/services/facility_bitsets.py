@@ -0,0 +1,138 @@
+"""
+فهارس مقلوبة بصيغة مجموعات بت لفلاتر البحث
+Bitset inverted indexes for the categorical search filters
+"""
+
+from typing import Dict, List, Iterable
+
+from ..models.search import FacilityProfile, SearchFilters
+
+
+def bitset_ordinals(mask: int) -> List[int]:
+    """
+    استخراج أرقام المنشآت من مجموعة البت
+    Decode a bitset into the ascending list of set ordinals
+    """
+    if not mask:
+        return []
+
+    # التحويل إلى نص ثنائي ثم البحث عن الآحاد أسرع من تقشير البتات واحداً واحداً
+    bits = bin(mask)[:1:-1]
+    ordinals = []
+    position = bits.find('1')
+    while position != -1:
+        ordinals.append(position)
+        position = bits.find('1', position + 1)
+    return ordinals
+
+
+def bitset_from_ordinals(ordinals: Iterable[int], size: int) -> int:
+    """
+    بناء مجموعة بت من أرقام المنشآت
+    Build a bitset from ordinals in one pass (avoids O(n) int copies per bit)
+    """
+    buffer = bytearray((size + 7) // 8)
+    for ordinal in ordinals:
+        buffer[ordinal >> 3] |= 1 << (ordinal & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+class BitsetMembership:
+    """
+    اختبار العضوية في مجموعة بت دون فكها
+    Container view over a bitset, for cheap ``ordinal in view`` checks
+    """
+
+    __slots__ = ("mask",)
+
+    def __init__(self, mask: int):
+        self.mask = mask
+
+    def __contains__(self, ordinal: int) -> bool:
+        return bool((self.mask >> ordinal) & 1)
+
+
+class FacilityBitsetIndex:
+    """
+    فهرس مقلوب من كل قيمة فلتر إلى مجموعة بت من أرقام المنشآت
+    Maps each filter value to a Python int used as a bitset of facility ordinals
+
+    Bit ``i`` is set when ``facilities[i]`` has the value. Filters then become
+    AND/OR operations on integers instead of per-facility list membership tests.
+    """
+
+    FIELDS = ("specialties", "services", "organization", "cluster")
+
+    def __init__(self, facilities: List[FacilityProfile]):
+        self.size = len(facilities)
+        self.all_mask = (1 << self.size) - 1
+
+        postings: Dict[str, Dict[str, List[int]]] = {name: {} for name in self.FIELDS}
+        active, emergency, appointments = [], [], []
+
+        for ordinal, facility in enumerate(facilities):
+            for specialty in set(facility.specialties):
+                postings["specialties"].setdefault(specialty, []).append(ordinal)
+            for service in set(facility.services):
+                postings["services"].setdefault(service, []).append(ordinal)
+            postings["organization"].setdefault(facility.organization, []).append(ordinal)
+            postings["cluster"].setdefault(facility.cluster, []).append(ordinal)
+
+            if facility.is_active:
+                active.append(ordinal)
+            if facility.accepts_emergency:
+                emergency.append(ordinal)
+            if facility.accepts_appointments:
+                appointments.append(ordinal)
+
+        self.values: Dict[str, Dict[str, int]] = {
+            name: {
+                value: bitset_from_ordinals(ordinals, self.size)
+                for value, ordinals in bucket.items()
+            }
+            for name, bucket in postings.items()
+        }
+        self.active_mask = bitset_from_ordinals(active, self.size)
+        self.emergency_mask = bitset_from_ordinals(emergency, self.size)
+        self.appointments_mask = bitset_from_ordinals(appointments, self.size)
+
+    def any_of(self, field: str, values: Iterable[str]) -> int:
+        """المنشآت التي تملك أي قيمة من القيم (OR)"""
+        bucket = self.values[field]
+        mask = 0
+        for value in values:
+            mask |= bucket.get(value, 0)
+        return mask
+
+    def all_of(self, field: str, values: Iterable[str]) -> int:
+        """المنشآت التي تملك جميع القيم (AND)"""
+        bucket = self.values[field]
+        mask = self.all_mask
+        for value in values:
+            mask &= bucket.get(value, 0)
+            if not mask:
+                break
+        return mask
+
+    def match(self, filters: SearchFilters) -> int:
+        """
+        حساب مجموعة المنشآت النشطة المطابقة للفلاتر الفئوية
+        Evaluate the specialty, organization, cluster, service, emergency and
+        appointment filters, with the same semantics as the per-facility loop
+        """
+        mask = self.active_mask
+
+        if filters.specialties:
+            mask &= self.any_of("specialties", filters.specialties)
+        if filters.organizations:
+            mask &= self.any_of("organization", filters.organizations)
+        if filters.clusters:
+            mask &= self.any_of("cluster", filters.clusters)
+        if filters.required_services:
+            mask &= self.all_of("services", filters.required_services)
+        if filters.accepts_emergency:
+            mask &= self.emergency_mask
+        if filters.accepts_appointments:
+            mask &= self.appointments_mask
+
+        return mask
@@ -0,0 +1,275 @@
+"""
+لقطة المنشآت الصحية في الذاكرة
+In-memory, versioned snapshot of FacilityProfile objects for the search API
+"""
+
+import os
+import random
+import threading
+from datetime import datetime
+from typing import List, Dict, Optional, Iterator
+
+from ..models.search import FacilityProfile, PerformanceMetrics
+from ..models.hospital import Hospital
+from .social_media_service import social_media_service
+from .social_rating_store import social_rating_store
+from .data_version import DataVersionCounter
+from .spatial_index import GridSpatialIndex
+from .facility_bitsets import FacilityBitsetIndex
+
+
+def hospital_to_facility_profile(hospital: Hospital, social_ratings: Optional[Dict] = None) -> FacilityProfile:
+    """
+    تحويل نموذج المستشفى إلى ملف المنشأة
+    Convert Hospital model to FacilityProfile
+
+    Args:
+        hospital: المستشفى
+        social_ratings: التقييمات المجمعة المخزنة (تُولَّد بشكل ثابت لكل منشأة إذا لم تُمرَّر)
+    """
+    # استخراج الموقع
+    location = {"lat": 24.7136, "lng": 46.6753}  # موقع افتراضي (الرياض)
+    if hasattr(hospital, 'latitude') and hasattr(hospital, 'longitude'):
+        if hospital.latitude and hospital.longitude:
+            location = {
+                "lat": float(hospital.latitude),
+                "lng": float(hospital.longitude)
+            }
+
+    # إنشاء مقاييس الأداء
+    # الحصول على التقييمات من مواقع التواصل الاجتماعي
+    if social_ratings is None:
+        social_ratings = social_media_service.generate_mock_ratings(
+            hospital.id,
+            hospital.name_ar if hasattr(hospital, 'name_ar') else str(hospital.id),
+            hospital.facility_type if hasattr(hospital, 'facility_type') else 'hospital',
+            # نفس البذرة المستخدمة في SocialRatingStore.refresh: تقييم ثابت عبر إعادة البناء والعمال
+            rng=random.Random(hospital.id)
+        )
+
+    # استخدام التقييم المجمع من مواقع التواصل
+    overall_rating = social_ratings['aggregate']['overall_rating']
+    total_reviews = social_ratings['aggregate']['total_reviews']
+
+    performance = PerformanceMetrics(
+        overall_rating=overall_rating,
+        total_reviews=total_reviews,
+        avg_wait_time_minutes=hospital.avg_wait_time if hasattr(hospital, 'avg_wait_time') else 30,
+        patient_satisfaction=hospital.patient_satisfaction if hasattr(hospital, 'patient_satisfaction') else 85.0,
+        on_time_appointments=hospital.on_time_rate if hasattr(hospital, 'on_time_rate') else 90.0,
+        current_occupancy=hospital.occupancy if hasattr(hospital, 'occupancy') else 75.0,
+        avg_daily_patients=hospital.daily_patients if hasattr(hospital, 'daily_patients') else 100,
+        available_beds=hospital.available_beds if hasattr(hospital, 'available_beds') else 50,
+        available_doctors=hospital.available_doctors if hasattr(hospital, 'available_doctors') else 20,
+        social_media_ratings=social_ratings
+    )
+
+    # التخصصات
+    specialties = []
+    if hasattr(hospital, 'specialties') and hospital.specialties:
+        if isinstance(hospital.specialties, str):
+            specialties = [s.strip() for s in hospital.specialties.split(',')]
+        else:
+            specialties = hospital.specialties
+
+    # الخدمات
+    # نحفظ أسماء الخدمات فقط حتى لا تحتفظ اللقطة بكائنات ORM خارج الجلسة
+    services = []
+    if hasattr(hospital, 'services') and hospital.services:
+        if isinstance(hospital.services, str):
+            services = [s.strip() for s in hospital.services.split(',')]
+        else:
+            services = [s if isinstance(s, str) else s.name_ar for s in hospital.services]
+
+    # إنشاء ملف المنشأة
+    facility = FacilityProfile(
+        id=hospital.id,
+        name=hospital.name_ar if hasattr(hospital, 'name_ar') else str(hospital.id),
+        name_en=hospital.name_en if hasattr(hospital, 'name_en') else '',
+        type=hospital.facility_type if hasattr(hospital, 'facility_type') else 'hospital',
+        location=location,
+        address=hospital.address_ar if hasattr(hospital, 'address_ar') else '',
+        city=hospital.city if hasattr(hospital, 'city') else 'الرياض',
+        district=hospital.district_ar if hasattr(hospital, 'district_ar') else '',
+        organization=hospital.organization.name_ar if hospital.organization else '',
+        cluster=hospital.cluster.name_ar if hospital.cluster else '',
+        specialties=specialties,
+        services=services,
+        phone=hospital.phone if hasattr(hospital, 'phone') else '',
+        emergency_phone=hospital.phone_emergency if hasattr(hospital, 'phone_emergency') else '',
+        email=hospital.email if hasattr(hospital, 'email') else '',
+        website=hospital.website if hasattr(hospital, 'website') else '',
+        total_beds=hospital.capacity_beds if hasattr(hospital, 'capacity_beds') else 0,
+        emergency_beds=hospital.capacity_emergency_beds if hasattr(hospital, 'capacity_emergency_beds') else 0,
+        icu_beds=0,
+        total_doctors=0,
+        performance=performance,
+        is_active=hospital.is_active if hasattr(hospital, 'is_active') else True,
+        accepts_emergency=hospital.is_emergency if hasattr(hospital, 'is_emergency') else True,
+        accepts_appointments=True,
+        description=hospital.description_ar if hasattr(hospital, 'description_ar') else '',
+    )
+
+    return facility
+
+
+class FacilitySnapshot:
+    """
+    لقطة ثابتة من ملفات المنشآت
+    Immutable set of FacilityProfile objects tagged with a data version
+
+    The snapshot is shared between concurrent requests, so nothing in it
+    may be mutated after construction. Facilities are addressed by their
+    ordinal (position in ``facilities``) inside the snapshot's indexes.
+    """
+
+    def __init__(self, facilities: List[FacilityProfile], version: int = 0):
+        self.version = version
+        self.built_at = datetime.now()
+        self.facilities = list(facilities)
+        self.by_id: Dict[int, FacilityProfile] = {f.id: f for f in self.facilities}
+
+        # فهارس مقلوبة لفلاتر التخصصات والخدمات والجهات والتجمعات
+        self.bitsets = FacilityBitsetIndex(self.facilities)
+
+        # الفهرس المكاني يضم المنشآت النشطة فقط
+        # وفهرس ثانٍ لأقسام الطوارئ وحدها (المسار السريع للحالات الحرجة)
+        self.spatial_index = GridSpatialIndex()
+        self.emergency_index = GridSpatialIndex()
+        for ordinal, facility in enumerate(self.facilities):
+            if facility.is_active:
+                self.spatial_index.insert(ordinal, facility.location["lat"], facility.location["lng"])
+                if facility.accepts_emergency:
+                    self.emergency_index.insert(ordinal, facility.location["lat"], facility.location["lng"])
+
+    @property
+    def generation(self) -> tuple:
+        """
+        معرّف هذا البناء: يتغير مع كل إعادة بناء (تغير الإصدار أو انتهاء العمر)
+        Identity of this build, for caches of results computed from it
+        """
+        return (self.version, self.built_at)
+
+    def __iter__(self) -> Iterator[FacilityProfile]:
+        return iter(self.facilities)
+
+    def __len__(self) -> int:
+        return len(self.facilities)
+
+    def get(self, facility_id: int) -> Optional[FacilityProfile]:
+        """الحصول على منشأة بواسطة المعرف"""
+        return self.by_id.get(facility_id)
+
+    def select(self, facility_ids: List[int]) -> List[FacilityProfile]:
+        """الحصول على عدة منشآت بالترتيب المطلوب"""
+        return [self.by_id[i] for i in facility_ids if i in self.by_id]
+
+
+class FacilitySnapshotStore:
+    """
+    مخزن اللقطة على مستوى العملية
+    Process-wide holder of the current FacilitySnapshot
+
+    The snapshot is built lazily on first use and rebuilt when the facility
+    data version in the database moves (invalidate() bumps it, and is called
+    by code that writes Hospital, Organization or RiyadhCluster rows, in any
+    worker process), or once it is older than max_age_seconds so that
+    refreshed rating aggregates and writes that skipped invalidate() are
+    picked up.
+    """
+
+    def __init__(self, max_age_seconds: Optional[int] = None):
+        if max_age_seconds is None:
+            max_age_seconds = int(os.environ.get('FACILITY_SNAPSHOT_MAX_AGE_SECONDS', 300))
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        self._snapshot: Optional[FacilitySnapshot] = None
+        self._data_version = DataVersionCounter('facilities')
+        self._stale = True
+        self.builds = 0
+        self.last_build_ms = 0.0
+
+    @property
+    def version(self) -> int:
+        """
+        رقم إصدار بيانات المنشآت الحالي (من قاعدة البيانات)
+
+        Must be called inside an application context.
+        """
+        return self._data_version.current()
+
+    def get(self) -> FacilitySnapshot:
+        """
+        الحصول على اللقطة الحالية، مع إعادة بنائها إذا كانت قديمة
+        Return the current snapshot, rebuilding it if it was invalidated
+
+        Must be called inside an application context.
+        """
+        version = self._data_version.current()
+        if self._is_current(self._snapshot, version):
+            return self._snapshot
+
+        with self._lock:
+            # قد يكون خيط آخر قد أعاد البناء أثناء الانتظار
+            if self._is_current(self._snapshot, version):
+                return self._snapshot
+
+            self._stale = False
+            self._snapshot = self._build(version)
+            return self._snapshot
+
+    def _is_current(self, snapshot: Optional[FacilitySnapshot], version: int) -> bool:
+        """هل اللقطة صالحة للاستخدام؟"""
+        if snapshot is None or self._stale or snapshot.version != version:
+            return False
+        age_seconds = (datetime.now() - snapshot.built_at).total_seconds()
+        return age_seconds < self.max_age_seconds
+
+    def invalidate(self):
+        """
+        إبطال اللقطة بعد تعديل بيانات المنشآت
+        Mark the snapshot stale and bump the data version in the database,
+        so every worker process rebuilds its snapshot
+
+        Must be called inside an application context, after the write was committed.
+        """
+        with self._lock:
+            self._stale = True
+        self._data_version.bump()
+
+    def stats(self) -> Dict:
+        """إحصائيات اللقطة"""
+        snapshot = self._snapshot
+        return {
+            "version": self._data_version.current(),
+            "snapshot_version": snapshot.version if snapshot is not None else None,
+            "stale": self._stale,
+            "facilities": len(snapshot) if snapshot is not None else 0,
+            "built_at": snapshot.built_at.isoformat() if snapshot is not None else None,
+            "max_age_seconds": self.max_age_seconds,
+            "builds": self.builds,
+            "last_build_ms": self.last_build_ms,
+        }
+
+    def _build(self, version: int) -> FacilitySnapshot:
+        """تحميل المنشآت من قاعدة البيانات وبناء اللقطة"""
+        start_time = datetime.now()
+
+        hospitals = Hospital.query.options(
+            *Hospital.load_options(include_services=True)
+        ).all()
+
+        # التقييمات المجمعة المخزنة: قراءة فقط باستعلام واحد
+        # (تحديثها خارج مسار الطلب: refresh_social_ratings.py أو مهمة مجدولة)
+        ratings = social_rating_store.load_all()
+
+        facilities = [hospital_to_facility_profile(h, ratings.get(h.id)) for h in hospitals]
+        snapshot = FacilitySnapshot(facilities, version=version)
+
+        self.builds += 1
+        self.last_build_ms = round((datetime.now() - start_time).total_seconds() * 1000, 2)
+        return snapshot
+
+
+# مثيل عام من المخزن
+facility_snapshot_store = FacilitySnapshotStore()
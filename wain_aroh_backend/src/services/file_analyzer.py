@@ -3,13 +3,13 @@ File Analyzer Service
 Analyzes uploaded medical files (images, PDFs, documents) using AI
 """
 
-from openai import OpenAI
 import base64
 import os
 from pathlib import Path
 import mimetypes
+from src.services.llm_gateway import llm_gateway
 
-client = OpenAI()
+client = llm_gateway.client('file_analyzer')
 
 class FileAnalyzer:
     def __init__(self):
@@ -11,8 +11,11 @@ from ..models.user import db
 from ..models.hospital import Hospital
 from ..models.service_schedule import (
     HospitalService, ServiceSchedule, ScheduleOverride,
-    ServiceRequest, is_service_available
+    ServiceRequest
 )
+from .request_log_buffer import request_log_buffer
+from .routing_rollup import routing_rollup_store
+from .availability_calendar import availability_calendar
 import math
 
 class IntelligentRouter:
@@ -88,8 +91,8 @@ class IntelligentRouter:
             Hospital.is_active == True
         ).all()
         
-        results = []
-        
+        # Keep only candidates within range
+        candidates = []
         for service, hospital in services:
             # Calculate distance
             distance = IntelligentRouter.calculate_distance(
@@ -101,8 +104,19 @@ class IntelligentRouter:
             if distance > max_distance_km:
                 continue
             
-            # Check availability
-            availability = is_service_available(service.id, check_datetime)
+            candidates.append((service, hospital, distance))
+        
+        # Check availability of all candidates with one calendar range read
+        availabilities = availability_calendar.lookup(
+            [service.id for service, _, _ in candidates],
+            check_datetime,
+            services={service.id: service for service, _, _ in candidates}
+        )
+        
+        results = []
+        
+        for service, hospital, distance in candidates:
+            availability = availabilities[service.id]
             
             # Calculate ranking score
             ranking_score = IntelligentRouter._calculate_ranking_score(
@@ -323,6 +337,13 @@ class IntelligentRouter:
             Hospital.is_active == True
         ).all()
         
+        # Check availability of all services with one calendar range read
+        availabilities = availability_calendar.lookup(
+            [service.id for service, _ in services],
+            check_datetime,
+            services={service.id: service for service, _ in services}
+        )
+        
         coverage_map = {}
         
         for service, hospital in services:
@@ -338,8 +359,7 @@ class IntelligentRouter:
                     "facilities": []
                 }
             
-            # Check availability
-            availability = is_service_available(service.id, check_datetime)
+            availability = availabilities[service.id]
             
             coverage_map[city]["total_facilities"] += 1
             
@@ -378,8 +398,8 @@ class IntelligentRouter:
         session_id: str = None,
         user_id: int = None
     ):
-        """Log a service request for analytics"""
-        request = ServiceRequest(
+        """Log a service request for analytics (queued for a batched write)"""
+        request_log_buffer.enqueue(
             service_type=service_type,
             patient_latitude=patient_lat,
             patient_longitude=patient_lon,
@@ -393,9 +413,6 @@ class IntelligentRouter:
             session_id=session_id,
             user_id=user_id
         )
-        
-        db.session.add(request)
-        db.session.commit()
     
     @staticmethod
     def get_routing_analytics(
@@ -404,53 +421,16 @@ class IntelligentRouter:
         service_type: str = None,
         city: str = None
     ) -> Dict:
-        """Get analytics for routing decisions"""
-        query = ServiceRequest.query
-        
-        if start_date:
-            query = query.filter(ServiceRequest.request_datetime >= start_date)
-        if end_date:
-            query = query.filter(ServiceRequest.request_datetime <= end_date)
-        if service_type:
-            query = query.filter(ServiceRequest.service_type == service_type)
-        if city:
-            query = query.filter(ServiceRequest.patient_city == city)
-        
-        requests = query.all()
-        
-        if not requests:
-            return {
-                "total_requests": 0,
-                "availability_rate": 0,
-                "average_distance": 0,
-                "average_wait_time": 0,
-                "acceptance_rate": 0
-            }
-        
-        total = len(requests)
-        available = sum(1 for r in requests if r.was_available)
-        accepted = sum(1 for r in requests if r.patient_accepted)
-        total_distance = sum(r.distance_km for r in requests if r.distance_km)
-        wait_times = [r.wait_time_minutes for r in requests if r.wait_time_minutes]
-        
-        return {
-            "total_requests": total,
-            "availability_rate": round((available / total) * 100, 2),
-            "average_distance": round(total_distance / total, 2),
-            "average_wait_time": round(sum(wait_times) / len(wait_times), 2) if wait_times else 0,
-            "acceptance_rate": round((accepted / total) * 100, 2) if accepted > 0 else 0,
-            "by_service_type": IntelligentRouter._group_by_field(requests, "service_type"),
-            "by_city": IntelligentRouter._group_by_field(requests, "patient_city"),
-            "by_status": IntelligentRouter._group_by_field(requests, "availability_status")
-        }
-    
-    @staticmethod
-    def _group_by_field(requests: List[ServiceRequest], field: str) -> Dict:
-        """Group requests by a field and count"""
-        groups = {}
-        for request in requests:
-            value = getattr(request, field, "Unknown")
-            if value not in groups:
-                groups[value] = 0
-            groups[value] += 1
-        return groups
+        """
+        Get analytics for routing decisions
+        
+        Aggregated in SQL: whole hours come from the hourly rollup table (plus
+        rows logged since its last sync) and the partial hours at the range
+        edges from a GROUP BY over raw rows.
+        """
+        return routing_rollup_store.analytics(
+            start_date=start_date,
+            end_date=end_date,
+            service_type=service_type,
+            city=city
+        )
@@ -0,0 +1,123 @@
+"""
+Keyword Matcher
+Multi-pattern substring matching (Aho-Corasick) for the Arabic keyword tables
+
+The triage engine, urgency analysis and location detection each check a
+message against hundreds of keywords. A KeywordMatcher is compiled once from
+(keyword, tag) pairs and finds every occurrence of every keyword in a single
+pass over the message, whatever the number of keywords; each match carries
+its span and the tag of the table entry it came from. The same keyword may
+be added under several tags.
+
+Matching is plain substring matching, like the `keyword in message` tests it
+replaces. With lowercase=True keywords and text are lowercased (for the
+English keywords mixed into some tables); with normalize=True both go through
+normalize_arabic() instead, and match positions refer to the normalized text.
+"""
+
+from collections import deque
+from typing import Dict, Hashable, Iterable, List, NamedTuple, Set, Tuple
+
+from src.services.arabic_normalizer import normalize_arabic
+
+
+class KeywordMatch(NamedTuple):
+    start: int
+    end: int
+    keyword: str
+    tag: Hashable
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over (keyword, tag) pairs"""
+
+    def __init__(self, entries: Iterable[Tuple[str, Hashable]], lowercase: bool = False, normalize: bool = False):
+        self.lowercase = lowercase
+        self.normalize = normalize
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Per state: (keyword, tag) of every keyword ending here, including via fail links
+        self._output: List[Tuple[Tuple[str, Hashable], ...]] = [()]
+        self.keywords = 0
+
+        outputs: List[List[Tuple[str, Hashable]]] = [[]]
+        for keyword, tag in entries:
+            keyword = self._prepare(keyword)
+            if not keyword:
+                continue
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    outputs.append([])
+                state = next_state
+            if (keyword, tag) not in outputs[state]:
+                outputs[state].append((keyword, tag))
+                self.keywords += 1
+
+        # Breadth-first: a state's fail link points to the longest proper suffix in the trie
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                outputs[next_state].extend(outputs[self._fail[next_state]])
+        self._output = [tuple(output) for output in outputs]
+
+    @classmethod
+    def from_table(cls, table: Dict[Hashable, Iterable[str]], lowercase: bool = False,
+                   normalize: bool = False) -> 'KeywordMatcher':
+        """Matcher for a {key: [keywords]} table, tagged with the keys"""
+        return cls(((keyword, key) for key, keywords in table.items() for keyword in keywords), lowercase, normalize)
+
+    def _prepare(self, text: str) -> str:
+        if self.normalize:
+            return normalize_arabic(text)
+        if self.lowercase:
+            return text.lower()
+        return text
+
+    def __len__(self) -> int:
+        return self.keywords
+
+    @property
+    def states(self) -> int:
+        return len(self._goto)
+
+    def find_all(self, text: str) -> List[KeywordMatch]:
+        """Every keyword occurrence in the text (overlapping ones included), in order of end position"""
+        text = self._prepare(text)
+        goto, fail, output = self._goto, self._fail, self._output
+        matches = []
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                for keyword, tag in output[state]:
+                    matches.append(KeywordMatch(index + 1 - len(keyword), index + 1, keyword, tag))
+        return matches
+
+    def tags(self, text: str) -> Set[Hashable]:
+        """Tags of the entries with at least one keyword in the text"""
+        text = self._prepare(text)
+        goto, fail, output = self._goto, self._fail, self._output
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                for _, tag in output[state]:
+                    found.add(tag)
+        return found
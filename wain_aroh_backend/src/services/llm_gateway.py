@@ -0,0 +1,479 @@
+"""
+LLM Gateway
+One shared entry point for every model call (chat, transcription, speech)
+
+The gateway owns a single pooled HTTP client (keep-alive, bounded connections)
+and wraps each call with:
+    - a per-call deadline (deadline=<seconds>, default LLM_TIMEOUT_SECONDS);
+      every attempt gets the time that is left
+    - bounded concurrency (LLM_MAX_CONCURRENCY in-flight calls; callers wait
+      at most LLM_QUEUE_TIMEOUT_SECONDS for a slot)
+    - retries with jittered exponential backoff on transient errors only
+      (connection errors, timeouts, 408/409/429, 5xx)
+    - a circuit breaker: after LLM_BREAKER_FAILURES consecutive transient
+      failures calls fail fast for LLM_BREAKER_RESET_SECONDS, then one probe
+      call decides whether to close it again
+Latency and token usage are recorded per caller (see stats()).
+
+Call sites keep the OpenAI client interface:
+    client = llm_gateway.client('ai_triage')
+    client.chat.completions.create(model=..., messages=..., deadline=10)
+
+LLM_PROVIDER=stub replaces the API with a deterministic local backend (no
+network, no key) so the whole app can be load-tested offline; its latency is
+set with LLM_STUB_TTFT_MS and LLM_STUB_MS_PER_TOKEN.
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from types import SimpleNamespace
+from typing import Dict, List
+
+import openai
+from openai import OpenAI
+
+from src.services.sample_stats import percentile
+from src.services.token_count import MESSAGE_OVERHEAD_TOKENS, estimate_tokens
+
+try:
+    import httpx
+except ImportError:  # newer openai releases ship their HTTP stack as httpx2
+    import httpx2 as httpx
+
+SAMPLE_WINDOW = 1000
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+class LLMUnavailableError(Exception):
+    """The call was not made: circuit open, no free slot, or deadline exhausted"""
+
+
+class LLMTransportError(Exception):
+    """Transient failure of the stub backend (treated like a connection error)"""
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (openai.APIConnectionError, LLMTransportError)):  # includes APITimeoutError
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS or error.status_code >= 500
+    return False
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half-open (one probe) -> closed"""
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._probing or time.monotonic() - self._opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probing or time.monotonic() - self._opened_at < self.reset_seconds:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._probing:
+                    self.trips += 1
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def release_probe(self):
+        """A probe that ended without a verdict (e.g. a non-transient error)"""
+        with self._lock:
+            self._probing = False
+
+
+class StubLLMBackend:
+    """
+    Deterministic offline stand-in for the OpenAI API
+
+    Chat replies echo the last user message; json_schema requests get a minimal
+    valid instance of the schema; streams are split on spaces and end with a
+    usage chunk. LLM_STUB_FAIL_EVERY=n makes every n-th call fail transiently.
+    """
+
+    def __init__(self, ttft_ms: float = None, ms_per_token: float = None, fail_every: int = None):
+        self.ttft_ms = ttft_ms if ttft_ms is not None else float(os.environ.get('LLM_STUB_TTFT_MS', 0))
+        self.ms_per_token = (ms_per_token if ms_per_token is not None
+                             else float(os.environ.get('LLM_STUB_MS_PER_TOKEN', 0)))
+        self.fail_every = fail_every if fail_every is not None else int(os.environ.get('LLM_STUB_FAIL_EVERY', 0))
+        self._calls = 0
+        self._lock = threading.Lock()
+
+    def _maybe_fail(self):
+        with self._lock:
+            self._calls += 1
+            calls = self._calls
+        if self.fail_every and calls % self.fail_every == 0:
+            raise LLMTransportError(f"stub transient failure (call {calls})")
+
+    def _sleep(self, seconds: float, timeout: float = None):
+        if timeout is not None and seconds > timeout:
+            time.sleep(max(timeout, 0))
+            raise LLMTransportError("stub request timed out")
+        time.sleep(seconds)
+
+    def chat(self, messages: List[Dict], response_format: Dict = None, stream: bool = False,
+             stream_options: Dict = None, timeout: float = None, **kwargs):
+        self._maybe_fail()
+        content = self._content(messages, response_format)
+        prompt_tokens = sum(
+            estimate_tokens(m['content'] if isinstance(m.get('content'), str) else '') + MESSAGE_OVERHEAD_TOKENS
+            for m in messages
+        )
+        completion_tokens = estimate_tokens(content)
+        usage = SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                total_tokens=prompt_tokens + completion_tokens)
+
+        self._sleep(self.ttft_ms / 1000, timeout)
+        if not stream:
+            self._sleep(completion_tokens * self.ms_per_token / 1000)
+            message = SimpleNamespace(role='assistant', content=content, tool_calls=None)
+            return SimpleNamespace(
+                choices=[SimpleNamespace(index=0, message=message, finish_reason='stop')], usage=usage
+            )
+        return self._chunks(content, usage if (stream_options or {}).get('include_usage') else None)
+
+    def _chunks(self, content: str, usage):
+        pieces = content.split(' ')
+        for index, piece in enumerate(pieces):
+            text = piece if index == len(pieces) - 1 else piece + ' '
+            time.sleep(estimate_tokens(text) * self.ms_per_token / 1000)
+            delta = SimpleNamespace(role='assistant', content=text)
+            yield SimpleNamespace(choices=[SimpleNamespace(index=0, delta=delta, finish_reason=None)], usage=None)
+        if usage is not None:
+            yield SimpleNamespace(choices=[], usage=usage)
+
+    def _content(self, messages, response_format) -> str:
+        last_user = next((m.get('content') for m in reversed(messages) if m.get('role') == 'user'), '')
+        if not isinstance(last_user, str):  # multimodal content parts
+            last_user = ' '.join(part.get('text', '') for part in last_user if isinstance(part, dict))
+        reply = f"رد تجريبي: {' '.join(last_user.split()[:20])}"
+
+        response_format = response_format or {}
+        if response_format.get('type') == 'json_schema':
+            schema = response_format['json_schema'].get('schema', {})
+            return json.dumps(self._instance(schema, reply), ensure_ascii=False)
+        if response_format.get('type') == 'json_object':
+            return json.dumps({"reply": reply}, ensure_ascii=False)
+        return reply
+
+    def _instance(self, schema: Dict, reply: str, name: str = None):
+        """Smallest valid value of a JSON schema (string fields named 'reply' get the stub reply)"""
+        kind = schema.get('type')
+        if isinstance(kind, list):
+            kind = 'null' if 'null' in kind else kind[0]
+        if 'enum' in schema:
+            return schema['enum'][0]
+        if kind == 'object':
+            return {key: self._instance(value, reply, key) for key, value in schema.get('properties', {}).items()}
+        if kind == 'array':
+            return []
+        if kind == 'string':
+            return reply if name == 'reply' else ''
+        if kind in ('integer', 'number'):
+            return schema.get('minimum', 0)
+        if kind == 'boolean':
+            return False
+        return None
+
+    def transcribe(self, file=None, timeout: float = None, **kwargs):
+        self._maybe_fail()
+        self._sleep(self.ttft_ms / 1000, timeout)
+        return SimpleNamespace(text="نص تجريبي")
+
+    def speech(self, input: str = '', timeout: float = None, **kwargs):
+        self._maybe_fail()
+        self._sleep(self.ttft_ms / 1000, timeout)
+        audio = b'stub-audio:' + input.encode('utf-8')
+
+        def stream_to_file(path):
+            with open(path, 'wb') as f:
+                f.write(audio)
+
+        return SimpleNamespace(content=audio, stream_to_file=stream_to_file, write_to_file=stream_to_file)
+
+
+class _CallStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.rejected = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latency_ms = deque(maxlen=SAMPLE_WINDOW)
+
+    def to_dict(self) -> Dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "rejected": self.rejected,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "latency_ms_p50": percentile(self.latency_ms, 50),
+            "latency_ms_p95": percentile(self.latency_ms, 95),
+            "latency_ms_p99": percentile(self.latency_ms, 99),
+        }
+
+
+class _GatewayStream:
+    """
+    A streamed completion that holds its concurrency slot until it is exhausted,
+    closed, or garbage collected; latency is measured to the last chunk
+    """
+
+    def __init__(self, gateway, caller, stream, started):
+        self._gateway = gateway
+        self._caller = caller
+        self._stream = iter(stream)
+        self._started = started
+        self._usage = None
+        self._finished = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            chunk = next(self._stream)
+        except StopIteration:
+            self._finish(None)
+            raise
+        except Exception as e:
+            self._finish(e)
+            raise
+        self._usage = getattr(chunk, 'usage', None) or self._usage
+        return chunk
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        close = getattr(self._stream, 'close', None)
+        if close:
+            close()
+        self._finish(None)
+
+    def __del__(self):
+        try:
+            self._finish(None)
+        except Exception:
+            pass
+
+    def _finish(self, error):
+        if self._finished:
+            return
+        self._finished = True
+        self._gateway._release(self._caller, self._started, error, self._usage)
+
+
+class _Endpoint:
+    """client.chat.completions / client.audio.transcriptions / client.audio.speech"""
+
+    def __init__(self, gateway, caller, kind):
+        self._gateway = gateway
+        self._caller = caller
+        self._kind = kind
+
+    def create(self, deadline: float = None, **kwargs):
+        return self._gateway.call(self._caller, self._kind, kwargs, deadline)
+
+
+class LLMClient:
+    """OpenAI-compatible view of the gateway for one caller (used as the stats key)"""
+
+    def __init__(self, gateway, caller: str):
+        self.caller = caller
+        self.chat = SimpleNamespace(completions=_Endpoint(gateway, caller, 'chat'))
+        self.audio = SimpleNamespace(
+            transcriptions=_Endpoint(gateway, caller, 'transcribe'),
+            speech=_Endpoint(gateway, caller, 'speech'),
+        )
+
+
+class LLMGateway:
+    """Pooled, deadline-bounded, retrying and circuit-broken access to the model API"""
+
+    def __init__(self, provider: str = None):
+        self.provider = provider or os.environ.get('LLM_PROVIDER', 'openai')
+        self.timeout_seconds = float(os.environ.get('LLM_TIMEOUT_SECONDS', 30))
+        self.connect_timeout_seconds = float(os.environ.get('LLM_CONNECT_TIMEOUT_SECONDS', 5))
+        self.max_connections = int(os.environ.get('LLM_MAX_CONNECTIONS', 20))
+        self.max_concurrency = int(os.environ.get('LLM_MAX_CONCURRENCY', 16))
+        self.queue_timeout_seconds = float(os.environ.get('LLM_QUEUE_TIMEOUT_SECONDS', 5))
+        self.max_retries = int(os.environ.get('LLM_MAX_RETRIES', 2))
+        self.retry_base_seconds = float(os.environ.get('LLM_RETRY_BASE_SECONDS', 0.5))
+        self.breaker = CircuitBreaker(
+            int(os.environ.get('LLM_BREAKER_FAILURES', 5)),
+            float(os.environ.get('LLM_BREAKER_RESET_SECONDS', 30)),
+        )
+
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._lock = threading.Lock()
+        self._stats: Dict[str, _CallStats] = {}
+        self._in_flight = 0
+        self._backend = None
+
+    def client(self, caller: str) -> LLMClient:
+        return LLMClient(self, caller)
+
+    @property
+    def backend(self):
+        """Created on first use, so importing a service never needs an API key"""
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self._backend = self._create_backend()
+        return self._backend
+
+    def _create_backend(self):
+        if self.provider == 'stub':
+            return StubLLMBackend()
+        http_client = openai.DefaultHttpxClient(
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+                keepalive_expiry=float(os.environ.get('LLM_KEEPALIVE_SECONDS', 60)),
+            ),
+            timeout=httpx.Timeout(self.timeout_seconds, connect=self.connect_timeout_seconds),
+        )
+        # Retries are done here (deadline-aware), not by the SDK
+        return OpenAI(http_client=http_client, max_retries=0)
+
+    def _invoke(self, kind: str, kwargs: Dict, timeout: float):
+        backend = self.backend
+        if isinstance(backend, StubLLMBackend):
+            method = {'chat': backend.chat, 'transcribe': backend.transcribe, 'speech': backend.speech}[kind]
+            return method(timeout=timeout, **kwargs)
+        endpoint = {
+            'chat': backend.chat.completions,
+            'transcribe': backend.audio.transcriptions,
+            'speech': backend.audio.speech,
+        }[kind]
+        return endpoint.create(timeout=timeout, **kwargs)
+
+    def call(self, caller: str, kind: str, kwargs: Dict, deadline: float = None):
+        """
+        One model call, retried within its deadline
+
+        Raises:
+            LLMUnavailableError: circuit open, no free slot in time, or deadline used up
+            The last API error when it is not transient or retries are exhausted
+        """
+        expires = time.monotonic() + (deadline or self.timeout_seconds)
+        stats = self._entry(caller)
+
+        if not self.breaker.allow():
+            with self._lock:
+                stats.rejected += 1
+            raise LLMUnavailableError("LLM circuit breaker is open")
+        if not self._slots.acquire(timeout=max(0.0, min(self.queue_timeout_seconds, expires - time.monotonic()))):
+            self.breaker.release_probe()
+            with self._lock:
+                stats.rejected += 1
+            raise LLMUnavailableError(f"LLM concurrency limit ({self.max_concurrency}) reached")
+
+        with self._lock:
+            self._in_flight += 1
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            remaining = expires - time.monotonic()
+            try:
+                if remaining <= 0:
+                    raise LLMUnavailableError("LLM call deadline exceeded")
+                result = self._invoke(kind, kwargs, remaining)
+            except Exception as e:
+                backoff = self.retry_base_seconds * (2 ** attempt) * random.uniform(0.5, 1.5)
+                if (not _is_retryable(e) or attempt >= self.max_retries
+                        or time.monotonic() + backoff >= expires):
+                    self._release(caller, started, e, None)
+                    raise
+                attempt += 1
+                with self._lock:
+                    stats.retries += 1
+                time.sleep(backoff)
+                continue
+
+            if kwargs.get('stream'):
+                return _GatewayStream(self, caller, result, started)
+            self._release(caller, started, None, getattr(result, 'usage', None))
+            return result
+
+    def _release(self, caller, started, error, usage):
+        """End of a call: free the slot, update the breaker and the stats"""
+        self._slots.release()
+        if error is None:
+            self.breaker.record_success()
+        elif _is_retryable(error) or isinstance(error, LLMUnavailableError):
+            self.breaker.record_failure()
+        else:
+            self.breaker.release_probe()
+
+        with self._lock:
+            self._in_flight -= 1
+            stats = self._entry(caller)
+            stats.calls += 1
+            stats.latency_ms.append((time.perf_counter() - started) * 1000)
+            if error is not None:
+                stats.errors += 1
+            if usage is not None:
+                stats.prompt_tokens += getattr(usage, 'prompt_tokens', 0) or 0
+                stats.completion_tokens += getattr(usage, 'completion_tokens', 0) or 0
+
+    def _entry(self, caller) -> _CallStats:
+        entry = self._stats.get(caller)
+        if entry is None:
+            entry = self._stats.setdefault(caller, _CallStats())
+        return entry
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "provider": self.provider,
+                "in_flight": self._in_flight,
+                "max_concurrency": self.max_concurrency,
+                "max_connections": self.max_connections,
+                "circuit": {"state": self.breaker.state, "trips": self.breaker.trips},
+                "callers": {caller: entry.to_dict() for caller, entry in self._stats.items()},
+            }
+
+
+# Global instance
+llm_gateway = LLMGateway()
@@ -6,6 +6,47 @@ Seamlessly detects patient location and finds nearest appropriate facility
 from src.services.location_service import location_service
 from src.data.facilities_ngh import FACILITIES, find_nearest_facilities
 import json
+from src.services.arabic_normalizer import normalized_keywords
+from src.services.keyword_matcher import KeywordMatcher
+
+# Common Riyadh neighborhoods and their coordinates
+RIYADH_NEIGHBORHOODS = {
+    # North Riyadh
+    'الملقا': {'latitude': 24.7767, 'longitude': 46.6106, 'name': 'Al Malqa'},
+    'النخيل': {'latitude': 24.7900, 'longitude': 46.6200, 'name': 'Al Nakheel'},
+    'الصحافة': {'latitude': 24.7650, 'longitude': 46.6250, 'name': 'Al Sahafa'},
+    'الياسمين': {'latitude': 24.8000, 'longitude': 46.6300, 'name': 'Al Yasmin'},
+    'الربيع': {'latitude': 24.7850, 'longitude': 46.6400, 'name': 'Al Rabie'},
+    
+    # Central Riyadh
+    'العليا': {'latitude': 24.7100, 'longitude': 46.6700, 'name': 'Al Olaya'},
+    'السليمانية': {'latitude': 24.7050, 'longitude': 46.6850, 'name': 'Al Sulaimaniyah'},
+    'الملز': {'latitude': 24.6900, 'longitude': 46.7000, 'name': 'Al Malaz'},
+    'المرسلات': {'latitude': 24.6850, 'longitude': 46.7100, 'name': 'Al Mursalat'},
+    
+    # West Riyadh
+    'الربوة': {'latitude': 24.7300, 'longitude': 46.5900, 'name': 'Al Rabwa'},
+    'الازدهار': {'latitude': 24.7400, 'longitude': 46.5800, 'name': 'Al Izdihar'},
+    'النرجس': {'latitude': 24.7500, 'longitude': 46.5700, 'name': 'Al Narjis'},
+    'الورود': {'latitude': 24.7200, 'longitude': 46.6000, 'name': 'Al Wurud'},
+    
+    # South Riyadh
+    'العزيزية': {'latitude': 24.6500, 'longitude': 46.7200, 'name': 'Al Aziziyah'},
+    'منفوحة': {'latitude': 24.6300, 'longitude': 46.7000, 'name': 'Manfuha'},
+    'الشفا': {'latitude': 24.6400, 'longitude': 46.6800, 'name': 'Al Shifa'},
+    
+    # East Riyadh
+    'الروضة': {'latitude': 24.7300, 'longitude': 46.7500, 'name': 'Al Rawdah'},
+    'الريان': {'latitude': 24.7200, 'longitude': 46.7600, 'name': 'Al Rayyan'},
+    'النهضة': {'latitude': 24.7100, 'longitude': 46.7700, 'name': 'Al Nahdah'},
+}
+
+_neighborhood_matcher = KeywordMatcher(
+    ((keyword, arabic_name)
+     for arabic_name, coords in RIYADH_NEIGHBORHOODS.items()
+     for keyword in normalized_keywords((arabic_name, coords['name']))),
+    normalize=True
+)
 
 class LocationDetector:
     """
@@ -64,43 +105,11 @@ class LocationDetector:
         Extract location from text (neighborhood name, area, etc.)
         """
         
-        # Common Riyadh neighborhoods and their coordinates
-        neighborhoods = {
-            # North Riyadh
-            'الملقا': {'latitude': 24.7767, 'longitude': 46.6106, 'name': 'Al Malqa'},
-            'النخيل': {'latitude': 24.7900, 'longitude': 46.6200, 'name': 'Al Nakheel'},
-            'الصحافة': {'latitude': 24.7650, 'longitude': 46.6250, 'name': 'Al Sahafa'},
-            'الياسمين': {'latitude': 24.8000, 'longitude': 46.6300, 'name': 'Al Yasmin'},
-            'الربيع': {'latitude': 24.7850, 'longitude': 46.6400, 'name': 'Al Rabie'},
-            
-            # Central Riyadh
-            'العليا': {'latitude': 24.7100, 'longitude': 46.6700, 'name': 'Al Olaya'},
-            'السليمانية': {'latitude': 24.7050, 'longitude': 46.6850, 'name': 'Al Sulaimaniyah'},
-            'الملز': {'latitude': 24.6900, 'longitude': 46.7000, 'name': 'Al Malaz'},
-            'المرسلات': {'latitude': 24.6850, 'longitude': 46.7100, 'name': 'Al Mursalat'},
-            
-            # West Riyadh
-            'الربوة': {'latitude': 24.7300, 'longitude': 46.5900, 'name': 'Al Rabwa'},
-            'الازدهار': {'latitude': 24.7400, 'longitude': 46.5800, 'name': 'Al Izdihar'},
-            'النرجس': {'latitude': 24.7500, 'longitude': 46.5700, 'name': 'Al Narjis'},
-            'الورود': {'latitude': 24.7200, 'longitude': 46.6000, 'name': 'Al Wurud'},
-            
-            # South Riyadh
-            'العزيزية': {'latitude': 24.6500, 'longitude': 46.7200, 'name': 'Al Aziziyah'},
-            'منفوحة': {'latitude': 24.6300, 'longitude': 46.7000, 'name': 'Manfuha'},
-            'الشفا': {'latitude': 24.6400, 'longitude': 46.6800, 'name': 'Al Shifa'},
-            
-            # East Riyadh
-            'الروضة': {'latitude': 24.7300, 'longitude': 46.7500, 'name': 'Al Rawdah'},
-            'الريان': {'latitude': 24.7200, 'longitude': 46.7600, 'name': 'Al Rayyan'},
-            'النهضة': {'latitude': 24.7100, 'longitude': 46.7700, 'name': 'Al Nahdah'},
-        }
-        
-        # Search for neighborhood name in text
-        text_lower = text.lower()
+        # Search for neighborhood name (Arabic or English) in text; first in table order wins
+        found = _neighborhood_matcher.tags(text)
         
-        for arabic_name, coords in neighborhoods.items():
-            if arabic_name in text or coords['name'].lower() in text_lower:
+        for arabic_name, coords in RIYADH_NEIGHBORHOODS.items():
+            if arabic_name in found:
                 return {
                     'detected': True,
                     'method': 'text',
@@ -0,0 +1,63 @@
+"""
+Query Counter
+Counts SQL statements issued through an engine, to catch N+1 query regressions
+
+Usage:
+    with count_queries(db.engine) as counter:
+        client.get('/api/admin/hospitals')
+    print(counter.count, counter.statements)
+
+    with assert_max_queries(db.engine, 2):
+        client.get('/api/admin/hospitals?include_services=true')
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import List
+
+from sqlalchemy import event
+
+
+class QueryCounter:
+    """Statements executed on an engine while the counter is active (current thread only)"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.thread_id = threading.get_ident()
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == self.thread_id:
+            self.statements.append(statement)
+
+    def start(self):
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def stop(self):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+
+@contextmanager
+def count_queries(engine):
+    """Count the statements executed inside the block"""
+    counter = QueryCounter(engine).start()
+    try:
+        yield counter
+    finally:
+        counter.stop()
+
+
+@contextmanager
+def assert_max_queries(engine, limit: int):
+    """Fail with AssertionError if the block executes more than limit statements"""
+    with count_queries(engine) as counter:
+        yield counter
+
+    if counter.count > limit:
+        listing = "\n".join(f"  {i + 1}. {statement}" for i, statement in enumerate(counter.statements))
+        raise AssertionError(f"Expected at most {limit} queries, got {counter.count}:\n{listing}")
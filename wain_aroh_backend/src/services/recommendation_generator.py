@@ -4,29 +4,34 @@ Generates interactive recommendations based on AI analysis
 """
 import json
 import re
+from src.services.arabic_normalizer import normalized_table
+from src.services.keyword_matcher import KeywordMatcher
+
+URGENT_KEYWORDS = [
+    'ألم شديد', 'نزيف', 'صعوبة تنفس', 'ألم في الصدر', 'فقدان وعي',
+    'شلل', 'تشنجات', 'حمى شديدة', 'severe pain', 'bleeding', 'chest pain',
+    'difficulty breathing', 'unconscious', 'seizure'
+]
+
+CRITICAL_KEYWORDS = [
+    'نوبة قلبية', 'سكتة دماغية', 'جلطة', 'heart attack', 'stroke',
+    'لا أستطيع التنفس', 'cannot breathe', 'فقدت الوعي', 'passed out'
+]
+
+# Both lists in one matcher, compiled once
+_urgency_matcher = KeywordMatcher.from_table(
+    normalized_table({'critical': CRITICAL_KEYWORDS, 'urgent': URGENT_KEYWORDS}), normalize=True
+)
 
 def analyze_urgency(symptoms_text):
     """Analyze urgency level based on symptoms"""
-    urgent_keywords = [
-        'ألم شديد', 'نزيف', 'صعوبة تنفس', 'ألم في الصدر', 'فقدان وعي',
-        'شلل', 'تشنجات', 'حمى شديدة', 'severe pain', 'bleeding', 'chest pain',
-        'difficulty breathing', 'unconscious', 'seizure'
-    ]
-    
-    critical_keywords = [
-        'نوبة قلبية', 'سكتة دماغية', 'جلطة', 'heart attack', 'stroke',
-        'لا أستطيع التنفس', 'cannot breathe', 'فقدت الوعي', 'passed out'
-    ]
-    
-    text_lower = symptoms_text.lower()
+    found = _urgency_matcher.tags(symptoms_text)
     
-    for keyword in critical_keywords:
-        if keyword in text_lower:
-            return 'critical'
+    if 'critical' in found:
+        return 'critical'
     
-    for keyword in urgent_keywords:
-        if keyword in text_lower:
-            return 'urgent'
+    if 'urgent' in found:
+        return 'urgent'
     
     return 'normal'
 
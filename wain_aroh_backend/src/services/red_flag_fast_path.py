@@ -0,0 +1,134 @@
+"""
+Red Flag Fast Path
+Immediate CTAS 1 reply for critical presentations, without waiting for the model
+
+When a message matches a red flag (detect_red_flags), the patient gets a
+precomputed emergency instruction plus the nearest emergency department from
+the in-memory facility snapshot, in milliseconds. Any model narrative comes
+after that reply, never before it.
+"""
+
+import time
+from typing import Dict, List, Optional
+
+from src.services.advanced_triage_engine import detect_red_flags
+from src.services.facility_snapshot import facility_snapshot_store
+from src.services.location_service import location_service
+
+AMBULANCE_NUMBER = "997"
+
+CTAS1_INSTRUCTION = f"""🚨 حالتك قد تكون طارئة وتحتاج رعاية فورية (CTAS 1).
+- اتصل بالإسعاف على {AMBULANCE_NUMBER} الآن، أو توجه فوراً إلى أقرب قسم طوارئ
+- لا تقد السيارة بنفسك، واطلب من أحد مرافقتك"""
+
+# One extra line per red flag (RED_FLAG_PATTERNS keys)
+FLAG_INSTRUCTIONS = {
+    "chest_pain_severe": "اجلس وارتح ولا تبذل أي مجهود حتى وصول المساعدة",
+    "difficulty_breathing": "اجلس في وضع مستقيم وحاول التنفس ببطء، وابتعد عن أي مسبب للاختناق",
+    "loss_of_consciousness": "إذا فقد المريض وعيه ضعه على جنبه وتأكد من تنفسه حتى وصول الإسعاف",
+    "severe_bleeding": "اضغط على مكان النزيف بقطعة قماش نظيفة بشكل مستمر",
+    "stroke_symptoms": "سجّل وقت بدء الأعراض، ولا تتناول أي طعام أو دواء",
+    "severe_headache": "لا تتناول أي دواء قبل تقييم الطبيب، وسجّل وقت بدء الصداع",
+    "confusion": "لا تترك المريض وحده حتى وصول المساعدة",
+    "high_fever_with_rash": "ابتعد عن الآخرين قدر الإمكان حتى يقيّمك الطبيب",
+    "vomiting_blood": "لا تأكل ولا تشرب شيئاً حتى يقيّمك الطبيب",
+    "severe_abdominal_pain": "لا تأكل ولا تشرب شيئاً حتى يقيّمك الطبيب",
+}
+
+LOCATION_UNKNOWN_LINE = f"📍 شارك موقعك لأحدد لك أقرب قسم طوارئ، لكن لا تنتظر: اتصل بـ {AMBULANCE_NUMBER} الآن"
+
+
+def patient_coordinates(location: Optional[Dict]):
+    """(latitude, longitude) from a location dict ({latitude, longitude} or {lat, lng}), else None"""
+    if not location:
+        return None
+    latitude = location.get('latitude', location.get('lat'))
+    longitude = location.get('longitude', location.get('lng'))
+    if latitude is None or longitude is None:
+        return None
+    return float(latitude), float(longitude)
+
+
+def nearest_emergency(latitude: float, longitude: float) -> Optional[Dict]:
+    """
+    Nearest active emergency department from the facility snapshot's emergency index
+
+    Requires an application context (the snapshot is built from the database on first use).
+    """
+    snapshot = facility_snapshot_store.get()
+    nearest = snapshot.emergency_index.nearest(latitude, longitude, 1)
+    if not nearest:
+        return None
+
+    ordinal, distance_km = nearest[0]
+    facility = snapshot.facilities[ordinal]
+    return {
+        "id": facility.id,
+        "name": facility.name,
+        "name_en": facility.name_en,
+        "address": facility.address,
+        "city": facility.city,
+        "phone": facility.emergency_phone or facility.phone,
+        "distance_km": round(distance_km, 2),
+        "travel_time_minutes": location_service.estimate_travel_time(distance_km),
+        "directions_url": location_service.get_directions_url(
+            {'latitude': latitude, 'longitude': longitude},
+            {'coordinates': facility.location}
+        ),
+    }
+
+
+def red_flag_response(red_flags: List[Dict], location: Optional[Dict] = None) -> Dict:
+    """
+    CTAS 1 reply for detected red flags
+
+    Args:
+        red_flags: detect_red_flags() results (non-empty)
+        location: Patient location, if known
+
+    Returns:
+        dict with the message, the nearest emergency department (or None) and timing
+    """
+    started = time.perf_counter()
+    flags = list(dict.fromkeys(flag["flag"] for flag in red_flags))
+
+    lines = [CTAS1_INSTRUCTION]
+    lines += [f"- {FLAG_INSTRUCTIONS[flag]}" for flag in flags if flag in FLAG_INSTRUCTIONS]
+
+    facility = None
+    coordinates = patient_coordinates(location)
+    if coordinates:
+        try:
+            facility = nearest_emergency(*coordinates)
+        except Exception as e:
+            # The instruction alone is still the right answer
+            print(f"Error finding nearest emergency department: {e}")
+
+    if facility:
+        lines.append(
+            f"\n🏥 أقرب طوارئ: {facility['name']} ({facility['distance_km']} كم، "
+            f"حوالي {facility['travel_time_minutes']} دقيقة)"
+        )
+        if facility['phone']:
+            lines.append(f"📞 {facility['phone']}")
+        lines.append(f"🗺️ {facility['directions_url']}")
+    else:
+        lines.append(f"\n{LOCATION_UNKNOWN_LINE}")
+
+    return {
+        "message": "\n".join(lines),
+        "ctas_level": 1,
+        "red_flags": flags,
+        "nearest_emergency": facility,
+        "call_ambulance": AMBULANCE_NUMBER,
+        "fast_path": True,
+        "fast_path_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+def check_message(message: str, location: Optional[Dict] = None) -> Optional[Dict]:
+    """The fast-path reply if the message has a red flag, else None"""
+    red_flags = detect_red_flags(message)
+    if not red_flags:
+        return None
+    return red_flag_response(red_flags, location)
@@ -3,6 +3,9 @@ Region Detector Service
 Detects patient region (Jazan, Riyadh, etc.) based on GPS coordinates or city name
 """
 
+from src.services.arabic_normalizer import normalize_arabic
+
+
 class RegionDetector:
     """Detects which region a patient is in based on location"""
     
@@ -94,16 +97,16 @@ class RegionDetector:
         Returns:
             dict with region info or None if not found
         """
-        city_lower = city_name.lower().strip()
+        region_code = _city_regions.get(normalize_arabic(city_name.strip()))
         
-        for region_code, region_data in RegionDetector.REGIONS.items():
-            if city_lower in [c.lower() for c in region_data["cities"]]:
-                return {
-                    "code": region_code,
-                    "name_ar": region_data["name_ar"],
-                    "name_en": region_data["name_en"],
-                    "confidence": "high"
-                }
+        if region_code:
+            region_data = RegionDetector.REGIONS[region_code]
+            return {
+                "code": region_code,
+                "name_ar": region_data["name_ar"],
+                "name_en": region_data["name_en"],
+                "confidence": "high"
+            }
         
         return {
             "code": "unknown",
@@ -220,5 +223,17 @@ class RegionDetector:
 
 هل يمكنك تحديد المدينة التي أنت فيها؟"""
 
+
+def _build_city_regions() -> dict:
+    """{normalized city name: region code}, built once; the first region listing a city wins"""
+    city_regions = {}
+    for region_code, region_data in RegionDetector.REGIONS.items():
+        for city in region_data["cities"]:
+            city_regions.setdefault(normalize_arabic(city), region_code)
+    return city_regions
+
+
+_city_regions = _build_city_regions()
+
 # Create singleton instance
 region_detector = RegionDetector()
@@ -0,0 +1,231 @@
+"""
+Write-behind buffer for routing request logs
+Collects ServiceRequest rows in memory and writes them in batched bulk inserts
+"""
+
+import os
+import time
+import atexit
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from ..models.user import db
+from ..models.service_schedule import ServiceRequest
+from .routing_rollup import routing_rollup_store
+
+
+class ServiceRequestLogBuffer:
+    """
+    In-process write-behind queue for ServiceRequest rows
+
+    The routing hot path only appends a dict to a deque. A background thread
+    flushes the queue with one bulk insert when it reaches batch_size rows or
+    when flush_interval seconds have passed, and the remaining rows are
+    flushed on interpreter shutdown (at most shutdown_attempts failed writes,
+    then the rest is dropped). Without an app (scripts, shell) rows are
+    written synchronously, as before.
+    """
+
+    def __init__(self, batch_size: int = None, flush_interval: float = None, max_queue: int = None,
+                 shutdown_attempts: int = None):
+        self.batch_size = batch_size or int(os.environ.get('ROUTING_LOG_BATCH_SIZE', 100))
+        self.flush_interval = flush_interval or float(os.environ.get('ROUTING_LOG_FLUSH_INTERVAL', 2.0))
+        self.max_queue = max_queue or int(os.environ.get('ROUTING_LOG_MAX_QUEUE', 10000))
+        self.shutdown_attempts = shutdown_attempts or int(os.environ.get('ROUTING_LOG_SHUTDOWN_ATTEMPTS', 3))
+
+        self.app = None
+        self._queue = deque()
+        self._flush_lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._thread_pid = None
+
+        # Metrics
+        self.enqueued = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.flush_count = 0
+        self.flush_errors = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+        self.last_flush_at = None
+        self.last_error = None
+
+    def init_app(self, app):
+        """Attach the Flask app used for background flushes"""
+        self.app = app
+        app.extensions['service_request_log_buffer'] = self
+        atexit.register(self.shutdown)
+
+    def enqueue(self, **row):
+        """
+        Queue a ServiceRequest row (column name -> value)
+
+        request_datetime is stamped here so the logged time is the request
+        time, not the flush time.
+        """
+        row.setdefault('request_datetime', datetime.utcnow())
+
+        if self.app is None:
+            # No background writer configured: write synchronously
+            db.session.add(ServiceRequest(**row))
+            db.session.commit()
+            self.enqueued += 1
+            self.flushed += 1
+            return
+
+        if len(self._queue) >= self.max_queue:
+            self.dropped += 1
+            return
+
+        self._queue.append(row)
+        self.enqueued += 1
+        self._ensure_thread()
+
+        if len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """
+        Write every queued row with bulk inserts
+
+        Stops at the first batch that fails (it is back at the front of the
+        queue); the caller decides when to retry.
+
+        Returns:
+            Number of rows written
+        """
+        with self._flush_lock:
+            written = 0
+            while self._queue:
+                batch = self._drain(self.batch_size)
+                if not batch:
+                    break
+                batch_written = self._write(batch)
+                if not batch_written:
+                    break
+                written += batch_written
+            return written
+
+    def shutdown(self):
+        """Stop the background thread and flush what is left (bounded retries)"""
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread is not None and self._thread.is_alive() and self._thread_pid == os.getpid():
+            self._thread.join(timeout=5)
+        if self.app is None:
+            return
+
+        failures = 0
+        while self._queue and failures < self.shutdown_attempts:
+            if not self.flush():
+                failures += 1
+        if self._queue:
+            # The database is not accepting writes; do not hang the exit
+            remaining = len(self._queue)
+            self._queue.clear()
+            self.dropped += remaining
+            self.last_error = f"shutdown: dropped {remaining} rows after {failures} failed writes ({self.last_error})"
+
+    def stats(self) -> Dict:
+        """Queue depth and flush latency metrics"""
+        return {
+            "queue_depth": len(self._queue),
+            "enqueued": self.enqueued,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "flush_count": self.flush_count,
+            "flush_errors": self.flush_errors,
+            "last_flush_ms": self.last_flush_ms,
+            "max_flush_ms": self.max_flush_ms,
+            "avg_flush_ms": round(self.total_flush_ms / self.flush_count, 2) if self.flush_count else 0.0,
+            "last_flush_at": self.last_flush_at.isoformat() if self.last_flush_at else None,
+            "last_error": self.last_error,
+            "batch_size": self.batch_size,
+            "flush_interval": self.flush_interval,
+            "max_queue": self.max_queue
+        }
+
+    def _drain(self, limit: int) -> List[dict]:
+        """Pop up to limit rows from the queue"""
+        batch = []
+        while self._queue and len(batch) < limit:
+            batch.append(self._queue.popleft())
+        return batch
+
+    def _write(self, batch: List[dict]) -> int:
+        """Bulk insert one batch inside an app context"""
+        start = time.perf_counter()
+
+        with self.app.app_context():
+            try:
+                db.session.bulk_insert_mappings(ServiceRequest, batch)
+                db.session.commit()
+                self._sync_rollup()
+            except Exception as e:
+                db.session.rollback()
+                self.flush_errors += 1
+                self.last_error = str(e)
+                # Put the batch back for the next attempt unless the queue is full
+                if len(self._queue) + len(batch) <= self.max_queue:
+                    self._queue.extendleft(reversed(batch))
+                else:
+                    self.dropped += len(batch)
+                return 0
+            finally:
+                db.session.remove()
+
+        elapsed_ms = round((time.perf_counter() - start) * 1000, 2)
+        self.flushed += len(batch)
+        self.flush_count += 1
+        self.last_flush_ms = elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        self.total_flush_ms += elapsed_ms
+        self.last_flush_at = datetime.utcnow()
+        return len(batch)
+
+    def _sync_rollup(self):
+        """Fold the flushed rows into the hourly analytics rollup"""
+        try:
+            routing_rollup_store.sync()
+        except Exception as e:
+            # The rollup catches up on the next sync; the rows are already saved
+            db.session.rollback()
+            self.last_error = f"rollup sync: {e}"
+
+    def _ensure_thread(self):
+        """Start the flusher thread (again after a fork, e.g. in gunicorn workers)"""
+        pid = os.getpid()
+        if self._thread is not None and self._thread_pid == pid and self._thread.is_alive():
+            return
+
+        with self._thread_lock:
+            # Another first writer may have started it while we waited
+            if self._thread is not None and self._thread_pid == pid and self._thread.is_alive():
+                return
+            self._thread_pid = pid
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self._run, name='service-request-log-flusher', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        """Background loop: flush on size threshold or interval"""
+        while not self._stopping:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self._queue:
+                written = self.flush()
+                if not written and self._queue:
+                    # Writes are failing; back off before retrying
+                    time.sleep(self.flush_interval)
+
+
+# Global instance
+request_log_buffer = ServiceRequestLogBuffer()
@@ -0,0 +1,194 @@
+"""
+Response Streaming
+Server-Sent Events framing for conversation replies, with time-to-first-token metrics
+
+A streaming turn is an iterator of (event, data) pairs:
+    ("token", "...")    a piece of the assistant reply, in order
+    ("done", {...})     the full turn result (same payload as the non-streaming endpoint)
+sse_response() frames them as SSE, turns an exception into an "error" event,
+and records time-to-first-token and total duration per stream name.
+"""
+
+import json
+import re
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, Tuple
+
+from flask import Response, stream_with_context
+
+from src.services.sample_stats import percentile
+
+SAMPLE_WINDOW = 1000
+
+
+def sse_event(event: str, data) -> str:
+    """One SSE frame; data is JSON encoded (Arabic kept as-is)"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+class JsonStringFieldStream:
+    """
+    Incrementally decode one top-level string field from a JSON object being streamed
+
+    Lets a structured (JSON) completion still stream its patient-facing text:
+    feed() each chunk and it returns the newly decoded characters of the field.
+    The field should come first in the schema so its text is not delayed.
+    text holds everything decoded so far, also when the object is never closed.
+    """
+
+    _ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+    def __init__(self, field: str):
+        self._opening = re.compile(r'"' + re.escape(field) + r'"\s*:\s*"')
+        self._buffer = ""
+        self._position = None  # index of the next undecoded character of the value
+        self.text = ""
+        self.done = False
+
+    @property
+    def found(self) -> bool:
+        """Whether the field's opening has been seen"""
+        return self._position is not None
+
+    def feed(self, chunk: str) -> str:
+        self._buffer += chunk
+        if self.done:
+            return ""
+
+        if self._position is None:
+            match = self._opening.search(self._buffer)
+            if not match:
+                return ""
+            self._position = match.end()
+
+        out = []
+        buffer, i = self._buffer, self._position
+        while i < len(buffer):
+            char = buffer[i]
+            if char == '"':
+                self.done = True
+                i += 1
+                break
+            if char != '\\':
+                out.append(char)
+                i += 1
+                continue
+
+            # Escape sequence; wait for more input if it is split across chunks
+            if i + 1 >= len(buffer):
+                break
+            code = buffer[i + 1]
+            if code != 'u':
+                out.append(self._ESCAPES.get(code, code))
+                i += 2
+                continue
+            if i + 6 > len(buffer):
+                break
+            unit = int(buffer[i + 2:i + 6], 16)
+            if 0xD800 <= unit < 0xDC00:
+                # High surrogate: decode together with the low one that follows
+                if i + 12 > len(buffer):
+                    break
+                out.append(json.loads(f'"{buffer[i:i + 12]}"'))
+                i += 12
+            else:
+                out.append(chr(unit))
+                i += 6
+
+        self._position = i
+        decoded = "".join(out)
+        self.text += decoded
+        return decoded
+
+
+class StreamingMetrics:
+    """Time-to-first-token and total stream duration, per stream name (last SAMPLE_WINDOW streams)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._streams: Dict[str, Dict] = {}
+
+    def _entry(self, name):
+        entry = self._streams.get(name)
+        if entry is None:
+            entry = self._streams[name] = {
+                "streams": 0,
+                "errors": 0,
+                "ttft_ms": deque(maxlen=SAMPLE_WINDOW),
+                "total_ms": deque(maxlen=SAMPLE_WINDOW),
+                "tokens": deque(maxlen=SAMPLE_WINDOW),
+            }
+        return entry
+
+    def record(self, name: str, ttft_ms, total_ms: float, tokens: int, error: bool = False):
+        with self._lock:
+            entry = self._entry(name)
+            entry["streams"] += 1
+            if error:
+                entry["errors"] += 1
+            if ttft_ms is not None:
+                entry["ttft_ms"].append(ttft_ms)
+            entry["total_ms"].append(total_ms)
+            entry["tokens"].append(tokens)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                name: {
+                    "streams": entry["streams"],
+                    "errors": entry["errors"],
+                    "ttft_ms_p50": percentile(entry["ttft_ms"], 50),
+                    "ttft_ms_p95": percentile(entry["ttft_ms"], 95),
+                    "ttft_ms_p99": percentile(entry["ttft_ms"], 99),
+                    "total_ms_p50": percentile(entry["total_ms"], 50),
+                    "total_ms_p95": percentile(entry["total_ms"], 95),
+                    "avg_tokens": round(sum(entry["tokens"]) / len(entry["tokens"]), 1) if entry["tokens"] else None,
+                }
+                for name, entry in self._streams.items()
+            }
+
+
+def _frames(name: str, events: Iterable[Tuple[str, object]], started: float):
+    ttft_ms = None
+    tokens = 0
+    error = False
+    try:
+        for event, data in events:
+            if event == "token":
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - started) * 1000
+                tokens += 1
+            elif event == "done" and isinstance(data, dict):
+                data = {**data, "time_to_first_token_ms": round(ttft_ms, 1) if ttft_ms is not None else None}
+            yield sse_event(event, data)
+    except Exception as e:
+        error = True
+        yield sse_event("error", {"success": False, "error": str(e)})
+    finally:
+        streaming_metrics.record(name, ttft_ms, (time.perf_counter() - started) * 1000, tokens, error)
+
+
+def sse_response(name: str, events: Iterable[Tuple[str, object]]) -> Response:
+    """
+    Stream (event, data) pairs to the client as text/event-stream
+
+    Args:
+        name: Metrics key for this kind of stream
+        events: Iterator of (event, data); consumed lazily while the response is sent
+    """
+    started = time.perf_counter()
+    return Response(
+        # Keep the request (and app) context while the generator runs after the view returns
+        stream_with_context(_frames(name, events, started)),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',  # let nginx pass tokens through unbuffered
+        }
+    )
+
+
+# Global instance
+streaming_metrics = StreamingMetrics()
@@ -0,0 +1,284 @@
+"""
+Routing Analytics Rollups
+SQL-side aggregation of ServiceRequest logs with an incrementally maintained hourly rollup
+
+ServiceRequest rows are append-only, so the rollup is maintained with a
+high-water mark: every sync folds the rows with an id above the mark into
+per-hour buckets (one GROUP BY query) and advances the mark in the same
+transaction. Syncs run after each request-log flush (and from
+refresh_routing_rollup.py); analytics only read, adding the rows above the
+mark from ServiceRequest.
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, case, update
+
+from ..models.user import db
+from ..models.service_schedule import (
+    ServiceRequest, ServiceRequestHourlyRollup, AnalyticsRollupState
+)
+
+# Dimension and measure names shared by the raw and rollup aggregations
+DIMENSIONS = ("service_type", "patient_city", "availability_status")
+MEASURES = (
+    "request_count", "available_count", "accepted_count",
+    "distance_sum", "wait_time_sum", "wait_time_count"
+)
+
+
+def floor_hour(value: datetime) -> datetime:
+    """Truncate a datetime to the start of its hour"""
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def ceil_hour(value: datetime) -> datetime:
+    """Round a datetime up to the next hour boundary (unchanged if already on one)"""
+    floored = floor_hour(value)
+    return floored if floored == value else floored + timedelta(hours=1)
+
+
+def _raw_measures():
+    """SQL aggregate expressions over ServiceRequest, in MEASURES order"""
+    return (
+        func.count(ServiceRequest.id),
+        func.coalesce(func.sum(case((ServiceRequest.was_available == True, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((ServiceRequest.patient_accepted == True, 1), else_=0)), 0),
+        func.coalesce(func.sum(ServiceRequest.distance_km), 0.0),
+        func.coalesce(func.sum(case((ServiceRequest.wait_time_minutes != 0, ServiceRequest.wait_time_minutes), else_=0)), 0),
+        func.coalesce(func.sum(case((ServiceRequest.wait_time_minutes != 0, 1), else_=0)), 0),
+    )
+
+
+class RoutingRollupStore:
+    """Hourly ServiceRequest rollup and the analytics queries that read it"""
+
+    STATE_NAME = 'service_request_hourly'
+
+    def __init__(self):
+        self.last_sync_at = None
+        self.last_sync_rows = 0
+
+    def sync(self) -> int:
+        """
+        Fold newly logged requests into the hourly rollup
+
+        Returns:
+            Number of ServiceRequest rows added to the rollup
+        """
+        state = db.session.get(AnalyticsRollupState, self.STATE_NAME)
+        if state is None:
+            state = AnalyticsRollupState(name=self.STATE_NAME, last_source_id=0)
+            db.session.add(state)
+            db.session.flush()
+
+        watermark = state.last_source_id
+        max_id = db.session.query(func.max(ServiceRequest.id)).scalar()
+        if not max_id or max_id <= watermark:
+            db.session.commit()
+            return 0
+
+        hour = func.strftime('%Y-%m-%d %H:00:00', ServiceRequest.request_datetime)
+        grouped = db.session.query(
+            hour,
+            ServiceRequest.service_type,
+            ServiceRequest.patient_city,
+            ServiceRequest.availability_status,
+            *_raw_measures()
+        ).filter(
+            ServiceRequest.id > watermark,
+            ServiceRequest.id <= max_id,
+            ServiceRequest.request_datetime.isnot(None)
+        ).group_by(
+            hour,
+            ServiceRequest.service_type,
+            ServiceRequest.patient_city,
+            ServiceRequest.availability_status
+        ).all()
+
+        buckets = {}
+        for row in grouped:
+            hour_start = datetime.strptime(row[0], '%Y-%m-%d %H:%M:%S')
+            buckets[(hour_start,) + tuple(row[1:4])] = row[4:]
+
+        # Existing rollup rows for the touched hours (one query)
+        hours = {key[0] for key in buckets}
+        existing = {
+            (r.hour_start, r.service_type, r.patient_city, r.availability_status): r
+            for r in ServiceRequestHourlyRollup.query.filter(ServiceRequestHourlyRollup.hour_start.in_(hours))
+        } if hours else {}
+
+        added = 0
+        for key, measures in buckets.items():
+            rollup = existing.get(key)
+            if rollup is None:
+                rollup = ServiceRequestHourlyRollup(
+                    hour_start=key[0],
+                    service_type=key[1],
+                    patient_city=key[2],
+                    availability_status=key[3],
+                    **{name: 0 for name in MEASURES}
+                )
+                db.session.add(rollup)
+            for name, value in zip(MEASURES, measures):
+                setattr(rollup, name, (getattr(rollup, name) or 0) + (value or 0))
+            added += measures[0]
+
+        # Advance the mark only if no other writer moved it meanwhile
+        moved = db.session.execute(
+            update(AnalyticsRollupState)
+            .where(AnalyticsRollupState.name == self.STATE_NAME)
+            .where(AnalyticsRollupState.last_source_id == watermark)
+            .values(last_source_id=max_id, updated_at=datetime.utcnow())
+        ).rowcount
+        if not moved:
+            db.session.rollback()
+            return 0
+
+        db.session.commit()
+        self.last_sync_at = datetime.utcnow()
+        self.last_sync_rows = added
+        return added
+
+    def rebuild(self) -> int:
+        """
+        Drop and recompute the whole rollup from ServiceRequest
+
+        Returns:
+            Number of ServiceRequest rows rolled up
+        """
+        ServiceRequestHourlyRollup.query.delete()
+        AnalyticsRollupState.query.filter_by(name=self.STATE_NAME).delete()
+        db.session.commit()
+        return self.sync()
+
+    def analytics(
+        self,
+        start_date: datetime = None,
+        end_date: datetime = None,
+        service_type: str = None,
+        city: str = None
+    ) -> Dict:
+        """
+        Routing analytics over [start_date, end_date]
+
+        Whole hours inside the range are read from the rollup, plus the rows
+        logged since the last sync; the partial hours at either edge are
+        aggregated from ServiceRequest directly. Read-only: never syncs.
+        """
+        watermark = db.session.query(AnalyticsRollupState.last_source_id).filter(
+            AnalyticsRollupState.name == self.STATE_NAME
+        ).scalar() or 0
+
+        rollup_from = ceil_hour(start_date) if start_date else None
+        rollup_to = floor_hour(end_date + timedelta(microseconds=1)) if end_date else None
+
+        groups: List[Tuple] = []
+        if rollup_from is not None and rollup_to is not None and rollup_from >= rollup_to:
+            # Range shorter than an hour boundary pair: raw rows only
+            groups += self._raw_groups(start_date, end_date, None, service_type, city)
+        else:
+            groups += self._rollup_groups(rollup_from, rollup_to, service_type, city)
+            groups += self._raw_groups(rollup_from, None, rollup_to, service_type, city, after_id=watermark)
+            if start_date is not None:
+                groups += self._raw_groups(start_date, None, rollup_from, service_type, city)
+            if end_date is not None:
+                groups += self._raw_groups(rollup_to, end_date, None, service_type, city)
+
+        return self._summarize(groups)
+
+    def _raw_groups(self, start, end_inclusive, end_exclusive, service_type, city,
+                    after_id: Optional[int] = None) -> List[Tuple]:
+        """GROUP BY over raw ServiceRequest rows in a time window (only ids above after_id if given)"""
+        query = db.session.query(
+            ServiceRequest.service_type,
+            ServiceRequest.patient_city,
+            ServiceRequest.availability_status,
+            *_raw_measures()
+        )
+        if after_id is not None:
+            # Rows not yet in the rollup (sync skips rows without a timestamp)
+            query = query.filter(ServiceRequest.id > after_id, ServiceRequest.request_datetime.isnot(None))
+        if start is not None:
+            query = query.filter(ServiceRequest.request_datetime >= start)
+        if end_inclusive is not None:
+            query = query.filter(ServiceRequest.request_datetime <= end_inclusive)
+        if end_exclusive is not None:
+            query = query.filter(ServiceRequest.request_datetime < end_exclusive)
+        if service_type:
+            query = query.filter(ServiceRequest.service_type == service_type)
+        if city:
+            query = query.filter(ServiceRequest.patient_city == city)
+
+        return query.group_by(
+            ServiceRequest.service_type,
+            ServiceRequest.patient_city,
+            ServiceRequest.availability_status
+        ).all()
+
+    def _rollup_groups(self, hour_from, hour_to, service_type, city) -> List[Tuple]:
+        """Sum rollup rows for whole hours in [hour_from, hour_to)"""
+        query = db.session.query(
+            ServiceRequestHourlyRollup.service_type,
+            ServiceRequestHourlyRollup.patient_city,
+            ServiceRequestHourlyRollup.availability_status,
+            *(func.sum(getattr(ServiceRequestHourlyRollup, name)) for name in MEASURES)
+        )
+        if hour_from is not None:
+            query = query.filter(ServiceRequestHourlyRollup.hour_start >= hour_from)
+        if hour_to is not None:
+            query = query.filter(ServiceRequestHourlyRollup.hour_start < hour_to)
+        if service_type:
+            query = query.filter(ServiceRequestHourlyRollup.service_type == service_type)
+        if city:
+            query = query.filter(ServiceRequestHourlyRollup.patient_city == city)
+
+        return query.group_by(
+            ServiceRequestHourlyRollup.service_type,
+            ServiceRequestHourlyRollup.patient_city,
+            ServiceRequestHourlyRollup.availability_status
+        ).all()
+
+    @staticmethod
+    def _summarize(groups: List[Tuple]) -> Dict:
+        """Combine grouped rows into the analytics response"""
+        totals = dict.fromkeys(MEASURES, 0)
+        breakdowns = {name: {} for name in DIMENSIONS}
+
+        for row in groups:
+            count = row[3] or 0
+            if not count:
+                continue
+            for name, value in zip(MEASURES, row[3:]):
+                totals[name] += value or 0
+            for name, value in zip(DIMENSIONS, row[:3]):
+                breakdowns[name][value] = breakdowns[name].get(value, 0) + count
+
+        total = totals["request_count"]
+        if not total:
+            return {
+                "total_requests": 0,
+                "availability_rate": 0,
+                "average_distance": 0,
+                "average_wait_time": 0,
+                "acceptance_rate": 0
+            }
+
+        accepted = totals["accepted_count"]
+        wait_count = totals["wait_time_count"]
+
+        return {
+            "total_requests": total,
+            "availability_rate": round((totals["available_count"] / total) * 100, 2),
+            "average_distance": round(totals["distance_sum"] / total, 2),
+            "average_wait_time": round(totals["wait_time_sum"] / wait_count, 2) if wait_count else 0,
+            "acceptance_rate": round((accepted / total) * 100, 2) if accepted > 0 else 0,
+            "by_service_type": breakdowns["service_type"],
+            "by_city": breakdowns["patient_city"],
+            "by_status": breakdowns["availability_status"]
+        }
+
+
+# Global instance
+routing_rollup_store = RoutingRollupStore()
@@ -0,0 +1,14 @@
+"""
+Sample Stats
+Percentiles over the bounded latency sample windows kept by the metrics classes
+"""
+
+from typing import Iterable, Optional
+
+
+def percentile(samples: Iterable[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of the samples, rounded to 0.1 (None when there are none)"""
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))], 1)
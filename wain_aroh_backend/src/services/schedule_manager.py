@@ -12,8 +12,10 @@ from ..models.service_schedule import (
     HospitalService, ServiceSchedule, ScheduleOverride,
     ServiceAvailabilityLog, ServiceRequest,
     ServiceType, ScheduleType, AvailabilityStatus,
-    is_service_available
+    is_service_available, availability_timeline
 )
+from .search_cache import search_result_cache
+from .availability_calendar import availability_calendar
 import math
 
 class ScheduleManager:
@@ -41,6 +43,7 @@ class ScheduleManager:
         
         db.session.add(service)
         db.session.commit()
+        availability_calendar.regenerate([service.id])
         
         # Log creation
         ScheduleManager._log_change(
@@ -55,8 +58,15 @@ class ScheduleManager:
         return service
     
     @staticmethod
-    def create_schedule(service_id: int, schedule_data: dict, created_by: str = "system") -> ServiceSchedule:
-        """Create a new service schedule"""
+    def create_schedule(service_id: int, schedule_data: dict, created_by: str = "system",
+                        refresh: bool = True) -> ServiceSchedule:
+        """
+        Create a new service schedule
+        
+        Args:
+            refresh: Invalidate the search cache and regenerate the service's
+                availability calendar (False when the caller does it once for a batch)
+        """
         schedule = ServiceSchedule(
             service_id=service_id,
             schedule_type=schedule_data.get('schedule_type'),
@@ -78,6 +88,9 @@ class ScheduleManager:
         
         db.session.add(schedule)
         db.session.commit()
+        if refresh:
+            search_result_cache.invalidate()
+            availability_calendar.regenerate([service_id])
         
         # Log creation
         ScheduleManager._log_change(
@@ -112,6 +125,8 @@ class ScheduleManager:
         
         db.session.add(override)
         db.session.commit()
+        search_result_cache.invalidate()
+        availability_calendar.regenerate([service_id])
         
         # Log creation
         ScheduleManager._log_change(
@@ -142,6 +157,7 @@ class ScheduleManager:
         
         service.updated_at = datetime.utcnow()
         db.session.commit()
+        availability_calendar.regenerate([service_id])
         
         new_status = "active" if service.is_active else "inactive"
         
@@ -174,6 +190,8 @@ class ScheduleManager:
         
         schedule.updated_at = datetime.utcnow()
         db.session.commit()
+        search_result_cache.invalidate()
+        availability_calendar.regenerate([schedule.service_id])
         
         new_status = schedule.availability_status
         
@@ -201,6 +219,8 @@ class ScheduleManager:
         
         db.session.delete(schedule)
         db.session.commit()
+        search_result_cache.invalidate()
+        availability_calendar.regenerate([service_id])
         
         # Log deletion
         ScheduleManager._log_change(
@@ -219,22 +239,36 @@ class ScheduleManager:
         """Check if a service is available at a specific datetime"""
         return is_service_available(service_id, check_datetime)
     
+    @staticmethod
+    def check_availability_bulk(service_ids: List[int], check_datetime: datetime = None) -> Dict[int, dict]:
+        """Check availability of several services (calendar range read)"""
+        return availability_calendar.lookup(service_ids, check_datetime)
+    
     @staticmethod
     def get_service_status(service_id: int, start_date: date = None, end_date: date = None) -> List[dict]:
-        """Get service availability status for a date range"""
+        """
+        Get hourly service availability status for a date range
+        
+        Derived from the availability timeline, so the whole range costs three
+        queries instead of one availability check per hour.
+        """
         if start_date is None:
             start_date = date.today()
         if end_date is None:
             end_date = start_date + timedelta(days=7)
         
+        segments = ScheduleManager.get_service_timeline(service_id, start_date, end_date)
+        
         statuses = []
+        index = 0
         current_date = start_date
         
         while current_date <= end_date:
-            # Check availability for each hour of the day
             for hour in range(24):
                 check_datetime = datetime.combine(current_date, time(hour=hour))
-                availability = ScheduleManager.check_availability(service_id, check_datetime)
+                while segments[index]["end"] <= check_datetime:
+                    index += 1
+                availability = segments[index]
                 
                 statuses.append({
                     "datetime": check_datetime.isoformat(),
@@ -251,6 +285,25 @@ class ScheduleManager:
         
         return statuses
     
+    @staticmethod
+    def get_service_timeline(service_id: int, start_date: date = None, end_date: date = None) -> List[dict]:
+        """
+        Get availability segments for a date range (end date inclusive)
+        
+        Each segment is a half-open [start, end) interval with a constant
+        availability result; adjacent segments always differ.
+        """
+        if start_date is None:
+            start_date = date.today()
+        if end_date is None:
+            end_date = start_date + timedelta(days=7)
+        
+        return availability_timeline(
+            service_id,
+            datetime.combine(start_date, time.min),
+            datetime.combine(end_date + timedelta(days=1), time.min)
+        )
+    
     @staticmethod
     def _log_change(service_id: int, change_type: str, old_status: str, new_status: str,
                     reason: str, created_by: str, affected_datetime: datetime = None,
@@ -317,9 +370,14 @@ class ScheduleManager:
                 'availability_status': 'available'
             }
             
-            schedule = ScheduleManager.create_schedule(service_id, schedule_data, created_by)
+            schedule = ScheduleManager.create_schedule(service_id, schedule_data, created_by, refresh=False)
             schedules.append(schedule)
         
+        # One regeneration for the whole week
+        if schedules:
+            search_result_cache.invalidate()
+            availability_calendar.regenerate([service_id])
+        
         return schedules
     
     @staticmethod
@@ -361,6 +419,8 @@ class ScheduleManager:
         
         override.is_active = False
         db.session.commit()
+        search_result_cache.invalidate()
+        availability_calendar.regenerate([override.service_id])
         
         # Log deactivation
         ScheduleManager._log_change(
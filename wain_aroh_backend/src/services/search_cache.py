@@ -0,0 +1,200 @@
+"""
+ذاكرة تخزين مؤقت لنتائج البحث
+LRU result cache for /api/search/facilities keyed on canonicalized filters
+"""
+
+import os
+import math
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import replace
+from typing import Dict, Hashable, Optional, Tuple
+
+from ..models.search import SearchFilters
+from .data_version import DataVersionCounter
+
+
+class SearchResultCache:
+    """
+    ذاكرة مؤقتة لنتائج البحث مع إخلاء الأقدم استخداماً (LRU)
+    LRU cache of serialized search responses
+
+    Near-identical requests share an entry: list filters are sorted and
+    deduplicated, and the patient location is snapped to the center of a
+    grid cell of ``grid_deg`` degrees (the search itself runs on the snapped
+    location so every request in the cell gets the same answer). Entries are
+    tied to the facility snapshot they were computed from (its generation
+    changes on every rebuild, including the periodic one that picks up new
+    ratings) and to the schedules data version in the database, which
+    invalidate() bumps so schedule and override edits reach every worker
+    process. Entries also expire after max_age_seconds.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, grid_deg: Optional[float] = None,
+                 max_age_seconds: Optional[float] = None):
+        """
+        Args:
+            max_entries: الحد الأقصى لعدد النتائج المخزنة
+            grid_deg: حجم خلية تقريب الموقع بالدرجات (0.005 ≈ 500 متر)
+            max_age_seconds: أقصى عمر للنتيجة المخزنة بالثواني
+        """
+        if max_entries is None:
+            max_entries = int(os.environ.get('SEARCH_CACHE_MAX_ENTRIES', 1024))
+        if grid_deg is None:
+            grid_deg = float(os.environ.get('SEARCH_CACHE_GRID_DEG', 0.005))
+        if max_age_seconds is None:
+            max_age_seconds = float(os.environ.get('SEARCH_CACHE_MAX_AGE_SECONDS', 60))
+
+        self.max_entries = max_entries
+        self.grid_deg = grid_deg
+        self.max_age_seconds = max_age_seconds
+
+        self._lock = threading.Lock()
+        # key -> (payload, stored_at)
+        self._entries: "OrderedDict[Tuple, Tuple[Dict, float]]" = OrderedDict()
+        self._data_version: Optional[Tuple] = None
+        self._schedule_version = DataVersionCounter('schedules')
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def quantize_location(self, location: Optional[Dict[str, float]]) -> Optional[Dict[str, float]]:
+        """
+        تقريب الموقع إلى مركز خلية الشبكة
+        Snap a {"lat", "lng"} location to the center of its grid cell
+        """
+        if not location:
+            return location
+
+        def snap(value: float) -> float:
+            return round((math.floor(float(value) / self.grid_deg) + 0.5) * self.grid_deg, 6)
+
+        return {"lat": snap(location["lat"]), "lng": snap(location["lng"])}
+
+    def canonicalize(self, filters: SearchFilters) -> SearchFilters:
+        """
+        توحيد صيغة الفلاتر
+        Return an equivalent SearchFilters with sorted lists and a snapped location
+        """
+        return replace(
+            filters,
+            specialties=sorted(set(filters.specialties)),
+            organizations=sorted(set(filters.organizations)),
+            clusters=sorted(set(filters.clusters)),
+            required_services=sorted(set(filters.required_services)),
+            location=self.quantize_location(filters.location),
+        )
+
+    def make_key(self, filters: SearchFilters) -> Tuple:
+        """
+        مفتاح التخزين لفلاتر موحدة
+        Cache key for already-canonicalized filters; sort_by is kept as its
+        own component so the same filter set can be looked up per ordering
+        """
+        location = (filters.location["lat"], filters.location["lng"]) if filters.location else None
+        filter_key = (
+            tuple(filters.specialties),
+            location,
+            float(filters.max_distance_km),
+            tuple(filters.organizations),
+            tuple(filters.clusters),
+            float(filters.min_rating),
+            bool(filters.available_now),
+            bool(filters.accepts_emergency),
+            bool(filters.accepts_appointments),
+            tuple(filters.required_services),
+            int(filters.page),
+            int(filters.limit),
+        )
+        return (filters.sort_by.value, filter_key)
+
+    def get(self, key: Tuple, snapshot_generation: Hashable) -> Optional[Dict]:
+        """
+        قراءة نتيجة مخزنة
+        Return the cached payload for key, or None on a miss
+
+        Must be called inside an application context (reads the schedules version).
+        """
+        data_version = (snapshot_generation, self._schedule_version.current())
+        now = time.monotonic()
+        with self._lock:
+            self._check_version(data_version)
+
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] >= self.max_age_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Tuple, snapshot_generation: Hashable, payload: Dict):
+        """
+        تخزين نتيجة
+        Store a payload, evicting the least recently used entries past the limit
+        """
+        if self.max_entries <= 0:
+            return
+
+        data_version = (snapshot_generation, self._schedule_version.current())
+        with self._lock:
+            self._check_version(data_version)
+
+            self._entries[key] = (payload, time.monotonic())
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        """
+        مسح جميع النتائج المخزنة
+        Drop every entry and bump the schedules data version so the other
+        worker processes drop theirs (called on schedule and override
+        changes, inside an application context, after the write was committed)
+        """
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+        self._schedule_version.bump()
+
+    def _check_version(self, data_version: Tuple):
+        """مسح الذاكرة عند تغير اللقطة أو إصدار الجداول (يُستدعى مع القفل)"""
+        if data_version != self._data_version:
+            if self._entries:
+                self._entries.clear()
+                self.invalidations += 1
+            self._data_version = data_version
+
+    def stats(self) -> Dict:
+        """عدادات الإصابة والإخفاق لضبط حجم الشبكة"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups * 100, 2) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "max_age_seconds": self.max_age_seconds,
+                "grid_deg": self.grid_deg,
+                "snapshot_version": self._data_version[0][0] if self._data_version else None,
+                "schedule_version": self._data_version[1] if self._data_version else None,
+            }
+
+
+# مثيل عام من الذاكرة المؤقتة
+search_result_cache = SearchResultCache()
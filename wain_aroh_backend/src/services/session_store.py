@@ -0,0 +1,363 @@
+"""
+Session Store
+Bounded, expiring key-value store for conversation and call state
+
+Every store has a namespace, an idle TTL (counted from the last write) and
+size limits; the least recently used entries are evicted first once a limit
+is exceeded.
+
+Backends are selected with SESSION_STORE_BACKEND:
+    memory  per-process OrderedDict (default); values are kept by reference
+            and bounded by entry count only (sizing a value would mean
+            pickling it on every write)
+    sqlite  shared file (SESSION_STORE_PATH) so any gunicorn worker can resume
+            any session; values are pickled, so callers must write a value
+            back after mutating it, and bounded by entry count and bytes
+
+Usage:
+    sessions = create_session_store('chat')
+    state = sessions.get(session_id)
+    state['messages'].append(message)
+    sessions[session_id] = state    # write back (required for sqlite)
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'sessions.db')
+PURGE_INTERVAL_SECONDS = 60
+
+_MISSING = object()
+
+
+def _encode(value) -> bytes:
+    return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+class MemorySessionBackend:
+    """In-process LRU with per-entry expiry, bounded by entry count"""
+
+    name = "memory"
+    max_bytes = None
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._last_purge = time.time()
+        self.evictions = 0
+        self.expirations = 0
+
+    def _drop(self, key):
+        del self._entries[key]
+
+    def _purge_expired(self, now):
+        expired = [key for key, (_, expires_at) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            self._drop(key)
+        self.expirations += len(expired)
+        self._last_purge = now
+
+    def get(self, key, now):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            if entry[1] <= now:
+                self._drop(key)
+                self.expirations += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, expires_at, now):
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+
+            if now - self._last_purge >= PURGE_INTERVAL_SECONDS:
+                self._purge_expired(now)
+
+            # Least recently used first; never evict the entry just written
+            while len(self._entries) > self.max_entries and len(self._entries) > 1:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._drop(key)
+            return True
+
+    def items(self, now) -> List[Tuple[str, Any]]:
+        with self._lock:
+            return [(key, value) for key, (value, expires_at) in self._entries.items() if expires_at > now]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def usage(self, now) -> Tuple[int, Optional[int]]:
+        """Entry count; bytes are not tracked in memory (None)"""
+        with self._lock:
+            self._purge_expired(now)
+            return len(self._entries), None
+
+
+class SQLiteSessionBackend:
+    """
+    Pickled values in a SQLite file shared by all worker processes
+
+    Recency is the last write (reads do not touch the row), so the least
+    recently written sessions are evicted first.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, namespace: str, path: str, max_entries: int, max_bytes: int):
+        self.namespace = namespace
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self.evictions = 0
+        self.expirations = 0
+
+        with self._connection() as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS ix_sessions_namespace_updated ON sessions (namespace, updated_at)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread, reopened after fork()"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA busy_timeout=5000")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, key, now):
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM sessions WHERE namespace = ? AND key = ?",
+            (self.namespace, key)
+        ).fetchone()
+        if row is None:
+            return _MISSING
+        if row[1] <= now:
+            self.delete(key)
+            self.expirations += 1
+            return _MISSING
+        return pickle.loads(row[0])
+
+    def set(self, key, value, expires_at, now):
+        blob = _encode(value)
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO sessions (namespace, key, value, size, expires_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self.namespace, key, blob, len(blob), expires_at, now)
+            )
+            expired = connection.execute(
+                "DELETE FROM sessions WHERE namespace = ? AND expires_at <= ?", (self.namespace, now)
+            ).rowcount
+            self.expirations += max(expired, 0)
+            self._evict(connection, key)
+
+    def _evict(self, connection, keep_key):
+        count, total = connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM sessions WHERE namespace = ?", (self.namespace,)
+        ).fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+
+        victims = []
+        for key, size in connection.execute(
+            "SELECT key, size FROM sessions WHERE namespace = ? AND key != ? ORDER BY updated_at",
+            (self.namespace, keep_key)
+        ):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            victims.append((self.namespace, key))
+            count -= 1
+            total -= size
+
+        connection.executemany("DELETE FROM sessions WHERE namespace = ? AND key = ?", victims)
+        self.evictions += len(victims)
+
+    def delete(self, key):
+        with self._connection() as connection:
+            return connection.execute(
+                "DELETE FROM sessions WHERE namespace = ? AND key = ?", (self.namespace, key)
+            ).rowcount > 0
+
+    def items(self, now) -> List[Tuple[str, Any]]:
+        rows = self._connection().execute(
+            "SELECT key, value FROM sessions WHERE namespace = ? AND expires_at > ? ORDER BY updated_at",
+            (self.namespace, now)
+        ).fetchall()
+        return [(key, pickle.loads(value)) for key, value in rows]
+
+    def clear(self):
+        with self._connection() as connection:
+            connection.execute("DELETE FROM sessions WHERE namespace = ?", (self.namespace,))
+
+    def usage(self, now) -> Tuple[int, int]:
+        count, total = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM sessions WHERE namespace = ? AND expires_at > ?",
+            (self.namespace, now)
+        ).fetchone()
+        return count, total
+
+
+class SessionStore:
+    """Dict-like facade over a backend, with TTL and hit/miss counters"""
+
+    def __init__(self, namespace: str, backend, ttl_seconds: float):
+        self.namespace = namespace
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        value = self.backend.get(key, time.time())
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        now = time.time()
+        self.backend.set(key, value, now + self.ttl_seconds, now)
+
+    def delete(self, key) -> bool:
+        return self.backend.delete(key)
+
+    def pop(self, key, default=None):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            return default
+        self.delete(key)
+        return value
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return self.backend.items(time.time())
+
+    def keys(self) -> List[str]:
+        return [key for key, _ in self.items()]
+
+    def values(self) -> List[Any]:
+        return [value for _, value in self.items()]
+
+    def clear(self):
+        self.backend.clear()
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def __delitem__(self, key):
+        if not self.delete(key):
+            raise KeyError(key)
+
+    def __contains__(self, key) -> bool:
+        return self.backend.get(key, time.time()) is not _MISSING
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return self.backend.usage(time.time())[0]
+
+    def stats(self) -> Dict:
+        """Session count, stored bytes (sqlite only) and eviction counters"""
+        entries, size = self.backend.usage(time.time())
+        lookups = self.hits + self.misses
+        return {
+            "namespace": self.namespace,
+            "backend": self.backend.name,
+            "entries": entries,
+            "bytes": size,
+            "max_entries": self.backend.max_entries,
+            "max_bytes": self.backend.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "evictions": self.backend.evictions,
+            "expirations": self.backend.expirations,
+        }
+
+
+# Every store created by this process, for the metrics endpoint
+_stores: List[SessionStore] = []
+
+
+def create_session_store(namespace: str, ttl_seconds: float = None, max_entries: int = None,
+                         max_bytes: int = None, backend: str = None) -> SessionStore:
+    """
+    Create a store for one kind of state, configured from the environment
+
+    Args:
+        namespace: Name of the store (also its key prefix in the shared backend)
+        ttl_seconds: Idle lifetime (default SESSION_TTL_SECONDS, 2 hours)
+        max_entries: Entry limit (default SESSION_MAX_ENTRIES, 5000)
+        max_bytes: Stored size limit, sqlite only (default SESSION_MAX_BYTES, 256 MB)
+        backend: 'memory' or 'sqlite' (default SESSION_STORE_BACKEND, memory)
+    """
+    ttl_seconds = ttl_seconds or float(os.environ.get('SESSION_TTL_SECONDS', 2 * 60 * 60))
+    max_entries = max_entries or int(os.environ.get('SESSION_MAX_ENTRIES', 5000))
+    max_bytes = max_bytes or int(os.environ.get('SESSION_MAX_BYTES', 256 * 1024 * 1024))
+    backend = backend or os.environ.get('SESSION_STORE_BACKEND', 'memory')
+
+    if backend == 'memory':
+        store_backend = MemorySessionBackend(max_entries)
+    elif backend == 'sqlite':
+        path = os.environ.get('SESSION_STORE_PATH', DEFAULT_PATH)
+        store_backend = SQLiteSessionBackend(namespace, path, max_entries, max_bytes)
+    else:
+        raise ValueError(f"Unknown SESSION_STORE_BACKEND '{backend}' (expected memory or sqlite)")
+
+    store = SessionStore(namespace, store_backend, ttl_seconds)
+    _stores.append(store)
+    return store
+
+
+def session_store_stats() -> Dict:
+    """Stats of every session store in this process"""
+    stores = [store.stats() for store in _stores]
+    return {
+        "stores": stores,
+        "total_entries": sum(store["entries"] for store in stores),
+        "total_bytes": sum(store["bytes"] or 0 for store in stores),
+    }
@@ -26,7 +26,7 @@ class SocialMediaService:
             'خدمة سيئة', 'موظفين غير متعاونين', 'مواعيد متأخرة'
         ]
     
-    def generate_mock_ratings(self, hospital_id, hospital_name, facility_type='hospital'):
+    def generate_mock_ratings(self, hospital_id, hospital_name, facility_type='hospital', rng=None):
         """
         Generate mock social media ratings for a facility
         
@@ -34,50 +34,53 @@ class SocialMediaService:
             hospital_id: Hospital ID
             hospital_name: Hospital name
             facility_type: Type of facility
+            rng: Optional random.Random instance (for reproducible ratings)
             
         Returns:
             Dictionary with ratings data
         """
+        if rng is None:
+            rng = random
         # Base rating varies by facility type
         if facility_type == 'hospital':
-            base_rating = random.uniform(3.8, 4.7)
+            base_rating = rng.uniform(3.8, 4.7)
         elif facility_type == 'clinic':
-            base_rating = random.uniform(4.0, 4.8)
+            base_rating = rng.uniform(4.0, 4.8)
         else:
-            base_rating = random.uniform(3.5, 4.5)
+            base_rating = rng.uniform(3.5, 4.5)
         
         ratings = {}
         
         for platform in self.platforms:
             # Generate platform-specific rating
-            platform_rating = base_rating + random.uniform(-0.3, 0.3)
+            platform_rating = base_rating + rng.uniform(-0.3, 0.3)
             platform_rating = max(1.0, min(5.0, platform_rating))  # Clamp between 1-5
             
             # Generate review counts
             if platform == 'google_maps':
-                total_reviews = random.randint(150, 500)
+                total_reviews = rng.randint(150, 500)
             elif platform == 'twitter':
-                total_reviews = random.randint(50, 200)
+                total_reviews = rng.randint(50, 200)
             elif platform == 'instagram':
-                total_reviews = random.randint(30, 150)
+                total_reviews = rng.randint(30, 150)
             else:  # facebook
-                total_reviews = random.randint(40, 180)
+                total_reviews = rng.randint(40, 180)
             
             # Calculate positive/negative/neutral distribution
             positive_ratio = (platform_rating - 1) / 4  # 0-1 scale
-            positive_reviews = int(total_reviews * positive_ratio * random.uniform(0.85, 0.95))
-            negative_reviews = int(total_reviews * (1 - positive_ratio) * random.uniform(0.3, 0.5))
+            positive_reviews = int(total_reviews * positive_ratio * rng.uniform(0.85, 0.95))
+            negative_reviews = int(total_reviews * (1 - positive_ratio) * rng.uniform(0.3, 0.5))
             neutral_reviews = total_reviews - positive_reviews - negative_reviews
             
             # Sentiment score (-1 to 1)
             sentiment_score = (platform_rating - 3) / 2
             
             # Select random keywords
-            num_positive = random.randint(3, 5)
-            num_negative = random.randint(2, 4)
+            num_positive = rng.randint(3, 5)
+            num_negative = rng.randint(2, 4)
             
-            positive_keywords = random.sample(self.positive_keywords_ar, num_positive)
-            negative_keywords = random.sample(self.negative_keywords_ar, num_negative)
+            positive_keywords = rng.sample(self.positive_keywords_ar, num_positive)
+            negative_keywords = rng.sample(self.negative_keywords_ar, num_negative)
             
             ratings[platform] = {
                 'platform': platform,
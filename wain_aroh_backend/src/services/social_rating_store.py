@@ -0,0 +1,151 @@
+"""
+Social Rating Store
+مخزن التقييمات المجمعة لمواقع التواصل الاجتماعي
+
+Materializes one aggregate rating row per facility in SQLite so search can
+read every facility's rating with a single query instead of generating
+ratings on each request.
+"""
+
+import os
+import random
+from datetime import datetime, timedelta
+
+from ..models.user import db
+from ..models.hospital import Hospital
+from ..models.social_ratings import SocialMediaRating, FacilityRatingAggregate
+from .social_media_service import social_media_service
+
+
+class SocialRatingStore:
+    """Precomputed, TTL-refreshed facility rating aggregates"""
+
+    def __init__(self, ttl_seconds=None):
+        if ttl_seconds is None:
+            ttl_seconds = int(os.environ.get('SOCIAL_RATINGS_TTL_SECONDS', 6 * 3600))
+        self.ttl_seconds = ttl_seconds
+        self.last_refresh_at = None
+        self.last_refresh_count = 0
+
+    def load_all(self):
+        """
+        Read every materialized aggregate with one query
+
+        Returns:
+            Dict mapping hospital_id to {'hospital_id', 'platforms', 'aggregate', ...}
+        """
+        return {
+            row.hospital_id: row.to_dict()
+            for row in FacilityRatingAggregate.query.all()
+        }
+
+    def ensure_fresh(self):
+        """
+        Refresh aggregates that are missing or older than the TTL
+
+        Returns:
+            Number of aggregates recomputed
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+
+        fresh_ids = {
+            hospital_id for (hospital_id,) in db.session.query(FacilityRatingAggregate.hospital_id).filter(
+                FacilityRatingAggregate.computed_at >= cutoff
+            )
+        }
+        all_ids = {hospital_id for (hospital_id,) in db.session.query(Hospital.id)}
+
+        stale_ids = all_ids - fresh_ids
+        if not stale_ids:
+            return 0
+
+        return self.refresh(sorted(stale_ids))
+
+    def refresh(self, hospital_ids=None):
+        """
+        Recompute and persist aggregates (ingestion job entry point)
+
+        Facilities with ingested SocialMediaRating rows are aggregated from
+        those rows; the others get reproducible generated ratings seeded by
+        hospital id, so the ranking is stable between refreshes.
+
+        Args:
+            hospital_ids: Hospitals to refresh (default: all)
+
+        Returns:
+            Number of aggregates written
+        """
+        query = db.session.query(Hospital.id, Hospital.name_ar, Hospital.facility_type)
+        if hospital_ids is not None:
+            query = query.filter(Hospital.id.in_(hospital_ids))
+        hospitals = query.all()
+
+        if not hospitals:
+            return 0
+
+        ids = [h.id for h in hospitals]
+
+        # Ingested platform ratings, grouped by hospital (one query)
+        ingested = {}
+        for rating in SocialMediaRating.query.filter(SocialMediaRating.hospital_id.in_(ids)):
+            ingested.setdefault(rating.hospital_id, {})[rating.platform] = rating.to_dict()
+
+        # Existing aggregate rows (one query)
+        existing = {
+            row.hospital_id: row
+            for row in FacilityRatingAggregate.query.filter(FacilityRatingAggregate.hospital_id.in_(ids))
+        }
+
+        now = datetime.utcnow()
+
+        for hospital in hospitals:
+            if hospital.id in ingested:
+                platforms = ingested[hospital.id]
+                aggregate = social_media_service._calculate_aggregate_rating({
+                    platform: {
+                        'overall_rating': data['overall_rating'] or 0,
+                        'total_reviews': data['total_reviews'] or 0,
+                        'positive_reviews': data['positive_reviews'] or 0,
+                        'negative_reviews': data['negative_reviews'] or 0,
+                        'neutral_reviews': data['neutral_reviews'] or 0,
+                        'sentiment_score': data['sentiment_score'] or 0
+                    }
+                    for platform, data in platforms.items()
+                })
+                source = 'ingested'
+            else:
+                generated = social_media_service.generate_mock_ratings(
+                    hospital.id,
+                    hospital.name_ar or str(hospital.id),
+                    hospital.facility_type or 'hospital',
+                    rng=random.Random(hospital.id)
+                )
+                platforms = generated['platforms']
+                aggregate = generated['aggregate']
+                source = 'generated'
+
+            row = existing.get(hospital.id)
+            if row is None:
+                row = FacilityRatingAggregate(hospital_id=hospital.id)
+                db.session.add(row)
+
+            row.overall_rating = aggregate['overall_rating']
+            row.total_reviews = aggregate['total_reviews']
+            row.positive_reviews = aggregate['positive_reviews']
+            row.negative_reviews = aggregate['negative_reviews']
+            row.neutral_reviews = aggregate['neutral_reviews']
+            row.sentiment_score = aggregate['sentiment_score']
+            row.platforms_count = aggregate['platforms_count']
+            row.platforms = platforms
+            row.source = source
+            row.computed_at = now
+
+        db.session.commit()
+
+        self.last_refresh_at = now
+        self.last_refresh_count = len(hospitals)
+        return len(hospitals)
+
+
+# Global instance
+social_rating_store = SocialRatingStore()
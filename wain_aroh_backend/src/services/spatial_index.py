@@ -0,0 +1,222 @@
+"""
+فهرس مكاني شبكي لاستعلامات نصف القطر والأقرب
+Grid bucket spatial index for radius and k-nearest facility queries
+"""
+
+import math
+import heapq
+from typing import Dict, List, Tuple, Optional, Container
+
+# نصف قطر الأرض بالكيلومتر
+EARTH_RADIUS_KM = 6371.0
+
+# طول درجة واحدة من خط العرض بالكيلومتر
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180.0
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """
+    حساب المسافة بين نقطتين باستخدام صيغة Haversine
+    Same formula and rounding as AdvancedSearchService.calculate_distance
+    """
+    lat1_rad = math.radians(lat1)
+    lon1_rad = math.radians(lng1)
+    lat2_rad = math.radians(lat2)
+    lon2_rad = math.radians(lng2)
+
+    dlat = lat2_rad - lat1_rad
+    dlon = lon2_rad - lon1_rad
+
+    a = math.sin(dlat / 2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon / 2)**2
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+    return round(EARTH_RADIUS_KM * c, 2)
+
+
+class GridSpatialIndex:
+    """
+    فهرس مكاني يقسم الخريطة إلى خلايا بحجم ثابت بالدرجات
+    Buckets points into fixed-size lat/lng cells
+
+    A radius query only visits the cells overlapping the bounding box of the
+    search circle, and runs the exact haversine only on points in those cells.
+    Items are keyed by integer (the facility ordinal in its snapshot) and can
+    be inserted, moved and removed individually so the index can be kept in
+    sync as facilities are added, relocated or deactivated.
+    """
+
+    def __init__(self, cell_size_deg: float = 0.1):
+        """
+        Args:
+            cell_size_deg: حجم الخلية بالدرجات (0.1 درجة ≈ 11 كم)
+        """
+        self.cell_size_deg = cell_size_deg
+        self._cells: Dict[Tuple[int, int], Dict[int, Tuple[float, float]]] = {}
+        self._points: Dict[int, Tuple[float, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._points
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        """تحديد الخلية التي تقع فيها النقطة"""
+        return (
+            int(math.floor(lat / self.cell_size_deg)),
+            int(math.floor(lng / self.cell_size_deg))
+        )
+
+    def insert(self, key: int, lat: float, lng: float):
+        """
+        إضافة نقطة أو تحديث موقعها
+        Insert a point, or move it if the key already exists
+        """
+        if key in self._points:
+            self.remove(key)
+
+        self._points[key] = (lat, lng)
+        self._cells.setdefault(self._cell(lat, lng), {})[key] = (lat, lng)
+
+    def remove(self, key: int) -> bool:
+        """
+        حذف نقطة من الفهرس
+        Remove a point; returns False if it was not indexed
+        """
+        point = self._points.pop(key, None)
+        if point is None:
+            return False
+
+        cell = self._cell(*point)
+        bucket = self._cells.get(cell)
+        if bucket is not None:
+            bucket.pop(key, None)
+            if not bucket:
+                del self._cells[cell]
+        return True
+
+    def _lng_span_deg(self, lat: float, radius_km: float) -> float:
+        """عرض نصف القطر بدرجات خط الطول عند خط عرض معين"""
+        max_lat = min(abs(lat) + radius_km / KM_PER_DEGREE, 89.0)
+        return radius_km / (KM_PER_DEGREE * math.cos(math.radians(max_lat)))
+
+    def query_radius(
+        self,
+        lat: float,
+        lng: float,
+        radius_km: float,
+        allowed: Optional[Container[int]] = None
+    ) -> Dict[int, float]:
+        """
+        البحث عن جميع النقاط ضمن نصف قطر معين
+        Return {key: distance_km} for every point within radius_km
+
+        Args:
+            allowed: إن وُجدت، تُحسب المسافة فقط للمفاتيح الموجودة فيها
+        """
+        lat_span = radius_km / KM_PER_DEGREE
+        lng_span = self._lng_span_deg(lat, radius_km)
+
+        min_row, min_col = self._cell(lat - lat_span, lng - lng_span)
+        max_row, max_col = self._cell(lat + lat_span, lng + lng_span)
+
+        results = {}
+
+        # إذا غطّى المربع خلايا أكثر من الخلايا المشغولة فالمرور على الكل أرخص
+        cell_count = (max_row - min_row + 1) * (max_col - min_col + 1)
+        if cell_count >= len(self._cells):
+            buckets = self._cells.values()
+        else:
+            buckets = (
+                self._cells[(row, col)]
+                for row in range(min_row, max_row + 1)
+                for col in range(min_col, max_col + 1)
+                if (row, col) in self._cells
+            )
+
+        for bucket in buckets:
+            for key, (p_lat, p_lng) in bucket.items():
+                if allowed is not None and key not in allowed:
+                    continue
+                distance_km = haversine_km(lat, lng, p_lat, p_lng)
+                if distance_km <= radius_km:
+                    results[key] = distance_km
+
+        return results
+
+    def nearest(
+        self,
+        lat: float,
+        lng: float,
+        k: int,
+        max_distance_km: Optional[float] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        البحث عن أقرب k نقاط
+        Return up to k (key, distance_km) pairs ordered by distance
+
+        Cells are visited in rings of growing Chebyshev distance around the
+        query cell; the search stops once k points are closer than anything
+        an unvisited ring could contain.
+        """
+        if k <= 0 or not self._points:
+            return []
+
+        center_row, center_col = self._cell(lat, lng)
+
+        # نحتفظ بأفضل k نقاط في كومة عظمى (بالقيم السالبة)، والتعادل لصالح المفتاح الأصغر
+        best: List[Tuple[float, int]] = []
+        visited = 0
+        ring = 0
+
+        # في الفهرس المتناثر (حلقة أطول من عدد الخلايا المشغولة) نجمع الخلايا المشغولة حسب الحلقة
+        # بدلاً من المرور على آلاف الخلايا الفارغة حتى أقرب نقطة بعيدة
+        occupied_by_ring = None
+
+        while visited < len(self._points):
+            if ring == 0:
+                cells = [(center_row, center_col)]
+            elif occupied_by_ring is not None or 8 * ring > len(self._cells):
+                if occupied_by_ring is None:
+                    occupied_by_ring = {}
+                    for cell in self._cells:
+                        cell_ring = max(abs(cell[0] - center_row), abs(cell[1] - center_col))
+                        if cell_ring >= ring:
+                            occupied_by_ring.setdefault(cell_ring, []).append(cell)
+                cells = occupied_by_ring.get(ring, [])
+            else:
+                cells = [
+                    (center_row + d_row, center_col + d_col)
+                    for d_row in range(-ring, ring + 1)
+                    for d_col in range(-ring, ring + 1)
+                    if max(abs(d_row), abs(d_col)) == ring
+                ]
+
+            for cell in cells:
+                bucket = self._cells.get(cell)
+                if not bucket:
+                    continue
+                for key, (p_lat, p_lng) in bucket.items():
+                    visited += 1
+                    distance_km = haversine_km(lat, lng, p_lat, p_lng)
+                    if max_distance_km is not None and distance_km > max_distance_km:
+                        continue
+                    item = (-distance_km, -key)
+                    if len(best) < k:
+                        heapq.heappush(best, item)
+                    elif item > best[0]:
+                        heapq.heapreplace(best, item)
+
+            # أي نقطة في الحلقات التالية لا تقل مسافتها عن هذا الحد
+            # (عرض الخلية بالكيلومتر يصغر كلما ابتعدنا عن خط الاستواء)
+            far_lat = min(abs(lat) + (ring + 1) * self.cell_size_deg, 89.0)
+            min_cell_km = self.cell_size_deg * KM_PER_DEGREE * math.cos(math.radians(far_lat))
+            lower_bound_km = ring * min_cell_km
+            if len(best) == k and -best[0][0] < lower_bound_km:
+                break
+            if max_distance_km is not None and lower_bound_km > max_distance_km:
+                break
+            ring += 1
+
+        ordered = sorted(best, reverse=True)
+        return [(-neg_key, -neg_distance) for neg_distance, neg_key in ordered]
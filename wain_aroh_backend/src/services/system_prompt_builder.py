@@ -0,0 +1,244 @@
+"""
+System Prompt Builder
+Assembles the ConversationalAI system prompt from templates: a fixed core, the
+guidance for the current conversation stage, and a section for the patient's
+region generated from the live facility rows
+
+The region sections are rebuilt from the database when the facility data
+version changes (facility_snapshot_store.invalidate(), called by the admin
+API on every facility write) or after SYSTEM_PROMPT_CACHE_SECONDS, so writes
+made by other processes (populate / add_* scripts) are picked up as well.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from src.models.user import db
+from src.models.hospital import Hospital
+from src.services.region_detector import RegionDetector
+from src.services.facility_snapshot import facility_snapshot_store
+
+HOSPITAL_TYPES = {'hospital', 'emergency_center'}
+URGENT_CARE_TYPES = {'urgent_care_center', 'urgent_care'}
+
+MAX_LISTED_HOSPITALS = 7
+MAX_LISTED_URGENT_CARE = 6
+
+CORE_TEMPLATE = """أنت مساعد طبي ذكي لنظام "وين أروح" - نظام التوجيه الصحي الذكي في المملكة العربية السعودية.
+
+**مهمتك الرئيسية:**
+توجيه المرضى للمكان الصحيح بناءً على حالتهم الصحية.
+
+**أسلوب المحادثة:**
+- تحدث بالعربية الفصحى البسيطة، وكن ودوداً ومطمئناً ومتعاطفاً
+- اسأل أسئلة واضحة ومباشرة، ولا تستخدم مصطلحات طبية معقدة
+
+**خطوات المحادثة:**
+الترحيب ← جمع الأعراض ← السؤال عن الموقع ← تقييم CTAS ← التوجيه (فقط بعد التقييم الكامل) ← تفاصيل المنشأة ← حجز موعد عند الحاجة ← الختام
+
+**تقييم الحالة (CTAS) والتوجيه:**
+- CTAS 1: حالة حرجة جداً (فقدان وعي، ألم صدر شديد مع ضيق تنفس، نزيف حاد) ← طوارئ أقرب مستشفى
+- CTAS 2: حالة طارئة (ألم صدر شديد، كسور، حمى عالية مع أعراض خطيرة) ← طوارئ أقرب مستشفى
+- CTAS 3: حالة عاجلة (آلام متوسطة، حمى، إصابات بسيطة) ← مركز رعاية عاجلة (UCC) إذا كان قريباً
+- CTAS 4: حالة أقل إلحاحاً (أعراض خفيفة، يمكن الانتظار) ← عيادة أو مركز رعاية ممتدة أو عيادة افتراضية
+- CTAS 5: حالة غير عاجلة (فحص دوري، استشارة عامة) ← عيادة أو عيادة افتراضية
+
+**حالات الطوارئ:**
+- إذا كانت الحالة حرجة جداً، انصح بالاتصال بالإسعاف 997
+- للحالات الطارئة، وجه للطوارئ في أقرب مستشفى
+
+**ملاحظات:**
+- لا تقدم تشخيصاً طبياً ولا تصف أدوية
+- ركز على التوجيه للمكان المناسب، وكن حذراً مع الحالات الحرجة
+
+{stage_section}
+
+**معلومات مهمة:**
+{region_section}
+"""
+
+# Detailed guidance for the current stage only
+STAGE_TEMPLATES = {
+    "symptoms": """**المرحلة الحالية: جمع المعلومات عن الأعراض**
+- ابدأ بالترحيب واسأل: "ما الذي تشعر به؟"
+- اسأل عن الأعراض بالتفصيل: متى بدأت؟ ما شدة الألم (1-10)؟ هل هناك أعراض أخرى مثل حمى أو غثيان؟ هل حدث فجأة أم تدريجياً؟
+- لا تقدم التوصيات في بداية المحادثة""",
+    "location": """**المرحلة الحالية: السؤال عن الموقع بشكل طبيعي**
+- اسأل: "أين أنت الآن؟" أو "في أي حي تسكن؟"
+- إذا لم يعرف، اقترح: "هل يمكنك مشاركة موقعك الحالي لأساعدك في إيجاد أقرب مركز؟"
+- اشرح: "سأستخدم موقعك فقط لتوجيهك لأقرب مركز رعاية مناسب\"""",
+    "recommendation": """**المرحلة الحالية: التوجيه للمكان المناسب**
+- قدم التوصية حسب مستوى CTAS بعد اكتمال المعلومات (الأعراض، الشدة، المدة، الموقع)
+- اذكر تفاصيل المنشأة: الاسم، العنوان، المسافة والوقت المتوقع، رقم الهاتف، رابط الخريطة
+- للحالات غير العاجلة (CTAS 4-5) اسأل: "هل تريد حجز موعد؟\"""",
+    "booking": """**المرحلة الحالية: حجز موعد**
+- اجمع المعلومات: الاسم، رقم الجوال، التاريخ المفضل
+- احجز وأكد الموعد""",
+    "closing": """**المرحلة الحالية: الختام**
+- اسأل: "هل هناك شيء آخر يمكنني مساعدتك فيه؟"
+- قدم نصائح إضافية إذا لزم الأمر، وتمنى له السلامة""",
+}
+
+# Conversation stages (ConversationalAI state['stage']) -> guidance
+STAGE_GUIDANCE = {
+    "greeting": "symptoms",
+    "symptoms": "symptoms",
+    "location": "location",
+    "triage": "recommendation",
+    "recommendation": "recommendation",
+    "booking": "booking",
+    "closing": "closing",
+}
+
+REGION_TEMPLATE = """**منطقة المريض: {name_ar}**
+- {hospitals} مستشفى، منها {emergency_24_7} بطوارئ 24/7
+- {urgent_care} مركز رعاية عاجلة، منها {urgent_care_24_7} تعمل 24 ساعة
+- {clinics} عيادة ومركز صحي
+- المدن: {cities}
+
+**أهم المستشفيات في {name_ar}:**
+{hospital_lines}
+
+**مراكز الرعاية العاجلة في {name_ar}:**
+{urgent_care_lines}"""
+
+OVERVIEW_TEMPLATE = """**المناطق المشمولة بالخدمة:**
+{region_lines}
+
+موقع المريض غير معروف بعد: اسأل عن مدينته أو حيه قبل التوصية بمنشأة محددة."""
+
+
+def _region_of(row) -> Optional[str]:
+    """Region code of a facility row, by coordinates then by city"""
+    if row.latitude is not None and row.longitude is not None:
+        region = RegionDetector.detect_region_by_coordinates(row.latitude, row.longitude)
+        if region and region['code'] != 'unknown':
+            return region['code']
+    if row.city:
+        region = RegionDetector.detect_region_by_city(row.city)
+        if region and region.get('code') != 'unknown':
+            return region['code']
+    return None
+
+
+def _hospital_line(index: int, row) -> str:
+    details = []
+    if row.capacity_beds:
+        details.append(f"{row.capacity_beds} سرير")
+    if row.is_emergency:
+        details.append("طوارئ 24/7" if row.is_24_7 else "طوارئ")
+    suffix = f" ({'، '.join(details)})" if details else ""
+    return f"{index}. {row.name_ar} - {row.city or ''}{suffix}"
+
+
+def _urgent_care_line(row) -> str:
+    hours = " (24 ساعة)" if row.is_24_7 else ""
+    return f"- {row.name_ar} - {row.city or ''}{hours}"
+
+
+class SystemPromptBuilder:
+    """Region-scoped system prompts, cached per facility data version"""
+
+    def __init__(self, max_age_seconds: int = None):
+        self.max_age_seconds = max_age_seconds or int(os.environ.get('SYSTEM_PROMPT_CACHE_SECONDS', 300))
+        self._lock = threading.Lock()
+        self._sections: Dict[str, str] = {}
+        self._version = None
+        self._built_at = 0.0
+        self.builds = 0
+
+    def build(self, region_code: str = None, stage: str = None) -> str:
+        """
+        System prompt for a region ('jazan', 'riyadh') and conversation stage
+
+        Lists the facilities of that region only, or an overview of all
+        regions while the region is unknown. Requires an application context.
+        """
+        sections = self._current_sections()
+        return CORE_TEMPLATE.format(
+            stage_section=STAGE_TEMPLATES[STAGE_GUIDANCE.get(stage, "symptoms")],
+            region_section=sections.get(region_code) or sections['overview'],
+        )
+
+    def template_prompt(self) -> str:
+        """The longest prompt without facility data (for budget checks outside a request)"""
+        longest_stage = max(STAGE_TEMPLATES.values(), key=len)
+        return CORE_TEMPLATE.format(stage_section=longest_stage, region_section="")
+
+    def invalidate(self):
+        with self._lock:
+            self._version = None
+
+    def stats(self) -> Dict:
+        return {
+            "version": self._version,
+            "built_at": self._built_at or None,
+            "builds": self.builds,
+            "section_chars": {code: len(text) for code, text in self._sections.items()},
+        }
+
+    def _current_sections(self) -> Dict[str, str]:
+        version = facility_snapshot_store.version
+        if self._version == version and time.time() - self._built_at < self.max_age_seconds:
+            return self._sections
+
+        with self._lock:
+            if self._version != version or time.time() - self._built_at >= self.max_age_seconds:
+                self._sections = self._build_sections()
+                self._version = version
+                self._built_at = time.time()
+                self.builds += 1
+            return self._sections
+
+    def _build_sections(self) -> Dict[str, str]:
+        """One query for all active facilities, grouped by region"""
+        rows = db.session.query(
+            Hospital.name_ar, Hospital.city, Hospital.facility_type, Hospital.is_emergency,
+            Hospital.is_24_7, Hospital.capacity_beds, Hospital.latitude, Hospital.longitude
+        ).filter(Hospital.is_active.is_(True)).all()
+
+        by_region: Dict[str, List] = {code: [] for code in RegionDetector.REGIONS}
+        for row in rows:
+            code = _region_of(row)
+            if code:
+                by_region[code].append(row)
+
+        sections = {}
+        region_lines = []
+        for code, facilities in by_region.items():
+            name_ar = RegionDetector.REGIONS[code]['name_ar']
+            hospitals = [f for f in facilities if f.facility_type in HOSPITAL_TYPES]
+            urgent_care = [f for f in facilities if f.facility_type in URGENT_CARE_TYPES]
+            clinics = len(facilities) - len(hospitals) - len(urgent_care)
+
+            # Emergency departments first, then the largest
+            hospitals.sort(key=lambda f: (not f.is_emergency, -(f.capacity_beds or 0), f.name_ar))
+            urgent_care.sort(key=lambda f: (not f.is_24_7, f.name_ar))
+
+            sections[code] = REGION_TEMPLATE.format(
+                name_ar=name_ar,
+                hospitals=len(hospitals),
+                emergency_24_7=sum(1 for f in hospitals if f.is_emergency and f.is_24_7),
+                urgent_care=len(urgent_care),
+                urgent_care_24_7=sum(1 for f in urgent_care if f.is_24_7),
+                clinics=clinics,
+                cities="، ".join(sorted({f.city for f in facilities if f.city})) or "-",
+                hospital_lines="\n".join(
+                    _hospital_line(i, f) for i, f in enumerate(hospitals[:MAX_LISTED_HOSPITALS], 1)
+                ) or "- لا توجد بيانات",
+                urgent_care_lines="\n".join(
+                    _urgent_care_line(f) for f in urgent_care[:MAX_LISTED_URGENT_CARE]
+                ) or "- لا توجد بيانات",
+            )
+            region_lines.append(
+                f"- {name_ar}: {len(hospitals)} مستشفى، {len(urgent_care)} مركز رعاية عاجلة، {clinics} عيادة"
+            )
+
+        sections['overview'] = OVERVIEW_TEMPLATE.format(region_lines="\n".join(region_lines))
+        return sections
+
+
+# Global instance
+system_prompt_builder = SystemPromptBuilder()
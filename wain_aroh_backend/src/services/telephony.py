@@ -4,13 +4,14 @@ Handles incoming calls, voice recording, and transcription
 """
 
 from flask import request, Response
-from openai import OpenAI
 import os
 import json
 from datetime import datetime
+from src.services.session_store import create_session_store
+from src.services.llm_gateway import llm_gateway
 
-# Initialize OpenAI client
-client = OpenAI()
+# Model calls go through the shared LLM gateway
+client = llm_gateway.client('telephony')
 
 class CallSession:
     """Manages a phone call session"""
@@ -29,8 +30,8 @@ class CallSession:
             "timestamp": datetime.now().isoformat()
         })
 
-# Store active call sessions
-call_sessions = {}
+# Active call sessions (bounded and expiring; shared across workers with SESSION_STORE_BACKEND=sqlite)
+call_sessions = create_session_store('call', ttl_seconds=60 * 60)
 
 def generate_twiml_response(text, gather_input=True):
     """
@@ -66,8 +67,9 @@ def handle_incoming_call(request_data):
     from_number = request_data.get('From')
     
     # Create new call session
-    call_sessions[call_sid] = CallSession(call_sid)
-    call_sessions[call_sid].patient_info['phone'] = from_number
+    session = CallSession(call_sid)
+    session.patient_info['phone'] = from_number
+    call_sessions[call_sid] = session
     
     # Welcome message in Arabic
     welcome_message = """
@@ -86,11 +88,10 @@ def process_recording(request_data):
     call_sid = request_data.get('CallSid')
     recording_url = request_data.get('RecordingUrl')
     
-    if call_sid not in call_sessions:
+    session = call_sessions.get(call_sid)
+    if session is None:
         return generate_twiml_response("عذراً، حدث خطأ. يرجى الاتصال مرة أخرى.", gather_input=False)
     
-    session = call_sessions[call_sid]
-    
     # In production, you would download and transcribe the recording
     # For now, we'll use a placeholder
     # transcribed_text = transcribe_audio_from_url(recording_url)
@@ -111,11 +112,11 @@ def handle_transcription(request_data):
     call_sid = request_data.get('CallSid')
     transcription_text = request_data.get('TranscriptionText')
     
-    if call_sid not in call_sessions:
+    session = call_sessions.get(call_sid)
+    if session is None:
         return {"status": "error", "message": "Session not found"}
-    
-    session = call_sessions[call_sid]
     session.add_message("user", transcription_text)
+    call_sessions[call_sid] = session
     
     # Get AI response
     try:
@@ -143,6 +144,7 @@ def handle_transcription(request_data):
         
         ai_response = response.choices[0].message.content
         session.add_message("assistant", ai_response)
+        call_sessions[call_sid] = session
         
         return {
             "status": "success",
@@ -182,11 +184,10 @@ def end_call_and_send_sms(call_sid, facility_info):
     """
     End call and send SMS with facility information
     """
-    if call_sid not in call_sessions:
+    session = call_sessions.get(call_sid)
+    if session is None:
         return {"status": "error", "message": "Session not found"}
     
-    session = call_sessions[call_sid]
-    
     # Generate SMS content
     sms_content = f"""
     وين أروح - توصيتك الصحية
@@ -216,7 +217,7 @@ def end_call_and_send_sms(call_sid, facility_info):
     }
     
     # Clean up session
-    del call_sessions[call_sid]
+    call_sessions.delete(call_sid)
     
     return {
         "status": "success",
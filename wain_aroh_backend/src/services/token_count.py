@@ -0,0 +1,24 @@
+"""
+Token Count
+Token estimates shared by prompt budgeting (conversation_context) and usage
+accounting (llm_gateway)
+"""
+
+import math
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:  # optional: fall back to a character-based estimate
+    _encoding = None
+
+MESSAGE_OVERHEAD_TOKENS = 4     # role and separators per chat message
+
+
+def estimate_tokens(text: str) -> int:
+    """Token count of a text (tiktoken when installed, else ~2.5 characters per token)"""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return math.ceil(len(text) / 2.5)